@@ -0,0 +1,35 @@
+"""create_chat_session_routes_table
+
+Revision ID: 5c2e8d1f7a40
+Revises: 18f09406fe3b
+Create Date: 2025-08-20 10:12:04.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8d1f7a40'
+down_revision: Union[str, Sequence[str], None] = '18f09406fe3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chat_session_routes',
+    sa.Column('session_id', sa.String(), nullable=False),
+    sa.Column('worker_id', sa.String(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('session_id')
+    )
+    op.create_index(op.f('ix_chat_session_routes_worker_id'), 'chat_session_routes', ['worker_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chat_session_routes_worker_id'), table_name='chat_session_routes')
+    op.drop_table('chat_session_routes')
@@ -0,0 +1,35 @@
+"""add_workspace_and_project_fk_indexes
+
+Revision ID: c41d7e9a2b56
+Revises: 9a4f3b6c2d18
+Create Date: 2026-10-18 09:14:27.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e9a2b56'
+down_revision: Union[str, Sequence[str], None] = '9a4f3b6c2d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The foreign key comes first, so these serve FK lookups and cascades too.
+    # CONCURRENTLY keeps the tables writable while the indexes build; it
+    # can't run inside the migration's transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_workspaces_owner_id_name_id', 'workspaces', ['owner_id', 'name', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_projects_workspace_id_name_id', 'projects', ['workspace_id', 'name', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_projects_workspace_id_name_id', table_name='projects', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_workspaces_owner_id_name_id', table_name='workspaces', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,2 @@
+# Kept free of imports, so naming the agent app doesn't load google.adk
+APP_NAME = "Analyst Agent Chat"
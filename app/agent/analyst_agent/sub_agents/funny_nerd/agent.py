@@ -1,25 +1,33 @@
+import logging
+
 from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
 
 
+# Child of the "app" logger, so records go through its queue handler
+logger = logging.getLogger("app.agent")
+
+
+# Built once at import, not on every call
+JOKES = {
+    "python": "Why don't Python programmers like to use inheritance? Because they don't like to inherit anything!",
+    "javascript": "Why did the JavaScript developer go broke? Because he used up all his cache!",
+    "java": "Why do Java developers wear glasses? Because they can't C#!",
+    "programming": "Why do programmers prefer dark mode? Because light attracts bugs!",
+    "math": "Why was the equal sign so humble? Because he knew he wasn't less than or greater than anyone else!",
+    "physics": "Why did the photon check a hotel? Because it was travelling light!",
+    "chemistry": "Why did the acid go to the gym? To become a buffer solution!",
+    "biology": "Why did the cell go to therapy? Because it had too many issues!",
+    "default": "Why did the computer go to the doctor? Because it had a virus!",
+}
+
+
+# Not memoized: the dict lookup is cheaper than any cache key
 def get_nerd_joke(topic: str, tool_context: ToolContext) -> dict:
     """Get a nerdy joke about a specific topic."""
-    print(f"--- Tool: get_nerd_joke called for topic: {topic} ---")
-
-    # Example jokes - in a real implementation, you might want to use an API
-    jokes = {
-        "python": "Why don't Python programmers like to use inheritance? Because they don't like to inherit anything!",
-        "javascript": "Why did the JavaScript developer go broke? Because he used up all his cache!",
-        "java": "Why do Java developers wear glasses? Because they can't C#!",
-        "programming": "Why do programmers prefer dark mode? Because light attracts bugs!",
-        "math": "Why was the equal sign so humble? Because he knew he wasn't less than or greater than anyone else!",
-        "physics": "Why did the photon check a hotel? Because it was travelling light!",
-        "chemistry": "Why did the acid go to the gym? To become a buffer solution!",
-        "biology": "Why did the cell go to therapy? Because it had too many issues!",
-        "default": "Why did the computer go to the doctor? Because it had a virus!",
-    }
-
-    joke = jokes.get(topic.lower(), jokes["default"])
+    logger.info("get_nerd_joke called", extra={"event_type": "tool_call", "tool": "get_nerd_joke", "topic": topic})
+
+    joke = JOKES.get(topic.lower(), JOKES["default"])
 
     # Update state with the last joke topic
     tool_context.state["last_joke_topic"] = topic
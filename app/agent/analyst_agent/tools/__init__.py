@@ -0,0 +1,4 @@
+from .memo import memoize_tool
+from .stats import TOOL_STATS, ToolStats, ToolStatsPlugin
+
+__all__ = ["TOOL_STATS", "ToolStats", "ToolStatsPlugin", "memoize_tool"]
@@ -0,0 +1,160 @@
+"""Memoization for agent tools.
+
+Kept free of ``app.*`` imports so the agent package still loads under the
+ADK CLI. Cache hits are counted in TOOL_STATS, next to the calls the
+runner's ToolStatsPlugin counts.
+"""
+import asyncio
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from .stats import TOOL_STATS, ToolStats
+
+
+# Results of these types are returned as they are; anything else is deep-copied
+_IMMUTABLE = (str, int, float, bool, bytes, type(None))
+
+
+def fold_text(value: Any) -> Any:
+    """Case- and whitespace-insensitive form of a string argument"""
+    return " ".join(value.split()).casefold() if isinstance(value, str) else value
+
+
+def _frozen(value: Any) -> Hashable:
+    """A hashable stand-in for an argument; mappings compare regardless of order"""
+    if isinstance(value, bool):
+        return ("bool", value)
+    if isinstance(value, _IMMUTABLE):
+        return value
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _frozen(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(v) for v in value)
+    return repr(value)
+
+
+def _copy(value: Any) -> Any:
+    return value if isinstance(value, _IMMUTABLE) else copy.deepcopy(value)
+
+
+@dataclass
+class _Entry:
+    result: Any
+    # State writes the original call made through its ToolContext
+    state_effects: Dict[str, Any]
+    expires_at: float
+
+
+def memoize_tool(
+    ttl: float = 300.0,
+    max_size: int = 256,
+    depends_on: Iterable[str] = (),
+    normalize: Iterable[str] = (),
+    key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+):
+    """Cache a tool's results, keyed on its arguments
+
+    Only for tools that cost far more than the cache: a call pays a few
+    microseconds to build the key and copy the result, more than a plain
+    lookup or computation takes.
+
+    Arguments are matched exactly. Those named in ``normalize`` are folded
+    with fold_text, so case and whitespace don't matter; only name free
+    text the result doesn't echo, since a hit returns the first caller's
+    result. ``key`` replaces the default key, given the arguments by name.
+    ``tool_context`` is never part of the key. Values the tool reads from
+    session state must be listed in ``depends_on`` so they become part of
+    the key. State the tool writes is recorded with the result and written
+    again on every hit, so a cached call has the same side effects as a
+    real one. Mutable results are deep-copied on the way out.
+    """
+    depends_on = tuple(depends_on)
+    normalize = frozenset(normalize)
+
+    def decorator(func):
+        name = func.__name__
+        stats = TOOL_STATS.setdefault(name, ToolStats())
+        signature = inspect.signature(func)
+        params = [p for p in signature.parameters.values() if p.name != "tool_context"]
+        entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        lock = threading.Lock()
+
+        def cache_key(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[Hashable, Any]:
+            # ADK passes every argument by name; only positional calls need binding
+            arguments = signature.bind(*args, **kwargs).arguments if args else kwargs
+            tool_context = arguments.get("tool_context")
+            if key is not None:
+                arguments_key = key({k: v for k, v in arguments.items() if k != "tool_context"})
+            else:
+                values = [arguments.get(p.name, p.default) for p in params]
+                arguments_key = tuple(
+                    _frozen(fold_text(v) if p.name in normalize else v) for p, v in zip(params, values)
+                )
+            state: Tuple[Hashable, ...] = ()
+            if tool_context is not None and depends_on:
+                state = tuple(_frozen(tool_context.state.get(k)) for k in depends_on)
+            return (arguments_key, state), tool_context
+
+        def lookup(cache_id: Hashable, tool_context: Any) -> Optional[Any]:
+            with lock:
+                entry = entries.get(cache_id)
+                if entry is None:
+                    return None
+                if entry.expires_at <= time.monotonic():
+                    del entries[cache_id]
+                    return None
+                entries.move_to_end(cache_id)
+            if tool_context is not None:
+                for k, v in entry.state_effects.items():
+                    tool_context.state[k] = copy.deepcopy(v)
+            return entry
+
+        def store(cache_id: Hashable, result: Any, effects: Dict[str, Any]):
+            with lock:
+                entries[cache_id] = _Entry(_copy(result), effects, time.monotonic() + ttl)
+                entries.move_to_end(cache_id)
+                while len(entries) > max_size:
+                    entries.popitem(last=False)
+
+        def delta(tool_context: Any) -> Dict[str, Any]:
+            return dict(tool_context.actions.state_delta) if tool_context is not None else {}
+
+        def effects_since(before: Dict[str, Any], tool_context: Any) -> Dict[str, Any]:
+            after = delta(tool_context)
+            return {k: copy.deepcopy(v) for k, v in after.items() if k not in before or before[k] is not v}
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache_id, tool_context = cache_key(args, kwargs)
+                entry = lookup(cache_id, tool_context)
+                if entry is not None:
+                    stats.hits += 1
+                    return _copy(entry.result)
+                before = delta(tool_context)
+                result = await func(*args, **kwargs)
+                store(cache_id, result, effects_since(before, tool_context))
+                return result
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                cache_id, tool_context = cache_key(args, kwargs)
+                entry = lookup(cache_id, tool_context)
+                if entry is not None:
+                    stats.hits += 1
+                    return _copy(entry.result)
+                before = delta(tool_context)
+                result = func(*args, **kwargs)
+                store(cache_id, result, effects_since(before, tool_context))
+                return result
+
+        wrapper.cache_clear = entries.clear
+        return wrapper
+
+    return decorator
@@ -0,0 +1,58 @@
+"""Per-tool call counters.
+
+Kept free of ``app.*`` imports so the agent package still loads under the
+ADK CLI; the app reads TOOL_STATS to export metrics.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    hits: int = 0
+    seconds: float = 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.calls if self.calls else 0.0
+
+
+# Per-tool counters, by tool name
+TOOL_STATS: Dict[str, ToolStats] = {}
+
+
+class ToolStatsPlugin(BasePlugin):
+    """Counts every tool call the runner makes, and the time it takes
+
+    Memoized tools add their cache hits to the same counters.
+    """
+
+    def __init__(self):
+        super().__init__(name="tool_stats")
+        # Start of each call in flight, by its ToolContext
+        self._started: Dict[int, float] = {}
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context) -> Optional[Dict[str, Any]]:
+        self._started[id(tool_context)] = time.perf_counter()
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result) -> Optional[Dict[str, Any]]:
+        self._finished(tool.name, tool_context)
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error) -> Optional[Dict[str, Any]]:
+        self._finished(tool.name, tool_context)
+        return None
+
+    def _finished(self, name: str, tool_context: Any):
+        # A failed call whose error became its response reaches after_tool_callback too
+        started = self._started.pop(id(tool_context), None)
+        if started is None:
+            return
+        stats = TOOL_STATS.setdefault(name, ToolStats())
+        stats.calls += 1
+        stats.seconds += time.perf_counter() - started
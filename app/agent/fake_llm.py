@@ -0,0 +1,179 @@
+"""Offline stand-in for the Gemini backend, for load tests and benchmarks.
+
+Set AGENT_MODEL_BACKEND=fake and every agent in the tree talks to FakeLlm
+instead: it opens live connections and answers each user turn after
+configurable delays, streams tokens at a fixed rate and can fail a share
+of turns on purpose. Given ``answered_by``, it also hands turns between
+agents with transfer_to_agent the way the manager model does.
+"""
+import asyncio
+import os
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Callable, List, Optional, Sequence
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.base_llm_connection import BaseLlmConnection
+from google.genai import types
+
+# Delay to open a live connection, before it can take the first turn
+FAKE_LLM_CONNECT_MS = float(os.getenv("FAKE_LLM_CONNECT_MS", "0"))
+# Delay before the first token of every answer
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+FAKE_LLM_RESPONSE_TOKENS = int(os.getenv("FAKE_LLM_RESPONSE_TOKENS", "60"))
+# Share of turns that fail with a dropped connection instead of answering
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+
+_WORDS = (
+    "data model mean median variance signal noise sample trend metric "
+    "insight query result chart value series cluster feature weight"
+).split()
+
+
+# How ADK presents other agents' turns in an agent's history
+_CONTEXT = "For context:"
+
+
+class FakeLlmFailure(ConnectionError):
+    """Injected model failure"""
+
+
+class FakeLlm(BaseLlm):
+    model: str = "fake-llm"
+    connect_ms: float = FAKE_LLM_CONNECT_MS
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND
+    response_tokens: int = FAKE_LLM_RESPONSE_TOKENS
+    failure_rate: float = FAKE_LLM_FAILURE_RATE
+    # The agent that should answer a prompt. A connection whose agent can
+    # transfer there calls transfer_to_agent after the usual latency instead.
+    answered_by: Optional[Callable[[str], str]] = None
+
+    def answer_tokens(self, prompt: str) -> List[str]:
+        tokens = [f"{word} " for word in f"Answer to: {prompt}".split()]
+        while len(tokens) < self.response_tokens:
+            tokens.append(f"{random.choice(_WORDS)} ")
+        return tokens[: max(self.response_tokens, 1)]
+
+    async def transfer(self, agent_name: str) -> LlmResponse:
+        await asyncio.sleep(self.latency_ms / 1000)
+        call = types.FunctionCall(name="transfer_to_agent", args={"agent_name": agent_name})
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+
+    async def stream_answer(self, prompt: str) -> AsyncGenerator[LlmResponse, None]:
+        """Partial token responses, then the full text, as the live API sends them"""
+        if random.random() < self.failure_rate:
+            raise FakeLlmFailure("Injected fake model failure")
+        await asyncio.sleep(self.latency_ms / 1000)
+        tokens = self.answer_tokens(prompt)
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for token in tokens:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=token)]), partial=True)
+            await asyncio.sleep(interval)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="".join(tokens))]))
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        prompt = user_text(llm_request.contents[-1]) if llm_request.contents else ""
+        final = None
+        async for response in self.stream_answer(prompt):
+            if response.partial and not stream:
+                continue
+            final = response
+            yield response
+        if final is not None:
+            final.turn_complete = True
+
+    @asynccontextmanager
+    async def connect(self, llm_request: LlmRequest):
+        await asyncio.sleep(self.connect_ms / 1000)
+        connection = FakeLlmConnection(self, transfer_targets(llm_request))
+        try:
+            yield connection
+        finally:
+            await connection.close()
+
+
+def transfer_targets(llm_request: LlmRequest) -> List[str]:
+    """The agents the request's transfer_to_agent declaration offers, as the model sees them"""
+    tools = llm_request.config.tools if llm_request.config else None
+    for tool in tools or []:
+        for declaration in getattr(tool, "function_declarations", None) or []:
+            if declaration.name == "transfer_to_agent":
+                schema = declaration.parameters_json_schema or {}
+                return schema.get("properties", {}).get("agent_name", {}).get("enum", [])
+    return []
+
+
+def user_text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return "".join(part.text or "" for part in content.parts)
+
+
+class FakeLlmConnection(BaseLlmConnection):
+    """Answers each user content sent over the live connection, one at a time
+
+    ``transfer_targets`` are the agents this connection's agent may hand a
+    turn to.
+    """
+
+    def __init__(self, llm: FakeLlm, transfer_targets: Sequence[str] = ()):
+        self.llm = llm
+        self.transfer_targets = transfer_targets
+        self._inbox: asyncio.Queue = asyncio.Queue()
+
+    async def send_history(self, history: List[types.Content]):
+        # Like the live API, only answer when the last turn is the user's, or
+        # a transfer handed it over. Other agents' turns read as "For
+        # context:" user text, so the prompt is the last user text before them.
+        if not history or history[-1].role != "user":
+            return
+        last = user_text(history[-1])
+        handed_over = "`transfer_to_agent` tool returned" in last or any(
+            part.function_response for part in history[-1].parts or []
+        )
+        if last.startswith(_CONTEXT) and not handed_over:
+            return
+        prompts = [content for content in history if content.role == "user" and user_text(content)]
+        prompts = [content for content in prompts if not user_text(content).startswith(_CONTEXT)]
+        self._inbox.put_nowait(prompts[-1] if prompts else history[-1])
+
+    async def send_content(self, content: types.Content):
+        # Tool responses carry nothing to answer; the runner handles the transfer
+        if content.parts and any(part.function_response for part in content.parts):
+            return
+        self._inbox.put_nowait(content)
+
+    async def send_realtime(self, blob: types.Blob):
+        pass
+
+    async def receive(self) -> AsyncGenerator[LlmResponse, None]:
+        while True:
+            content = await self._inbox.get()
+            if content is None:
+                return
+            prompt = user_text(content)
+            agent_name = self.llm.answered_by(prompt) if self.llm.answered_by else None
+            if agent_name in self.transfer_targets:
+                yield await self.llm.transfer(agent_name)
+                continue
+            async for response in self.llm.stream_answer(prompt):
+                yield response
+            yield LlmResponse(turn_complete=True)
+
+    async def close(self):
+        self._inbox.put_nowait(None)
+
+
+def install_fake_llm(agent: BaseAgent, llm: Optional[FakeLlm] = None) -> FakeLlm:
+    """Point an agent and all of its sub-agents at one FakeLlm"""
+    llm = llm or FakeLlm()
+    if isinstance(agent, LlmAgent):
+        agent.model = llm
+    for sub_agent in agent.sub_agents:
+        install_fake_llm(sub_agent, llm)
+    return llm
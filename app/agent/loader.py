@@ -0,0 +1,33 @@
+"""Builds the agent runtime off the event loop, once per process.
+
+Importing the agent stack and building the runner takes around a second.
+On the loop, or behind a lock the loop waits on, that would stall every
+request; here it runs in a thread and every caller awaits the same future.
+Kept free of ADK imports itself.
+"""
+import asyncio
+from typing import Optional
+
+_loading: Optional[asyncio.Future] = None
+
+
+def _load():
+    from app.agent.runtime import init_runtime
+
+    init_runtime()
+
+
+def _failed(future: asyncio.Future) -> bool:
+    return future.done() and (future.cancelled() or future.exception() is not None)
+
+
+async def runtime_ready():
+    """Wait until the agent runtime is built, starting the build if nothing has yet
+
+    A failed build is retried by the next caller.
+    """
+    global _loading
+    if _loading is None or _failed(_loading):
+        _loading = asyncio.ensure_future(asyncio.to_thread(_load))
+    # Shielded, so a caller that gives up doesn't cancel the build for the others
+    await asyncio.shield(_loading)
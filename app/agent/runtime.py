@@ -0,0 +1,193 @@
+import os
+import time
+from typing import Dict, List, Optional
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.run_config import RunConfig
+from google.adk.apps import App
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.events import Event
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService
+from google.genai import types
+
+from app.agent import APP_NAME
+from app.agent.analyst_agent.agent import root_agent
+from app.agent.analyst_agent.tools import TOOL_STATS, ToolStatsPlugin
+from app.agent.fake_llm import install_fake_llm
+from app.agent.session_service import create_session_service
+from app.utils.metrics import Counter, Gauge, Histogram
+
+# "gemini" for the real models, "fake" for the offline stand-in used in load tests
+AGENT_MODEL_BACKEND = os.getenv("AGENT_MODEL_BACKEND", "gemini")
+
+SESSION_START_SECONDS = Histogram(
+    "agent_session_start_seconds",
+    "Time to create or load an agent session and start its live run",
+    ("resume",),
+)
+
+# One runner and one session service per worker process. Every chat session
+# shares them instead of paying for its own InMemoryRunner.
+_runner: Optional["AgentRunner"] = None
+_session_service: Optional[BaseSessionService] = None
+
+# Set response modality to TEXT only
+RUN_CONFIG = RunConfig(
+    response_modalities=["TEXT"],
+    session_resumption=types.SessionResumptionConfig()
+)
+
+
+class AgentRunner(Runner):
+    """Runner whose next live run for a session can start at a chosen agent
+
+    ADK resumes whichever agent spoke last. A turn the pre-router sends
+    straight to a sub-agent starts the run there instead, within the same
+    agent tree, so its events are attributed as if the manager had
+    transferred the turn.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._start_agents: Dict[str, str] = {}
+
+    def start_next_run_at(self, session_id: str, agent_name: Optional[str]):
+        """Start the session's next live run at ``agent_name``; None restores ADK's choice"""
+        if agent_name is None:
+            self._start_agents.pop(session_id, None)
+            return
+        if self.agent.find_agent(agent_name) is None:
+            raise ValueError(f"Unknown agent: {agent_name}")
+        self._start_agents[session_id] = agent_name
+
+    def _find_agent_to_run(self, session, root_agent):
+        agent_name = self._start_agents.pop(session.id, None)
+        if agent_name is None:
+            return super()._find_agent_to_run(session, root_agent)
+        return root_agent.find_agent(agent_name)
+
+
+def init_runtime(session_service: Optional[BaseSessionService] = None) -> AgentRunner:
+    """Create the process-wide runner (idempotent)
+
+    The server builds it in a thread through app.agent.loader.runtime_ready.
+    """
+    global _runner, _session_service
+
+    if _runner is None:
+        if AGENT_MODEL_BACKEND == "fake":
+            install_fake_llm(root_agent)
+        _session_service = session_service or create_session_service()
+        # As Runner wraps a bare agent: App() itself rejects a name with spaces
+        app = App.model_construct(name=APP_NAME, root_agent=root_agent, plugins=[ToolStatsPlugin()])
+        _runner = AgentRunner(
+            app=app,
+            session_service=_session_service,
+            artifact_service=InMemoryArtifactService(),
+            memory_service=InMemoryMemoryService(),
+        )
+    return _runner
+
+
+def get_runner() -> AgentRunner:
+    return _runner or init_runtime()
+
+
+def get_session_service() -> BaseSessionService:
+    get_runner()
+    assert _session_service is not None
+    return _session_service
+
+
+async def start_agent_session(user_id: str, resume: bool = False, agent_name: Optional[str] = None):
+    """Starts an agent session on the shared runner
+
+    With ``resume``, a stored conversation for this id picks up where it left off.
+    ``agent_name`` picks the agent the live run starts at; by default ADK
+    resumes the one that spoke last.
+    """
+    started = time.perf_counter()
+    runner = get_runner()
+
+    session = None
+    if resume:
+        session = await runner.session_service.get_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=user_id,
+        )
+
+    # Create a Session
+    if session is None:
+        session = await runner.session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=user_id,
+        )
+
+    runner.start_next_run_at(session.id, agent_name)
+
+    # Create a LiveRequestQueue for this session
+    live_request_queue = LiveRequestQueue()
+
+    # Start agent session
+    live_events = runner.run_live(
+        session=session,
+        live_request_queue=live_request_queue,
+        run_config=RUN_CONFIG,
+    )
+    SESSION_START_SECONDS.observe(time.perf_counter() - started, resume=str(resume).lower())
+    return live_events, live_request_queue
+
+
+async def session_has_history(user_id: str) -> bool:
+    """Whether the user's session already holds a turn"""
+    session = await get_session_service().get_session(app_name=APP_NAME, user_id=user_id, session_id=user_id)
+    return session is not None and any(event.content for event in session.events)
+
+
+async def record_turn(user_id: str, text: str, answer_events: List[Event]):
+    """Append a turn answered without the model, e.g. from the response cache, to the session history
+
+    ``answer_events`` are stored like the runner stores a model turn's:
+    final events with content only. The user event shares their invocation id.
+    """
+    session_service = get_session_service()
+    session = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=user_id)
+    if session is None:
+        raise ValueError(f"Session {user_id} not found")
+
+    invocation_id = answer_events[0].invocation_id if answer_events else ""
+    user_event = Event(
+        invocation_id=invocation_id,
+        author="user",
+        content=types.Content(role="user", parts=[types.Part.from_text(text=text)]),
+    )
+    for event in [user_event, *answer_events]:
+        if event.content and not event.partial:
+            await session_service.append_event(session, event)
+
+
+async def end_agent_session(user_id: str):
+    """Drop the ADK sessions held for a user from the shared session service"""
+    session_service = get_session_service()
+    get_runner().start_next_run_at(user_id, None)
+    response = await session_service.list_sessions(app_name=APP_NAME, user_id=user_id)
+    for session in response.sessions:
+        await session_service.delete_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session.id,
+        )
+
+
+def _per_tool(value):
+    return lambda: {(name,): value(stats) for name, stats in TOOL_STATS.items()}
+
+
+Counter("agent_tool_calls_total", "Agent tool calls, cached or not", ("tool",), fn=_per_tool(lambda s: s.calls))
+Counter("agent_tool_cache_hits_total", "Agent tool calls answered from the memo cache", ("tool",), fn=_per_tool(lambda s: s.hits))
+Counter("agent_tool_seconds_total", "Time spent in agent tool calls", ("tool",), fn=_per_tool(lambda s: s.seconds))
+Gauge("agent_tool_cache_hit_ratio", "Share of agent tool calls answered from cache", ("tool",), fn=_per_tool(lambda s: s.hit_ratio))
@@ -0,0 +1,79 @@
+from typing import Optional, Set
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+from app.chat.store import CHAT_SESSION_STORE, ConversationStore, conversation_store
+from app.utils.logger import logger
+
+
+class PersistentSessionService(InMemorySessionService):
+    """In-memory session service that also keeps conversations in Postgres
+
+    Live sessions are served from memory as before. Finished events are
+    handed to the write-behind store, deleted sessions are only evicted
+    from memory, and a session not in memory is loaded back from the store.
+    """
+
+    def __init__(self, store: ConversationStore):
+        super().__init__()
+        self.store = store
+        self._recorded: Set[str] = set()
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        session = await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None:
+            return session
+
+        try:
+            stored = await self.store.load_session(app_name, user_id, session_id)
+        except Exception as e:
+            # Better a fresh conversation than none at all
+            logger.error(f"Failed to load conversation {session_id}: {e}")
+            return None
+        if stored is None:
+            return None
+        for event in stored.events:
+            # Replays the state deltas the events carried
+            self._update_session_state(stored, event)
+        self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = stored
+        self._recorded.add(session_id)
+        return await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session, event)
+        if event.partial:
+            return event
+
+        if session.id not in self._recorded:
+            # The row is written on the first event, so unused pre-warmed sessions leave none
+            self._recorded.add(session.id)
+            self.store.record_conversation(session.id, session.app_name, session.user_id)
+        self.store.append_event(session.id, event)
+        return event
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        """Evict from memory only; the stored conversation stays resumable"""
+        self._recorded.discard(session_id)
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def flush(self) -> None:
+        await self.store.flush()
+
+
+def create_session_service() -> BaseSessionService:
+    if CHAT_SESSION_STORE == "postgres":
+        return PersistentSessionService(conversation_store)
+    return InMemorySessionService()
@@ -0,0 +1,69 @@
+"""Request dependencies shared by the API routers"""
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal, get_db
+from app.models import User
+from app.utils.auth import verify_access_token
+from app.utils.token_cache import UserSnapshot, token_cache
+
+# Access tokens come in the Authorization header, never in the URL, where they
+# would end up in access logs, proxies and browser history
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def unauthorized(detail: str = "Invalid token") -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def user_for_token(token: str, db: AsyncSession) -> UserSnapshot:
+    """The user a JWT access token was issued to"""
+    # Hot path: a token already verified and resolved to its user
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
+    try:
+        payload = verify_access_token(token)
+    except Exception:
+        raise unauthorized()
+    user_email = payload.get("sub")
+    if user_email is None:
+        raise unauthorized()
+
+    result = await db.execute(select(User).where(User.email == user_email))
+    row = result.scalars().first()
+    if row is None:
+        raise unauthorized()
+    user = UserSnapshot.from_user(row)
+    # A token without exp is still cached, for TOKEN_CACHE_MAX_TTL at most
+    token_cache.put(token, user, payload.get("exp"))
+    return user
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> UserSnapshot:
+    """The user of the request's ``Authorization: Bearer`` token"""
+    if credentials is None:
+        raise unauthorized("Not authenticated")
+    return await user_for_token(credentials.credentials, db)
+
+
+async def optional_user(authorization: Optional[str]) -> Optional[UserSnapshot]:
+    """The user of an ``Authorization`` header value, or None without a bearer token
+
+    For routes that also serve anonymous clients, and for WebSockets, which
+    FastAPI's security schemes don't cover. The lookup uses its own short DB
+    session, so a long-lived stream doesn't hold a connection.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    async with AsyncSessionLocal() as db:
+        return await user_for_token(token, db)
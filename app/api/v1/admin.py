@@ -0,0 +1,93 @@
+from collections import Counter as Tally
+from http import HTTPStatus
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.utils.auth import is_admin_token
+from app.utils.profiler import PROFILER_MAX_SECONDS, Profile, ProfilerBusy, profiler
+from app.utils.response import success_response
+from app.utils.user_import import (
+    USER_IMPORT_MAX_BYTES,
+    ImportBusy,
+    ImportFormatError,
+    ImportTooLarge,
+    format_for,
+    import_users,
+)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Admin access required")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+def collapsed_response(profile: Profile) -> PlainTextResponse:
+    return PlainTextResponse(profile.collapsed(), headers=profile.headers())
+
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS),
+    interval_ms: Optional[float] = Query(None, gt=0),
+):
+    """Sample every thread of this worker for ``seconds``; returns collapsed stacks
+
+    Feed the body to flamegraph.pl or speedscope. The X-Profile-* headers
+    give the sample count and the sampler's own overhead.
+    """
+    try:
+        profile = await profiler.profile_process(seconds, interval_ms)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=str(e))
+    return collapsed_response(profile)
+
+
+@router.get("/profiles/{profile_id}")
+async def get_request_profile(profile_id: str):
+    """Collapsed stacks of a request profiled with X-Profile: 1, so far if it is still running"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Profile not found")
+    return collapsed_response(profile)
+
+
+@router.post("/users/import")
+async def import_users_endpoint(
+    request: Request,
+    format: Optional[Literal["jsonl", "csv"]] = Query(None),
+    on_conflict: Literal["skip", "update"] = Query("skip"),
+):
+    """Create users in bulk from JSON lines or CSV; returns a result for every row
+
+    Each row needs email, password and name (or username). The format
+    comes from ``format``, or else the Content-Type. Emails that already
+    exist are skipped, or with ``on_conflict=update`` get the new name
+    and password.
+    """
+    fmt = format or format_for(request.headers.get("content-type", ""))
+    if fmt is None:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, detail="Send text/csv or application/x-ndjson"
+        )
+    if int(request.headers.get("content-length") or 0) > USER_IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE, detail="Upload is too large")
+
+    try:
+        results = await import_users(await request.body(), fmt, on_conflict)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+    except ImportTooLarge as e:
+        raise HTTPException(status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ImportBusy as e:
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=str(e))
+
+    summary = Tally(result.status for result in results)
+    return success_response(
+        data={"summary": {"rows": len(results), **summary}, "rows": [result.to_dict() for result in results]},
+        message=f"Imported {summary['created'] + summary['updated']} of {len(results)} users",
+    )
@@ -4,24 +4,27 @@ from http import HTTPStatus
 
 # Third-party imports
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Local imports
-from app.db import SessionLocal
+from app.db import get_db
 from app.models import User
 from app.schemas import UserBase, UserCreate, UserLogin
-from app.utils.auth import hash_password, create_access_token, verify_password
+from app.utils.auth import create_access_token
+from app.utils.password_pool import PasswordPoolBusy, password_pool
+from app.utils.profiler import profiled
 from app.utils.response import success_response
 
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": "1"},
+    )
 
 
 @router.post("/print-user")
@@ -30,12 +33,17 @@ def print_user(user: UserBase):
     return {"message": f"Printed user {user.username} with email {user.email}"}
 
 @router.post("/create-user")
-def create_user(body: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == body.email).first()
+async def create_user(body: UserCreate, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).where(User.email == body.email))
+    db_user = result.scalars().first()
     if db_user:
         raise HTTPException(status_code=409, detail="User with this email already exists")
     
-    hashed_password = hash_password(body.password)
+    # bcrypt is CPU-bound; it runs in the dedicated password pool
+    try:
+        hashed_password = await password_pool.hash(body.password)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
     
     # Create new user
     new_user = User(
@@ -47,8 +55,8 @@ def create_user(body: UserCreate, db: Session = Depends(get_db)):
     
     # Save to database
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Generate token
     token = create_access_token({"sub": body.email})
@@ -71,12 +79,16 @@ def create_user(body: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/sign-in")
-def sign_in(body: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == body.email).first()
+async def sign_in(body: UserLogin, db: AsyncSession = Depends(get_db), _profile=Depends(profiled("sign_in"))):
+    result = await db.execute(select(User).where(User.email == body.email))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Invalid email or password")
 
-    password_verified = verify_password(body.password, user.password)  # type: ignore
+    try:
+        password_verified = await password_pool.verify(body.password, user.password)  # type: ignore
+    except PasswordPoolBusy:
+        raise password_pool_busy()
 
     if not password_verified:
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="Invalid email or password")
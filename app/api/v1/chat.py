@@ -1,106 +1,103 @@
 
+import asyncio
 import json
+import logging
+import os
+import time
 import uuid
-from typing import Dict, Any
-
-from fastapi import APIRouter, Request, HTTPException, Depends
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-
-from google.genai.types import Part, Content, Blob
-from google.adk.runners import InMemoryRunner
-from google.adk.agents import LiveRequestQueue
-from google.adk.agents.run_config import RunConfig
-from google.genai import types
-
-from app.agent.analyst_agent.agent import root_agent
-from app.db import SessionLocal
-from app.models import User
-from app.utils.auth import verify_access_token
+from typing import TYPE_CHECKING, Dict, Any, Optional
+
+from fastapi import APIRouter, Request, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.websockets import WebSocketState
+
+from app.chat.coalesce import SSE_COALESCE_WINDOW_MS, coalesce_partials
+from app.chat.pool import session_pool
+from app.chat.registry import WORKER_ID
+from app.chat.routing import CHAT_MAX_SESSIONS_PER_WORKER, SessionCapacityExceeded, WorkerDraining, session_router
+from app.agent import APP_NAME
+from app.api.dependencies import get_current_user, optional_user, user_for_token
+from app.chat.session import (
+    INBOUND_REJECTED,
+    InboundQueueFull,
+    LiveSession,
+    SendRateLimited,
+    SessionDraining,
+    new_live_session,
+)
+from app.chat.store import CHAT_HISTORY_PAGE_SIZE, CHAT_SESSION_STORE, conversation_store
+from app.db import get_db
+from app.models import Project, Workspace
+from app.utils.logger import log_event
+from app.utils.metrics import Counter, Histogram
+from app.utils.profiler import profiler, request_profile
+from app.utils.rate_limit import RateLimiter
 from app.utils.response import success_response, error_response
+from app.utils.token_cache import UserSnapshot
 
-router = APIRouter()
-
-# Store active sessions
-active_sessions: Dict[str, LiveRequestQueue] = {}
-
-APP_NAME = "Analyst Agent Chat"
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-async def get_current_user(token: str, db: Session = Depends(get_db)):
-    """Get current user from JWT token"""
-    try:
-        # You'll need to implement verify_access_token in your auth utils
-        payload = verify_access_token(token)
-        user_email = payload.get("sub")
-        if user_email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user = db.query(User).filter(User.email == user_email).first()
-        if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-
-async def start_agent_session(user_id: str):
-    """Starts an agent session"""
-    
-    # Create a Runner
-    runner = InMemoryRunner(
-        app_name=APP_NAME,
-        agent=root_agent,
-    )
-
-    # Create a Session
-    session = await runner.session_service.create_session(
-        app_name=APP_NAME,
-        user_id=user_id,
-    )
-
-    # Set response modality to TEXT only
-    run_config = RunConfig(
-        response_modalities=["TEXT"],
-        session_resumption=types.SessionResumptionConfig()
-    )
-
-    # Create a LiveRequestQueue for this session
-    live_request_queue = LiveRequestQueue()
-
-    # Start agent session
-    live_events = runner.run_live(
-        session=session,
-        live_request_queue=live_request_queue,
-        run_config=run_config,
-    )
-    return live_events, live_request_queue
+if TYPE_CHECKING:
+    from google.genai.types import Part
 
+router = APIRouter()
 
-async def agent_to_client_sse(live_events):
-    """Agent to client communication via SSE"""
+# Sessions whose live stream this worker owns
+active_sessions: Dict[str, LiveSession] = session_router.local
+
+# Token bucket for user messages (/send and WebSocket) per client IP; 0 turns it off.
+# Kept per worker: a client spreading requests over N workers gets up to N times
+# this. The per-session limit (CHAT_SEND_RATE_PER_USER) is enforced by the session.
+CHAT_SEND_RATE_PER_IP = float(os.getenv("CHAT_SEND_RATE_PER_IP", "5"))
+CHAT_SEND_BURST_PER_IP = float(os.getenv("CHAT_SEND_BURST_PER_IP", "20"))
+
+# Longest a reconnecting client waits for its old stream to let go of the session
+CHAT_TAKEOVER_TIMEOUT = float(os.getenv("CHAT_TAKEOVER_TIMEOUT", "5"))
+# Reconnect delay EventSource clients are told to use, instead of their ~3s default
+CHAT_SSE_RETRY_MS = int(os.getenv("CHAT_SSE_RETRY_MS", "1000"))
+
+ip_send_limiter = RateLimiter(CHAT_SEND_RATE_PER_IP, CHAT_SEND_BURST_PER_IP)
+
+STREAM_FIRST_FRAME_SECONDS = Histogram(
+    "chat_stream_first_frame_seconds",
+    "Time from opening an SSE stream to its first frame",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+SEND_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "chat_send_to_first_token_seconds", "Time from a user message being accepted to the first text frame of its answer"
+)
+INTER_TOKEN_GAP_SECONDS = Histogram(
+    "chat_inter_token_gap_seconds",
+    "Time between consecutive partial text frames of one answer",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+STREAM_FRAMES = Histogram(
+    "chat_stream_frames",
+    "Frames sent over one chat stream, by transport",
+    ("transport",),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+STREAM_REATTACHES = Counter(
+    "chat_stream_reattaches_total",
+    "SSE streams opened with Last-Event-ID, by whether every missed frame could be replayed",
+    ("replay",),
+)
+
+
+async def agent_to_client_messages(live_events):
+    """Turn live agent events into client messages"""
     async for event in live_events:
         # If the turn complete or interrupted, send it
         if event.turn_complete or event.interrupted:
-            message = {
+            yield {
                 "type": "control",
                 "turn_complete": event.turn_complete,
                 "interrupted": event.interrupted,
             }
-            yield f"data: {json.dumps(message)}\n\n"
-            print(f"[AGENT TO CLIENT]: {message}")
             continue
 
         # Read the Content and its first Part
-        part: Part = (
+        part: "Part" = (
             event.content and event.content.parts and event.content.parts[0]
         )
         if not part:
@@ -108,58 +105,245 @@ async def agent_to_client_sse(live_events):
 
         # If it's text and a partial text, send it
         if part.text and event.partial:
-            message = {
+            yield {
                 "type": "text",
                 "mime_type": "text/plain",
                 "data": part.text,
                 "partial": True
             }
-            yield f"data: {json.dumps(message)}\n\n"
-            print(f"[AGENT TO CLIENT]: text/plain: {message}")
         
         # If it's completed text, send it
         elif part.text and not event.partial:
-            message = {
+            yield {
                 "type": "text", 
                 "mime_type": "text/plain",
                 "data": part.text,
                 "partial": False
             }
+
+
+def message_event_type(message: Dict[str, Any]) -> str:
+    if message["type"] == "text":
+        return "partial_text" if message["partial"] else "text"
+    return message["type"]
+
+
+async def agent_to_client_outgoing(
+    live_events,
+    session: Optional[LiveSession] = None,
+    coalesce_window_ms: float = SSE_COALESCE_WINDOW_MS,
+):
+    """Client messages as sent on the wire, for either transport"""
+    messages = agent_to_client_messages(live_events)
+    if coalesce_window_ms > 0:
+        # Merge partial text into fewer frames; control and final frames go out at once
+        messages = coalesce_partials(messages, window_ms=coalesce_window_ms)
+
+    session_id = session.session_id if session else None
+    last_partial = None
+    async for message in messages:
+        if message["type"] == "text":
+            now = time.perf_counter()
+            if message["partial"] and last_partial is not None:
+                INTER_TOKEN_GAP_SECONDS.observe(now - last_partial)
+            last_partial = now if message["partial"] else None
+            if session is not None and session.turn_sent_at is not None:
+                SEND_TO_FIRST_TOKEN_SECONDS.observe(now - session.turn_sent_at)
+                session.turn_sent_at = None
+        else:
+            last_partial = None
+        if session is not None:
+            session.touch()
+            if message["type"] == "control":
+                # Turn over: the next queued user message may go to the agent
+                session.turn_finished()
+        yield message
+        log_event(message_event_type(message), "agent to client", session_id=session_id, payload=message)
+
+
+async def agent_to_client_sse(
+    live_events,
+    session: Optional[LiveSession] = None,
+    coalesce_window_ms: float = SSE_COALESCE_WINDOW_MS,
+):
+    """Agent to client communication via SSE
+
+    With a session, frames carry event ids and are kept for replay.
+    """
+    async for message in agent_to_client_outgoing(live_events, session, coalesce_window_ms):
+        if session is None:
             yield f"data: {json.dumps(message)}\n\n"
-            print(f"[AGENT TO CLIENT]: text/plain complete: {message}")
+        else:
+            yield session.record_frame(json.dumps(message))
 
 
-@router.get("/stream/{user_id}")
-async def chat_stream_endpoint(user_id: str):
-    """SSE endpoint for agent to client communication"""
-    
-    # Start agent session
-    live_events, live_request_queue = await start_agent_session(user_id)
+def check_send_rate(client_ip: str) -> Optional[float]:
+    """Seconds to wait when an IP is over its send rate, else None"""
+    allowed, retry_after = ip_send_limiter.check(client_ip)
+    if not allowed:
+        INBOUND_REJECTED.inc(reason="rate_limited")
+        return retry_after
+    return None
+
 
-    # Store the request queue for this user
-    active_sessions[user_id] = live_request_queue
+def too_many_messages(detail: str, retry_after: float = 1) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, round(retry_after)))},
+    )
 
-    print(f"Client {user_id} connected via SSE")
 
-    def cleanup():
-        live_request_queue.close()
-        if user_id in active_sessions:
-            del active_sessions[user_id]
-        print(f"Client {user_id} disconnected from SSE")
+def restarting(detail: str = "Server is restarting, please reconnect") -> HTTPException:
+    # Retry lands on another worker; the conversation resumes there
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
 
-    async def event_generator():
+
+def too_many_sessions() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many active chat sessions, please try again later",
+        headers={"Retry-After": "30"},
+    )
+
+
+async def check_conversation_owner(session_id: str, user: Optional[UserSnapshot]):
+    """404 unless ``user`` owns the stored conversation ``session_id`` would resume
+
+    Stored conversations are only resumed by their owner, so one started
+    anonymously can't be resumed at all. A new id becomes the caller's.
+    """
+    if CHAT_SESSION_STORE != "postgres":
+        return
+    conversation = await conversation_store.get_conversation(session_id)
+    if conversation is None:
+        if user is not None:
+            conversation_store.record_conversation(session_id, APP_NAME, session_id, user_id=user.id)
+        return
+    if user is None or conversation.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+async def attach_session(
+    session_id: str, user: Optional[UserSnapshot] = None, last_event_id: Optional[str] = None
+) -> Optional[LiveSession]:
+    """Pick up the session made by /start-session, or start one for direct connects
+
+    The session may be taken over from the worker that ran /start-session,
+    which resumes it from the store, so only its owner may do that. A
+    client reconnecting with ``last_event_id`` only gets the session back
+    while it is live here, streaming or detached within its grace window,
+    and may take it over from its own previous stream, which the server may
+    not have seen drop yet. Otherwise it gets None and no session is made.
+    """
+    session = active_sessions.get(session_id)
+    if session is not None and session.closed:
+        session = None
+    if session is None:
+        if last_event_id is not None:
+            return None
+        await check_conversation_owner(session_id, user)
         try:
-            async for data in agent_to_client_sse(live_events):
-                yield data
-        except Exception as e:
-            print(f"Error in SSE stream: {e}")
-            error_message = {
-                "type": "error",
-                "message": str(e)
-            }
-            yield f"data: {json.dumps(error_message)}\n\n"
-        finally:
-            cleanup()
+            session_router.check_capacity()
+            await session_router.claim(session_id)
+            session = await new_live_session(session_id)
+            await session_router.add(session)
+        except SessionCapacityExceeded:
+            raise too_many_sessions()
+        except WorkerDraining:
+            raise restarting()
+    elif session.streaming:
+        if last_event_id is None or not await session.take_over(CHAT_TAKEOVER_TIMEOUT):
+            raise HTTPException(status_code=409, detail="Session is already streaming")
+    session_router.attach(session)
+    return session
+
+
+@router.get("/stream/{user_id}")
+async def chat_stream_endpoint(user_id: str, request: Request, last_event_id: Optional[str] = None):
+    """SSE endpoint for agent to client communication
+
+    EventSource sends the last frame id back as Last-Event-ID when it
+    reconnects; a client opening a new EventSource passes ``last_event_id``.
+    Within CHAT_RECONNECT_GRACE the stream continues on the same live
+    session, starting with the frames the client missed; past it, or once
+    the session has ended, the reconnect gets 204, which stops EventSource
+    retrying. A stream the server ends closes with an ``end`` frame, whose
+    ``reconnect`` tells the client to open a new stream (on a draining
+    worker) or not. Resuming a stored conversation needs its owner's
+    ``Authorization: Bearer`` token.
+    """
+    opened = time.perf_counter()
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    user = await optional_user(request.headers.get("authorization"))
+    session = await attach_session(user_id, user, last_event_id)
+    if session is None:
+        log_event("stream_gone", "SSE reconnect to a session that has ended", session_id=user_id)
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    generation = session.stream_generation
+    missed, complete = session.frames_since(last_event_id) if last_event_id else ([], True)
+    if last_event_id:
+        STREAM_REATTACHES.inc(replay="complete" if complete else "gap")
+    # X-Profile: 1 from an admin profiles the stream and the session's own tasks
+    profile = request_profile(request.headers, "chat_stream")
+
+    log_event("stream_connected", "Client connected via SSE", session_id=user_id, replayed=len(missed))
+
+    async def cleanup(ended: bool):
+        if session.stream_generation != generation:
+            # A reconnect took the session over; it lives on there
+            log_event("stream_replaced", "SSE stream replaced by a reconnect", session_id=user_id)
+            return
+        if ended:
+            await session_router.remove(session)
+        else:
+            await session_router.detach(session)
+        log_event("stream_disconnected", "Client disconnected from SSE", session_id=user_id)
+
+    def end_frame() -> Optional[str]:
+        if session.stream_generation != generation:
+            # Taken over: the reconnect carries on the stream
+            return None
+        end = {"type": "end", "reconnect": session.draining}
+        return f"data: {json.dumps(end)}\n\n"
+
+    async def event_generator():
+        frames = 0
+        # False when the client went away, so the session waits for a reconnect
+        ended = False
+        with profiler.sampling(profile, session.background_tasks):
+            try:
+                yield f"retry: {CHAT_SSE_RETRY_MS}\n\n"
+                if not complete:
+                    # Older than the replay buffer, or from a session rebuilt since
+                    gap = {"type": "resync", "message": "Some messages were missed; reload the conversation history"}
+                    yield f"data: {json.dumps(gap)}\n\n"
+                for frame in missed:
+                    yield frame
+                async for data in agent_to_client_sse(session.events(), session=session):
+                    if frames == 0:
+                        STREAM_FIRST_FRAME_SECONDS.observe(time.perf_counter() - opened)
+                    frames += 1
+                    yield data
+                # The session ended or drained, or a reconnect took it over
+                ended = True
+                end = end_frame()
+                if end is not None:
+                    yield end
+            except Exception as e:
+                ended = True
+                log_event("stream_error", f"Error in SSE stream: {e}", session_id=user_id, level=logging.ERROR)
+                error_message = {
+                    "type": "error",
+                    "message": str(e)
+                }
+                yield f"data: {json.dumps(error_message)}\n\n"
+                end = end_frame()
+                if end is not None:
+                    yield end
+            finally:
+                STREAM_FRAMES.observe(frames, transport="sse")
+                await cleanup(ended)
 
     return StreamingResponse(
         event_generator(),
@@ -168,7 +352,8 @@ async def chat_stream_endpoint(user_id: str):
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control"
+            "Access-Control-Allow-Headers": "Cache-Control",
+            **({"X-Profile-Id": profile.id} if profile is not None else {}),
         }
     )
 
@@ -177,58 +362,194 @@ async def chat_stream_endpoint(user_id: str):
 async def send_message_endpoint(user_id: str, request: Request):
     """HTTP endpoint for client to agent communication"""
 
-    # Get the live request queue for this user
-    live_request_queue = active_sessions.get(user_id)
-    if not live_request_queue:
-        return error_response(message="Session not found. Please connect to the stream first.")
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = check_send_rate(client_ip)
+    if retry_after is not None:
+        raise too_many_messages("Rate limit exceeded, slow down", retry_after)
 
     # Parse the message
     message = await request.json()
     mime_type = message.get("mime_type", "text/plain")
     data = message.get("data", "")
+    # "cache": false always asks the model, skipping the response cache
+    use_cache = message.get("cache", True) is not False
 
     try:
-        # Send the message to the agent (text only)
+        # Send the message to the agent (text only), on whichever worker owns it
         if mime_type == "text/plain":
-            content = Content(role="user", parts=[Part.from_text(text=data)])
-            live_request_queue.send_content(content=content)
-            print(f"[CLIENT TO AGENT]: {data}")
+            if not await session_router.send_text(user_id, data, use_cache):
+                return error_response(message="Session not found. Please connect to the stream first.")
+            log_event("client_to_agent", "client to agent", session_id=user_id, payload=data)
         else:
             return error_response(message=f"Mime type not supported: {mime_type}. Only text/plain is supported.")
 
         return success_response(message="Message sent successfully")
         
+    except SendRateLimited as e:
+        raise too_many_messages(str(e), e.retry_after)
+    except InboundQueueFull:
+        raise too_many_messages("Too many messages waiting for the agent")
+    except SessionDraining as e:
+        raise restarting(str(e))
+    except asyncio.TimeoutError:
+        log_event("send_error", "Worker holding the session did not answer", session_id=user_id, level=logging.ERROR)
+        raise HTTPException(status_code=504, detail="The worker holding this session did not answer")
     except Exception as e:
-        print(f"Error sending message: {e}")
+        log_event("send_error", f"Error sending message: {e}", session_id=user_id, level=logging.ERROR)
         return error_response(message=f"Failed to send message: {str(e)}")
 
 
+@router.websocket("/ws/{session_id}")
+async def chat_websocket_endpoint(websocket: WebSocket, session_id: str):
+    """WebSocket endpoint carrying both directions on one connection"""
+    await websocket.accept()
+    try:
+        user = await optional_user(websocket.headers.get("authorization"))
+        session = await attach_session(session_id, user)
+    except HTTPException as e:
+        await websocket.send_text(json.dumps({"type": "error", "message": str(e.detail)}))
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    log_event("stream_connected", "Client connected via WebSocket", session_id=session_id)
+
+    frames = 0
+
+    async def agent_to_client():
+        nonlocal frames
+        async for message in agent_to_client_outgoing(session.events(), session=session):
+            await websocket.send_text(json.dumps(message))
+            frames += 1
+
+    client_ip = websocket.client.host if websocket.client else "unknown"
+
+    async def send_error(text: str):
+        await websocket.send_text(json.dumps({"type": "error", "message": text}))
+
+    async def client_to_agent():
+        while True:
+            # A bad frame gets an error back; it doesn't end the connection
+            try:
+                message = json.loads(await websocket.receive_text())
+                if not isinstance(message, dict):
+                    raise TypeError("expected a JSON object")
+                mime_type = message.get("mime_type", "text/plain")
+                data = message.get("data", "")
+                if not isinstance(data, str):
+                    raise TypeError("data must be a string")
+            except KeyError:
+                # receive_text on a binary frame
+                await send_error("Invalid message: expected a text frame")
+                continue
+            except (ValueError, TypeError) as e:
+                await send_error(f"Invalid message: {e}")
+                continue
+            if mime_type != "text/plain":
+                await send_error(f"Mime type not supported: {mime_type}. Only text/plain is supported.")
+                continue
+            if check_send_rate(client_ip) is not None:
+                await send_error("Rate limit exceeded, slow down")
+                continue
+            # No per-message HTTP round trip; same bounded inbound queue as /send
+            try:
+                session.send_text(data, message.get("cache", True) is not False)
+            except SendRateLimited as e:
+                await send_error(str(e))
+                continue
+            except InboundQueueFull:
+                await send_error("Too many messages waiting for the agent")
+                continue
+            except SessionDraining as e:
+                await send_error(str(e))
+                continue
+            log_event("client_to_agent", "client to agent", session_id=session_id, payload=data)
+
+    tasks = [asyncio.create_task(agent_to_client()), asyncio.create_task(client_to_agent())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                log_event("stream_error", f"Error in WebSocket stream: {error}", session_id=session_id, level=logging.ERROR)
+    finally:
+        for task in tasks:
+            task.cancel()
+        STREAM_FRAMES.observe(frames, transport="websocket")
+        await session_router.remove(session)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
+        log_event("stream_disconnected", "Client disconnected from WebSocket", session_id=session_id)
+
+
+async def conversation_owner(body: Dict[str, Any], db: AsyncSession):
+    """Resolve the optional token and project_id a session is started with
+
+    Returns (user_id, project_id); the project must belong to the user.
+    """
+    token = body.get("token")
+    project_id = body.get("project_id")
+    if token is None:
+        if project_id is not None:
+            raise HTTPException(status_code=401, detail="A token is required to start a project session")
+        return None, None
+
+    user = await user_for_token(token, db)
+    if project_id is None:
+        return user.id, None
+
+    try:
+        project_id = uuid.UUID(str(project_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid project_id")
+    result = await db.execute(
+        select(Project.id)
+        .join(Workspace, Project.workspace_id == Workspace.id)
+        .where(Project.id == project_id, Workspace.owner_id == user.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return user.id, project_id
+
+
 @router.post("/start-session")
-async def start_session_endpoint(request: Request):
-    """Start a new chat session"""
+async def start_session_endpoint(request: Request, db: AsyncSession = Depends(get_db)):
+    """Start a new chat session, optionally tied to a user and project"""
     body = await request.json()
-    
-    # Generate a unique session ID
-    session_id = str(uuid.uuid4())
-    
+    owner_id, project_id = await conversation_owner(body, db)
+
     try:
-        # Pre-initialize the session
-        _, live_request_queue = await start_agent_session(session_id)
-        
-        # Store it temporarily (will be replaced when streaming starts)
-        active_sessions[session_id] = live_request_queue
+        session_router.check_capacity()
+    except SessionCapacityExceeded:
+        raise too_many_sessions()
+    except WorkerDraining:
+        raise restarting()
+
+    try:
+        # Take a pre-warmed session; /stream picks this same session up
+        session = await session_pool.acquire()
+        session_id = session.session_id
+        await session_router.add(session)
+        if owner_id is not None:
+            conversation_store.record_conversation(
+                session_id, APP_NAME, session_id, user_id=owner_id, project_id=project_id
+            )
         
         return success_response(
             data={
                 "session_id": session_id,
                 "stream_url": f"/api/v1/chat/stream/{session_id}",
-                "send_url": f"/api/v1/chat/send/{session_id}"
+                "send_url": f"/api/v1/chat/send/{session_id}",
+                "ws_url": f"/api/v1/chat/ws/{session_id}"
             },
             message="Chat session started successfully"
         )
         
+    except SessionCapacityExceeded:
+        raise too_many_sessions()
+    except WorkerDraining:
+        raise restarting()
     except Exception as e:
-        print(f"Error starting session: {e}")
+        log_event("start_session_error", f"Error starting session: {e}", level=logging.ERROR)
         return error_response(message=f"Failed to start session: {str(e)}")
 
 
@@ -236,29 +557,73 @@ async def start_session_endpoint(request: Request):
 async def end_session_endpoint(user_id: str):
     """End a chat session"""
     
-    live_request_queue = active_sessions.get(user_id)
-    if not live_request_queue:
-        return error_response(message="Session not found")
-    
     try:
-        # Close the session
-        live_request_queue.close()
-        del active_sessions[user_id]
+        # Close the session, on whichever worker owns it
+        if not await session_router.end(user_id):
+            return error_response(message="Session not found")
         
         return success_response(message="Session ended successfully")
         
     except Exception as e:
-        print(f"Error ending session: {e}")
+        log_event("end_session_error", f"Error ending session: {e}", session_id=user_id, level=logging.ERROR)
         return error_response(message=f"Failed to end session: {str(e)}")
 
 
+@router.get("/history/{session_id}")
+async def get_history(
+    session_id: str,
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=CHAT_HISTORY_PAGE_SIZE),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    """Stored events of a conversation the caller owns, oldest first
+
+    Pass next_cursor back as ``after`` to read the following page. The last
+    page ends with the events this worker has yet to write, with a null
+    cursor; once written they are read again with one.
+    """
+    conversation = await conversation_store.get_conversation(session_id)
+    if conversation is None or conversation.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    page = await conversation_store.load_events(session_id, after=after, limit=limit)
+    next_cursor = page[-1][0] if len(page) == limit else None
+    if next_cursor is None:
+        stored = {event.id for _, event in page}
+        buffered = [event for event in conversation_store.buffered_events(session_id) if event.id not in stored]
+        page += [(None, event) for event in buffered[:limit - len(page)]]
+    return success_response(
+        data={
+            "session_id": session_id,
+            "events": [
+                {"cursor": cursor, **event.model_dump(mode="json", exclude_none=True, by_alias=True)}
+                for cursor, event in page
+            ],
+            "next_cursor": next_cursor
+        },
+        message="Conversation history retrieved successfully"
+    )
+
+
 @router.get("/active-sessions")
 async def get_active_sessions():
-    """Get list of active chat sessions"""
+    """Get list of chat sessions active on this worker"""
+    now = time.monotonic()
     return success_response(
         data={
+            "worker_id": WORKER_ID,
             "active_sessions": list(active_sessions.keys()),
-            "count": len(active_sessions)
+            "count": len(active_sessions),
+            "max_sessions": CHAT_MAX_SESSIONS_PER_WORKER,
+            "estimated_bytes_per_session": session_router.memory_per_session(),
+            "sessions": [
+                {
+                    "session_id": session.session_id,
+                    "streaming": session.streaming,
+                    "age_seconds": round(now - session.created_at, 1),
+                    "idle_seconds": round(now - session.last_activity, 1)
+                }
+                for session in active_sessions.values()
+            ]
         },
         message="Active sessions retrieved successfully"
     )
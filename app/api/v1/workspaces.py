@@ -0,0 +1,170 @@
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.api.dependencies import get_current_user
+from app.db import get_db
+from app.models import Project, Workspace
+from app.schemas import ProjectCreate, WorkspaceCreate
+from app.utils.pagination import API_DEFAULT_PAGE_SIZE, API_MAX_PAGE_SIZE, keyset_page
+from app.utils.response import cursor_paginated_response, success_response
+from app.utils.token_cache import UserSnapshot
+from app.utils.workspace_tree_cache import workspace_tree_cache
+
+router = APIRouter()
+
+# Sort keys of the list endpoints; the indexes on (fk, name, id) serve them
+WORKSPACE_ORDER = (Workspace.name, Workspace.id)
+PROJECT_ORDER = (Project.name, Project.id)
+
+
+def workspace_data(workspace: Workspace):
+    return {"id": str(workspace.id), "name": workspace.name, "owner_id": str(workspace.owner_id)}
+
+
+def project_data(project: Project):
+    return {"id": str(project.id), "name": project.name, "workspace_id": str(project.workspace_id)}
+
+
+async def load_workspace_tree(db: AsyncSession, user: UserSnapshot):
+    """The user with all their workspaces and projects, serialized
+
+    One query for the workspaces, then one selectin IN query for their
+    projects per 500 workspaces, so the count grows by one per 500.
+    """
+    result = await db.execute(
+        select(Workspace)
+        .where(Workspace.owner_id == user.id)
+        .order_by(*WORKSPACE_ORDER)
+        .options(selectinload(Workspace.projects))
+    )
+    workspaces = result.scalars().all()
+    tree = {
+        "user": {"id": str(user.id), "name": user.name, "email": user.email},
+        "workspaces": [
+            {
+                **workspace_data(workspace),
+                "projects": [
+                    project_data(project)
+                    for project in sorted(workspace.projects, key=lambda p: (p.name, p.id))
+                ],
+            }
+            for workspace in workspaces
+        ],
+    }
+    return tree, [workspace.id for workspace in workspaces]
+
+
+async def owned_workspace(workspace_id: uuid.UUID, user: UserSnapshot, db: AsyncSession) -> Workspace:
+    """The workspace, if ``user`` owns it; anyone else gets the same 404 as for a missing one"""
+    workspace = await db.get(Workspace, workspace_id)
+    if workspace is None or workspace.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    return workspace
+
+
+@router.get("/workspaces")
+async def list_workspaces(
+    cursor: Optional[str] = None,
+    limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE),
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """The user's workspaces by name; pass meta.pagination.next_cursor back as ``cursor``"""
+    query = select(Workspace).where(Workspace.owner_id == user.id)
+    workspaces, next_cursor = await keyset_page(db, query, WORKSPACE_ORDER, cursor, limit)
+    return cursor_paginated_response(
+        [workspace_data(workspace) for workspace in workspaces],
+        next_cursor,
+        limit,
+        message="Workspaces retrieved successfully",
+    )
+
+
+@router.post("/workspaces")
+async def create_workspace(
+    body: WorkspaceCreate,
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    workspace = Workspace(id=uuid.uuid4(), name=body.name, owner_id=user.id)
+    db.add(workspace)
+    await db.commit()
+    return success_response(data=workspace_data(workspace), message="Workspace created successfully")
+
+
+# Declared before /workspaces/{workspace_id} so "tree" is not read as an id
+@router.get("/workspaces/tree")
+async def get_workspace_tree(user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """The user's workspaces with their projects, cached per user until one is written"""
+    tree = workspace_tree_cache.get(user.id)
+    if tree is None:
+        generation = workspace_tree_cache.generation
+        tree, workspace_ids = await load_workspace_tree(db, user)
+        workspace_tree_cache.put(user.id, tree, workspace_ids, generation)
+    return success_response(data=tree, message="Workspace tree retrieved successfully")
+
+
+@router.get("/workspaces/{workspace_id}")
+async def get_workspace(
+    workspace_id: uuid.UUID,
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    workspace = await owned_workspace(workspace_id, user, db)
+    return success_response(data=workspace_data(workspace), message="Workspace retrieved successfully")
+
+
+@router.get("/workspaces/{workspace_id}/projects")
+async def list_projects(
+    workspace_id: uuid.UUID,
+    cursor: Optional[str] = None,
+    limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE),
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """A workspace's projects by name; pass meta.pagination.next_cursor back as ``cursor``"""
+    await owned_workspace(workspace_id, user, db)
+    query = select(Project).where(Project.workspace_id == workspace_id)
+    projects, next_cursor = await keyset_page(db, query, PROJECT_ORDER, cursor, limit)
+    return cursor_paginated_response(
+        [project_data(project) for project in projects],
+        next_cursor,
+        limit,
+        message="Projects retrieved successfully",
+    )
+
+
+@router.post("/workspaces/{workspace_id}/projects")
+async def create_project(
+    workspace_id: uuid.UUID,
+    body: ProjectCreate,
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    await owned_workspace(workspace_id, user, db)
+    project = Project(id=uuid.uuid4(), name=body.name, workspace_id=workspace_id)
+    db.add(project)
+    await db.commit()
+    return success_response(data=project_data(project), message="Project created successfully")
+
+
+@router.get("/projects/{project_id}")
+async def get_project(
+    project_id: uuid.UUID,
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await db.execute(
+        select(Project)
+        .join(Workspace, Project.workspace_id == Workspace.id)
+        .where(Project.id == project_id, Workspace.owner_id == user.id)
+    )
+    project = result.scalar_one_or_none()
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return success_response(data=project_data(project), message="Project retrieved successfully")
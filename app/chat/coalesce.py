@@ -0,0 +1,80 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# Partial text is merged for up to this long before it is sent; 0 turns coalescing off
+SSE_COALESCE_WINDOW_MS = float(os.getenv("SSE_COALESCE_WINDOW_MS", "0"))
+# Pending partial text is sent early once it reaches this many bytes
+SSE_COALESCE_MAX_BYTES = int(os.getenv("SSE_COALESCE_MAX_BYTES", "2048"))
+
+_DONE = object()
+
+
+def is_partial_text(message: Dict[str, Any]) -> bool:
+    return message.get("type") == "text" and bool(message.get("partial"))
+
+
+async def coalesce_partials(
+    messages: AsyncIterator[Dict[str, Any]],
+    window_ms: float = SSE_COALESCE_WINDOW_MS,
+    max_bytes: int = SSE_COALESCE_MAX_BYTES,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Merge runs of partial text messages into one per window or byte threshold
+
+    Every other message (control, final text, errors) flushes the pending
+    partial text and is passed through immediately, in order.
+    """
+    loop = asyncio.get_running_loop()
+    out: asyncio.Queue = asyncio.Queue()
+    window = window_ms / 1000
+    pending: List[str] = []
+    pending_bytes = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+    def flush():
+        nonlocal pending, pending_bytes, timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        if pending:
+            out.put_nowait({
+                "type": "text",
+                "mime_type": "text/plain",
+                "data": "".join(pending),
+                "partial": True
+            })
+            pending, pending_bytes = [], 0
+
+    async def pump():
+        nonlocal pending_bytes, timer
+        try:
+            async for message in messages:
+                if is_partial_text(message):
+                    pending.append(message["data"])
+                    pending_bytes += len(message["data"].encode())
+                    if pending_bytes >= max_bytes:
+                        flush()
+                    elif timer is None:
+                        timer = loop.call_later(window, flush)
+                else:
+                    flush()
+                    out.put_nowait(message)
+            flush()
+            out.put_nowait(_DONE)
+        except Exception as e:
+            flush()
+            out.put_nowait(e)
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            item = await out.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        task.cancel()
+        if timer is not None:
+            timer.cancel()
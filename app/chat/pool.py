@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from app.chat.session import LiveSession, new_live_session
+from app.utils.logger import logger
+
+# Number of sessions kept ready per worker; 0 disables pre-warming. Each holds an
+# open model connection, which counts against the backend's concurrent session quota.
+POOL_SIZE = int(os.getenv("CHAT_SESSION_POOL_SIZE", "2"))
+# Pooled sessions older than this are replaced, so a connection the backend
+# dropped without telling us isn't handed out
+POOL_MAX_AGE = float(os.getenv("CHAT_SESSION_POOL_MAX_AGE", "300"))
+
+
+class SessionPool:
+    """Keeps a few live sessions built ahead of time and refills in the background
+
+    Pooled sessions are primed: their live run has started and opened its
+    model connection, so the first turn doesn't wait for connection setup.
+    The session reaper prunes the ones whose run ended or that are older
+    than ``max_age``, and the pool builds their replacements.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, max_age: float = POOL_MAX_AGE):
+        self.size = size
+        self.max_age = max_age
+        self._ready: Deque[LiveSession] = deque()
+        self._wanted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    async def start(self):
+        if self.size > 0 and self._task is None:
+            self._wanted.set()
+            self._task = asyncio.create_task(self._refill())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._ready:
+            await self._ready.popleft().close()
+
+    async def acquire(self) -> LiveSession:
+        """Hand out a ready session, or build one inline if the pool is empty
+
+        An inline session is primed too, so its connection opens while the
+        client connects to /stream.
+        """
+        self._wanted.set()
+        while self._ready:
+            session = self._ready.popleft()
+            if self._usable(session):
+                return session
+            await session.close()
+        session = await new_live_session()
+        session.prime()
+        return session
+
+    def _usable(self, session: LiveSession) -> bool:
+        # Not if its connection dropped while it waited in the pool, or it may have
+        return not session.run_ended() and time.monotonic() - session.created_at <= self.max_age
+
+    async def prune(self) -> int:
+        """Close the pooled sessions that are no longer usable; returns how many"""
+        kept: Deque[LiveSession] = deque()
+        stale = []
+        for session in self._ready:
+            (kept if self._usable(session) else stale).append(session)
+        if not stale:
+            return 0
+        self._ready = kept
+        self._wanted.set()
+        for session in stale:
+            await session.close()
+        return len(stale)
+
+    async def _refill(self):
+        while True:
+            await self._wanted.wait()
+            self._wanted.clear()
+            while len(self._ready) < self.size:
+                try:
+                    session = await new_live_session()
+                    session.prime()
+                    self._ready.append(session)
+                except Exception as e:
+                    logger.error(f"Failed to pre-warm chat session: {e}")
+                    self._wanted.set()
+                    await asyncio.sleep(1)
+                    break
+
+
+session_pool = SessionPool()
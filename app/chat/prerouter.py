@@ -0,0 +1,117 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.chat.response_cache import normalize_prompt
+from app.utils.metrics import Counter
+
+# Send clearly classified turns straight to a sub-agent; off means every turn goes to the manager
+CHAT_PREROUTER_ENABLED = os.getenv("CHAT_PREROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+# The winning agent needs at least this score, and this much more than the runner-up
+CHAT_PREROUTER_MIN_SCORE = float(os.getenv("CHAT_PREROUTER_MIN_SCORE", "1.5"))
+CHAT_PREROUTER_MIN_MARGIN = float(os.getenv("CHAT_PREROUTER_MIN_MARGIN", "1.0"))
+
+# Route name used for turns left to the manager agent
+MANAGER = "manager"
+
+PREROUTER_DECISIONS = Counter("chat_prerouter_decisions_total", "User turns by where the pre-router sent them", ("route",))
+
+# Takes normalized user text, returns a score per agent name
+Scorer = Callable[[str], Dict[str, float]]
+
+
+@dataclass(frozen=True)
+class KeywordRule:
+    agent: str
+    pattern: "re.Pattern[str]"
+    weight: float = 1.0
+
+
+def rule(agent: str, pattern: str, weight: float = 1.0) -> KeywordRule:
+    return KeywordRule(agent, re.compile(pattern), weight)
+
+
+class KeywordScorer:
+    """Adds up the weights of the regex rules that match, per agent"""
+
+    def __init__(self, rules: Iterable[KeywordRule]):
+        self.rules = list(rules)
+
+    def __call__(self, text: str) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+        for r in self.rules:
+            if r.pattern.search(text):
+                scores[r.agent] = scores.get(r.agent, 0.0) + r.weight
+        return scores
+
+
+DEFAULT_RULES = [
+    rule("funny_nerd", r"\bjokes?\b", 2.0),
+    rule("funny_nerd", r"\bmake me laugh\b", 2.0),
+    rule("funny_nerd", r"\bfunny\b", 1.5),
+    rule("funny_nerd", r"\bpuns?\b", 1.5),
+    rule("funny_nerd", r"\bhumou?r(ous)?\b", 1.0),
+    rule("funny_nerd", r"\b(cheer me up|laugh)\b", 1.0),
+    rule("chat_agent", r"^(what|who) (is|are|was|were)\b", 1.5),
+    rule("chat_agent", r"^(explain|define|describe)\b", 1.5),
+    rule("chat_agent", r"\b(explain|definition of|meaning of)\b", 1.0),
+    rule("chat_agent", r"\bdifference between\b", 2.0),
+    rule("chat_agent", r"\b(vs\.?|versus)\b", 1.5),
+    rule("chat_agent", r"^how (does|do|is|are|can|should)\b", 1.2),
+    rule("chat_agent", r"\bwhat does .+ mean\b", 1.5),
+    rule("chat_agent", r"\btell me about\b", 1.0),
+    rule(
+        "chat_agent",
+        r"\b(correlation|regression|median|mean|mode|variance|standard deviation|p-value|"
+        r"hypothesis|dashboard|machine learning|statistics?|kpi|data visuali[sz]ation)s?\b",
+        1.0,
+    ),
+]
+
+
+class PreRouter:
+    """Picks the sub-agent for a user turn without asking the manager model
+
+    Scores from every scorer are added up. A turn is routed only when one
+    agent clearly wins; anything else returns None and is left to the agent
+    the conversation is at, as without the pre-router.
+    """
+
+    def __init__(
+        self,
+        scorers: Iterable[Tuple[Scorer, float]] = (),
+        min_score: float = CHAT_PREROUTER_MIN_SCORE,
+        min_margin: float = CHAT_PREROUTER_MIN_MARGIN,
+    ):
+        self.scorers: List[Tuple[Scorer, float]] = list(scorers)
+        self.min_score = min_score
+        self.min_margin = min_margin
+
+    def add_scorer(self, scorer: Scorer, weight: float = 1.0):
+        self.scorers.append((scorer, weight))
+
+    def scores(self, text: str) -> Dict[str, float]:
+        text = normalize_prompt(text)
+        totals: Dict[str, float] = {}
+        for scorer, weight in self.scorers:
+            for agent, score in scorer(text).items():
+                totals[agent] = totals.get(agent, 0.0) + weight * score
+        return totals
+
+    def classify(self, text: str) -> Optional[str]:
+        ranked = sorted(self.scores(text).items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < self.min_score:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < self.min_margin:
+            return None
+        return ranked[0][0]
+
+    def route(self, text: str) -> Optional[str]:
+        """classify(), counted in the decision metric"""
+        agent = self.classify(text)
+        PREROUTER_DECISIONS.inc(route=agent or MANAGER)
+        return agent
+
+
+pre_router = PreRouter([(KeywordScorer(DEFAULT_RULES), 1.0)])
@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from app.db import DATABASE_URL, asyncpg_dsn
+from app.utils.logger import logger
+
+# Identifies this worker process in the registry and on the message bus
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+# "memory" for a single worker, "postgres" to route across workers and nodes;
+# app.server defaults to postgres when it runs more than one worker
+CHAT_BACKEND = os.getenv("CHAT_SESSION_BACKEND", "memory")
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD = 7999
+# How often the bus checks its LISTEN connection still answers, and how long it waits for the answer
+CHAT_BUS_PING_INTERVAL = float(os.getenv("CHAT_BUS_PING_INTERVAL", "10"))
+CHAT_BUS_PING_TIMEOUT = float(os.getenv("CHAT_BUS_PING_TIMEOUT", "5"))
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class SessionRegistry(ABC):
+    """Maps a chat session id to the worker that owns its live stream"""
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def register(self, session_id: str, worker_id: str):
+        ...
+
+    @abstractmethod
+    async def unregister(self, session_id: str, worker_id: str):
+        ...
+
+    @abstractmethod
+    async def owner(self, session_id: str) -> Optional[str]:
+        ...
+
+
+class MessageBus(ABC):
+    """Delivers chat messages to the worker that owns a session"""
+
+    @abstractmethod
+    async def start(self, handler: MessageHandler):
+        ...
+
+    async def stop(self):
+        pass
+
+    @property
+    def healthy(self) -> bool:
+        """Whether messages routed to this worker reach it"""
+        return True
+
+    @abstractmethod
+    async def publish(self, worker_id: str, message: Dict[str, Any]):
+        ...
+
+
+class InProcessSessionRegistry(SessionRegistry):
+    def __init__(self):
+        self._owners: Dict[str, str] = {}
+
+    async def register(self, session_id: str, worker_id: str):
+        self._owners[session_id] = worker_id
+
+    async def unregister(self, session_id: str, worker_id: str):
+        if self._owners.get(session_id) == worker_id:
+            del self._owners[session_id]
+
+    async def owner(self, session_id: str) -> Optional[str]:
+        return self._owners.get(session_id)
+
+
+class InProcessMessageBus(MessageBus):
+    def __init__(self):
+        self._handler: Optional[MessageHandler] = None
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+
+    async def publish(self, worker_id: str, message: Dict[str, Any]):
+        if self._handler is not None and worker_id == WORKER_ID:
+            await self._handler(message)
+
+
+class PostgresSessionRegistry(SessionRegistry):
+    """Session routes kept in the chat_session_routes table"""
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._pool = None
+
+    async def start(self):
+        import asyncpg
+
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+
+    async def stop(self):
+        if self._pool is not None:
+            # Routes owned by this worker die with it
+            await self._pool.execute("DELETE FROM chat_session_routes WHERE worker_id = $1", WORKER_ID)
+            await self._pool.close()
+            self._pool = None
+
+    async def register(self, session_id: str, worker_id: str):
+        await self._pool.execute(
+            """
+            INSERT INTO chat_session_routes (session_id, worker_id, updated_at)
+            VALUES ($1, $2, now())
+            ON CONFLICT (session_id) DO UPDATE
+            SET worker_id = EXCLUDED.worker_id, updated_at = EXCLUDED.updated_at
+            """,
+            session_id,
+            worker_id,
+        )
+
+    async def unregister(self, session_id: str, worker_id: str):
+        await self._pool.execute(
+            "DELETE FROM chat_session_routes WHERE session_id = $1 AND worker_id = $2",
+            session_id,
+            worker_id,
+        )
+
+    async def owner(self, session_id: str) -> Optional[str]:
+        return await self._pool.fetchval(
+            "SELECT worker_id FROM chat_session_routes WHERE session_id = $1",
+            session_id,
+        )
+
+
+def channel_for(worker_id: str) -> str:
+    """LISTEN channel of a worker (identifiers are capped at 63 bytes)"""
+    return "chat_" + hashlib.sha1(worker_id.encode()).hexdigest()[:24]
+
+
+class PostgresMessageBus(MessageBus):
+    """LISTEN/NOTIFY bus: each worker listens on its own channel
+
+    The listening connection is watched: when it closes, or stops answering
+    pings, a new one is opened with backoff and LISTENs again. NOTIFYs sent
+    while it was down are lost; the sender's wait for a reply times out.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._conn = None
+        self._pool = None
+        self._handler: Optional[MessageHandler] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._lost = asyncio.Event()
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler):
+        import asyncpg
+
+        self._handler = handler
+        # The listening connection stays idle; NOTIFYs go out through a pool
+        await self._listen()
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        if self._conn is not None:
+            self._conn.remove_termination_listener(self._on_terminated)
+            await self._conn.close()
+            self._conn = None
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def publish(self, worker_id: str, message: Dict[str, Any]):
+        payload = json.dumps(message)
+        if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+            raise ValueError("Message too large to route to another worker")
+        await self._pool.execute("SELECT pg_notify($1, $2)", channel_for(worker_id), payload)
+
+    @property
+    def healthy(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def _listen(self):
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        conn.add_termination_listener(self._on_terminated)
+        await conn.add_listener(channel_for(WORKER_ID), self._on_notify)
+        self._conn = conn
+
+    def _on_terminated(self, connection):
+        self._lost.set()
+
+    async def _supervise(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), CHAT_BUS_PING_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._lost.clear()
+            if self.healthy:
+                try:
+                    await asyncio.wait_for(self._conn.execute("SELECT 1"), CHAT_BUS_PING_TIMEOUT)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Chat message bus connection stopped answering: {e}")
+            await self._reconnect()
+
+    async def _reconnect(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.remove_termination_listener(self._on_terminated)
+            conn.terminate()
+        delay = 0.5
+        while self._conn is None:
+            try:
+                await self._listen()
+            except Exception as e:
+                logger.error(f"Chat message bus reconnect failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(30.0, delay * 2)
+        logger.info("Chat message bus reconnected")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        task = asyncio.create_task(self._dispatch(payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, payload: str):
+        try:
+            await self._handler(json.loads(payload))
+        except Exception as e:
+            logger.error(f"Failed to deliver routed chat message: {e}")
+
+
+def create_backend() -> Tuple[SessionRegistry, MessageBus]:
+    """Build the registry and bus selected by CHAT_SESSION_BACKEND"""
+    if CHAT_BACKEND == "postgres":
+        dsn = asyncpg_dsn(DATABASE_URL or "")
+        return PostgresSessionRegistry(dsn), PostgresMessageBus(dsn)
+    if CHAT_BACKEND == "memory":
+        return InProcessSessionRegistry(), InProcessMessageBus()
+    raise ValueError(f"Unknown CHAT_SESSION_BACKEND: {CHAT_BACKEND}")
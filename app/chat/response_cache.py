@@ -0,0 +1,166 @@
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from app.utils.metrics import Counter, Gauge
+
+if TYPE_CHECKING:
+    from google.adk.events import Event
+
+# Cached answers expire after this many seconds
+CHAT_RESPONSE_CACHE_TTL = float(os.getenv("CHAT_RESPONSE_CACHE_TTL", "86400"))
+# Total size of cached prompts and answers; 0 turns the cache off
+CHAT_RESPONSE_CACHE_MAX_BYTES = int(os.getenv("CHAT_RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Only answers given entirely by this agent are cached
+CHAT_RESPONSE_CACHE_AGENT = os.getenv("CHAT_RESPONSE_CACHE_AGENT", "chat_agent")
+# Size of the partial text frames a cached answer is replayed in
+REPLAY_CHUNK_CHARS = 64
+
+RESPONSE_CACHE_HITS = Counter("chat_response_cache_hits_total", "User messages answered from the response cache")
+RESPONSE_CACHE_MISSES = Counter("chat_response_cache_misses_total", "Cacheable user messages sent to the model")
+RESPONSE_CACHE_SAVED_SECONDS = Counter(
+    "chat_response_cache_saved_seconds_total", "Model time the cached answers took when first generated"
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_prompt(text: str) -> str:
+    """Fold case, width and whitespace so trivially different wordings share an entry"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+@dataclass
+class CachedResponse:
+    text: str
+    latency: float
+    expires_at: float
+    size: int
+
+
+class ResponseCache:
+    """LRU cache of agent answers keyed on normalized prompt and agent name
+
+    Only opening messages are cached and looked up: the key carries no
+    history, so an answer that depends on earlier turns can't be shared.
+    Bounded by total bytes; entries also expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_bytes: int = CHAT_RESPONSE_CACHE_MAX_BYTES, ttl: float = CHAT_RESPONSE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, prompt: str, agent: str) -> Optional[CachedResponse]:
+        key = (normalize_prompt(prompt), agent)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            RESPONSE_CACHE_MISSES.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        RESPONSE_CACHE_HITS.inc()
+        RESPONSE_CACHE_SAVED_SECONDS.inc(entry.latency)
+        return entry
+
+    def put(self, prompt: str, agent: str, text: str, latency: float):
+        key = (normalize_prompt(prompt), agent)
+        size = len(key[0].encode()) + len(text.encode())
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        self._drop(key)
+        self._entries[key] = CachedResponse(text, latency, time.monotonic() + self.ttl, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _drop(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+
+@dataclass
+class TurnRecorder:
+    """Collects the answer to one user message so it can be cached when the turn completes"""
+
+    prompt: str
+    started_at: float = field(default_factory=time.monotonic)
+    texts: List[str] = field(default_factory=list)
+    cacheable: bool = True
+
+    def observe(self, event) -> bool:
+        """Feed one agent event; returns True once the turn is over"""
+        if event.interrupted:
+            return True
+        if event.turn_complete:
+            if self.cacheable and self.texts:
+                response_cache.put(
+                    self.prompt, CHAT_RESPONSE_CACHE_AGENT, "".join(self.texts), time.monotonic() - self.started_at
+                )
+            return True
+
+        part = event.content and event.content.parts and event.content.parts[0]
+        if part and part.text and not event.partial:
+            if event.author == CHAT_RESPONSE_CACHE_AGENT:
+                self.texts.append(part.text)
+            else:
+                self.cacheable = False
+        return False
+
+
+def replay_events(text: str, author: str = CHAT_RESPONSE_CACHE_AGENT, invocation_id: str = "") -> List["Event"]:
+    """A cached answer as the partial, final and turn_complete events the model would send"""
+    from google.adk.events import Event
+    from google.genai.types import Content, Part
+
+    events = [
+        Event(
+            invocation_id=invocation_id,
+            author=author,
+            partial=True,
+            content=Content(role="model", parts=[Part.from_text(text=text[i:i + REPLAY_CHUNK_CHARS])]),
+        )
+        for i in range(0, len(text), REPLAY_CHUNK_CHARS)
+    ]
+    events.append(
+        Event(invocation_id=invocation_id, author=author, partial=False, content=Content(role="model", parts=[Part.from_text(text=text)]))
+    )
+    events.append(Event(invocation_id=invocation_id, author=author, turn_complete=True, interrupted=False))
+    return events
+
+
+response_cache = ResponseCache()
+
+
+def _hit_ratio() -> float:
+    hits = RESPONSE_CACHE_HITS.get()
+    total = hits + RESPONSE_CACHE_MISSES.get()
+    return hits / total if total else 0.0
+
+
+Gauge("chat_response_cache_entries", "Answers held in the response cache", fn=lambda: len(response_cache))
+Gauge("chat_response_cache_bytes", "Bytes of prompts and answers held in the response cache", fn=lambda: response_cache.size)
+Gauge("chat_response_cache_hit_ratio", "Share of cacheable user messages answered from cache", fn=_hit_ratio)
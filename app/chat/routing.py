@@ -0,0 +1,284 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from app.chat.pool import session_pool
+from app.chat.registry import WORKER_ID, MessageBus, SessionRegistry, create_backend
+from app.chat.session import InboundQueueFull, LiveSession, SendRateLimited, SessionDraining
+from app.utils.logger import log_event, logger
+from app.utils.metrics import Counter, Gauge, process_rss_bytes
+
+# Sessions handed out by /start-session but never streamed are dropped after this
+CHAT_PENDING_SESSION_TTL = float(os.getenv("CHAT_PENDING_SESSION_TTL", "120"))
+# Streamed sessions with no traffic in either direction are dropped after this
+CHAT_SESSION_IDLE_TTL = float(os.getenv("CHAT_SESSION_IDLE_TTL", "1800"))
+CHAT_REAPER_INTERVAL = float(os.getenv("CHAT_REAPER_INTERVAL", "30"))
+# Live sessions one worker will hold before answering 429
+CHAT_MAX_SESSIONS_PER_WORKER = int(os.getenv("CHAT_MAX_SESSIONS_PER_WORKER", "1000"))
+# On shutdown, how long streams get to finish their turns before they are cut off
+CHAT_DRAIN_TIMEOUT = float(os.getenv("CHAT_DRAIN_TIMEOUT", "30"))
+# How long a session outlives its dropped SSE stream, waiting for the client to
+# reconnect; 0 closes it with the stream
+CHAT_RECONNECT_GRACE = float(os.getenv("CHAT_RECONNECT_GRACE", "30"))
+
+# How long a send or end routed to another worker waits for that worker's answer
+CHAT_ROUTE_REPLY_TIMEOUT = float(os.getenv("CHAT_ROUTE_REPLY_TIMEOUT", "5"))
+
+SESSIONS_REAPED = Counter("chat_sessions_reaped_total", "Idle chat sessions closed by the reaper", ("state",))
+
+
+class SessionCapacityExceeded(Exception):
+    """Raised when this worker already holds its maximum number of sessions"""
+
+
+class WorkerDraining(Exception):
+    """Raised for new sessions once this worker has started shutting down"""
+
+
+# Refusals of a routed send, raised again on the worker the client sent it to
+_REJECTIONS = {error.__name__: error for error in (InboundQueueFull, SessionDraining, SendRateLimited)}
+
+
+def _rejection(reply: Dict[str, Any]) -> Optional[Exception]:
+    error = _REJECTIONS.get(reply.get("error"))
+    if error is SendRateLimited:
+        return SendRateLimited(reply["detail"], reply["retry_after"])
+    if error is not None:
+        return error(reply["detail"])
+    return None
+
+
+class SessionRouter:
+    """Holds this worker's live sessions and routes messages for the rest
+
+    Sessions are registered under the worker that owns their live stream.
+    A send or end for a session held elsewhere goes over the message bus
+    to the owning worker, which answers whether it took the message, so a
+    refusal there (full queue, rate limit, drain) reaches the client too.
+    """
+
+    def __init__(self, registry: SessionRegistry, bus: MessageBus):
+        self.registry = registry
+        self.bus = bus
+        self.local: Dict[str, LiveSession] = {}
+        self.baseline_rss = 0
+        self.draining = False
+        self._reaper: Optional[asyncio.Task] = None
+        # Detached sessions' expiry timers, by session id
+        self._grace: Dict[str, asyncio.Task] = {}
+        # Routed messages waiting for the owning worker's reply, by request id
+        self._replies: Dict[str, asyncio.Future] = {}
+
+    async def start(self):
+        await self.registry.start()
+        await self.bus.start(self._on_bus_message)
+        self.baseline_rss = process_rss_bytes()
+        self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def stop(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        await session_pool.stop()
+        for session in list(self.local.values()):
+            await self.remove(session)
+        await self.bus.stop()
+        await self.registry.stop()
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        return self.local.get(session_id)
+
+    def check_capacity(self):
+        if self.draining:
+            raise WorkerDraining("Server is restarting, please reconnect")
+        if len(self.local) >= CHAT_MAX_SESSIONS_PER_WORKER:
+            raise SessionCapacityExceeded("Too many active chat sessions on this worker")
+
+    def memory_per_session(self) -> int:
+        """Rough estimate: process growth since startup spread over the live sessions"""
+        if not self.local:
+            return 0
+        return max(0, process_rss_bytes() - self.baseline_rss) // len(self.local)
+
+    async def add(self, session: LiveSession):
+        try:
+            self.check_capacity()
+        except SessionCapacityExceeded:
+            await session.close()
+            raise
+        session.created_at = session.last_activity = time.monotonic()
+        self.local[session.session_id] = session
+        await self.registry.register(session.session_id, WORKER_ID)
+
+    async def drain(self, timeout: float = CHAT_DRAIN_TIMEOUT):
+        """Take no new sessions, let streams finish their turns, then close what is left
+
+        A drained stream ends with a frame telling the client to open a new
+        stream, which lands on another worker and resumes the conversation.
+        Pooled sessions are closed, as nobody will be handed them.
+        """
+        self.draining = True
+        await session_pool.stop()
+        for session in list(self.local.values()):
+            if session.streaming:
+                session.drain()
+            else:
+                await self.remove(session)
+
+        deadline = time.monotonic() + timeout
+        while self.local and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.local:
+            logger.warning(f"Drain timed out; cutting off {len(self.local)} chat session(s)")
+        for session in list(self.local.values()):
+            await self.remove(session)
+
+    def attach(self, session: LiveSession) -> int:
+        """A client stream picks the session up; returns the stream's generation"""
+        grace = self._grace.pop(session.session_id, None)
+        if grace is not None:
+            grace.cancel()
+        return session.attach_stream()
+
+    async def detach(self, session: LiveSession):
+        """The client's stream dropped: keep the session CHAT_RECONNECT_GRACE seconds for it to come back
+
+        The live run keeps going; what the agent says meanwhile waits in the
+        session for the next stream.
+        """
+        kept = CHAT_RECONNECT_GRACE > 0 and not self.draining and not session.closed
+        if not kept or self.local.get(session.session_id) is not session:
+            await self.remove(session)
+            return
+        session.streaming = False
+        session.detached_at = time.monotonic()
+        self._grace[session.session_id] = asyncio.create_task(self._expire(session, session.detached_at))
+
+    async def _expire(self, session: LiveSession, detached_at: float):
+        await asyncio.sleep(CHAT_RECONNECT_GRACE)
+        if session.detached_at == detached_at:
+            self._grace.pop(session.session_id, None)
+            SESSIONS_REAPED.inc(state="detached")
+            log_event(
+                "session_reaped", "Closed chat session nobody reconnected to", session_id=session.session_id, state="detached"
+            )
+            await self.remove(session)
+
+    async def remove(self, session: LiveSession):
+        """Close a local session and drop its route"""
+        grace = self._grace.get(session.session_id)
+        if grace is not None and grace is not asyncio.current_task():
+            self._grace.pop(session.session_id).cancel()
+        if self.local.get(session.session_id) is session:
+            del self.local[session.session_id]
+            await self.registry.unregister(session.session_id, WORKER_ID)
+        await session.close()
+
+    async def claim(self, session_id: str):
+        """Take a session id over from whichever worker holds it now"""
+        owner = await self.registry.owner(session_id)
+        if owner is not None and owner != WORKER_ID:
+            await self.bus.publish(owner, {"action": "end", "session_id": session_id})
+
+    async def send_text(self, session_id: str, text: str, use_cache: bool = True) -> bool:
+        """Deliver user text to a session wherever it lives"""
+        return await self._route({"action": "send", "session_id": session_id, "data": text, "cache": use_cache})
+
+    async def end(self, session_id: str) -> bool:
+        return await self._route({"action": "end", "session_id": session_id})
+
+    async def _route(self, message: Dict[str, Any]) -> bool:
+        """Deliver here or on the owning worker; False if no worker holds the session
+
+        Raises what the session's send_text raised, wherever it ran, and
+        asyncio.TimeoutError if the owner doesn't answer in time.
+        """
+        session_id = message["session_id"]
+        if session_id in self.local:
+            return await self._deliver(message)
+
+        owner = await self.registry.owner(session_id)
+        if owner is None:
+            return False
+        request_id = uuid.uuid4().hex
+        reply = self._replies[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            await self.bus.publish(owner, {**message, "reply_to": WORKER_ID, "request_id": request_id})
+            answer = await asyncio.wait_for(reply, CHAT_ROUTE_REPLY_TIMEOUT)
+        finally:
+            self._replies.pop(request_id, None)
+        error = _rejection(answer)
+        if error is not None:
+            raise error
+        return answer["delivered"]
+
+    async def reap(self):
+        """Close sessions that were never streamed or have gone idle, and stale pooled ones"""
+        pooled = await session_pool.prune()
+        if pooled:
+            SESSIONS_REAPED.inc(pooled, state="pooled")
+        for session in list(self.local.values()):
+            ttl = CHAT_SESSION_IDLE_TTL if session.streaming else CHAT_PENDING_SESSION_TTL
+            if session.idle_for() > ttl:
+                state = "streaming" if session.streaming else "pending"
+                SESSIONS_REAPED.inc(state=state)
+                log_event("session_reaped", "Closed idle chat session", session_id=session.session_id, state=state)
+                await self.remove(session)
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(CHAT_REAPER_INTERVAL)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Chat session reaper failed: {e}")
+
+    async def _on_bus_message(self, message: Dict[str, Any]):
+        if message["action"] == "reply":
+            reply = self._replies.get(message["request_id"])
+            if reply is not None and not reply.done():
+                reply.set_result(message)
+            return
+
+        answer: Dict[str, Any] = {}
+        try:
+            answer["delivered"] = await self._deliver(message)
+        except tuple(_REJECTIONS.values()) as e:
+            answer.update(delivered=False, error=type(e).__name__, detail=str(e))
+            answer["retry_after"] = getattr(e, "retry_after", None)
+        if "reply_to" in message:
+            await self.bus.publish(message["reply_to"], {"action": "reply", "request_id": message["request_id"], **answer})
+
+    async def _deliver(self, message: Dict[str, Any]) -> bool:
+        session = self.local.get(message["session_id"])
+        if session is None:
+            logger.warning(f"Routed message for unknown session {message['session_id']}")
+            return False
+
+        if message["action"] == "send":
+            session.send_text(message["data"], message.get("cache", True))
+        elif message["action"] == "end":
+            await self.remove(session)
+        return True
+
+
+session_router = SessionRouter(*create_backend())
+
+Gauge("chat_active_sessions", "Live chat sessions held by this worker", fn=lambda: len(session_router.local))
+Gauge(
+    "chat_streaming_sessions",
+    "Sessions on this worker with a client attached over SSE or WebSocket",
+    fn=lambda: sum(session.streaming for session in session_router.local.values()),
+)
+Gauge(
+    "chat_inbound_queue_depth",
+    "User messages waiting for the agent, summed over this worker's sessions",
+    fn=lambda: sum(len(session.inbound) for session in session_router.local.values()),
+)
+Gauge(
+    "chat_inbound_queue_depth_max",
+    "Deepest inbound queue of any session on this worker",
+    fn=lambda: max((len(session.inbound) for session in session_router.local.values()), default=0),
+)
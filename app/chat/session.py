@@ -0,0 +1,401 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncGenerator, AsyncIterator, Deque, List, Optional, Tuple
+
+from app.chat.prerouter import CHAT_PREROUTER_ENABLED, pre_router
+from app.chat.response_cache import CHAT_RESPONSE_CACHE_AGENT, TurnRecorder, replay_events, response_cache
+from app.utils.logger import log_event
+from app.utils.metrics import Counter
+from app.utils.rate_limit import TokenBucket
+
+if TYPE_CHECKING:
+    from google.adk.agents import LiveRequestQueue
+
+# Token bucket for user messages per session (/send and WebSocket); 0 turns it off.
+# Checked on the worker that owns the session, so it holds however many workers there are.
+CHAT_SEND_RATE_PER_USER = float(os.getenv("CHAT_SEND_RATE_PER_USER", "1"))
+CHAT_SEND_BURST_PER_USER = float(os.getenv("CHAT_SEND_BURST_PER_USER", "5"))
+# User messages a session may hold while a turn is in flight
+CHAT_INBOUND_QUEUE_SIZE = int(os.getenv("CHAT_INBOUND_QUEUE_SIZE", "8"))
+# What a full queue does with a new message: "reject" it or "drop_oldest" to make room
+CHAT_INBOUND_OVERFLOW = os.getenv("CHAT_INBOUND_OVERFLOW", "reject")
+# Longest wait for turn_complete before the next queued message is sent anyway
+CHAT_TURN_TIMEOUT = float(os.getenv("CHAT_TURN_TIMEOUT", "120"))
+# Recent SSE frames kept per session, replayed to a client reconnecting with Last-Event-ID
+CHAT_REPLAY_BUFFER_FRAMES = int(os.getenv("CHAT_REPLAY_BUFFER_FRAMES", "256"))
+
+INBOUND_REJECTED = Counter(
+    "chat_inbound_messages_rejected_total", "User messages refused before reaching the agent", ("reason",)
+)
+INBOUND_DROPPED = Counter("chat_inbound_messages_dropped_total", "Queued user messages dropped to make room")
+
+_END = object()
+# _agent when the connection is missing turns or failed to open, so the next turn reopens it
+_STALE = object()
+
+
+@dataclass
+class _Detach:
+    """Ends the events() consumer of this stream generation, when another stream took over"""
+
+    generation: int
+
+
+class InboundQueueFull(Exception):
+    """Raised when a session already holds CHAT_INBOUND_QUEUE_SIZE pending messages"""
+
+
+class SessionDraining(Exception):
+    """Raised for messages sent to a session that is finishing up before shutdown"""
+
+
+class SendRateLimited(Exception):
+    """Raised when a session's messages exceed CHAT_SEND_RATE_PER_USER"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _send_bucket() -> Optional[TokenBucket]:
+    if CHAT_SEND_RATE_PER_USER <= 0:
+        return None
+    return TokenBucket(CHAT_SEND_RATE_PER_USER, CHAT_SEND_BURST_PER_USER)
+
+
+@dataclass
+class LiveSession:
+    """A started agent session: its live event stream and request queue
+
+    User messages wait in a bounded inbound queue and are forwarded to the
+    LiveRequestQueue one turn at a time, so a flooding client can't pile
+    unbounded work onto the model. An opening message with a cached answer
+    never reaches the model; the answer is recorded in the session history
+    and replayed into the session's events. Later messages may depend on
+    the conversation so far and always go to the model.
+
+    The session holds one live connection at a time. Turns the pre-router
+    can classify skip the manager: unless the connection's run is already
+    at that sub-agent, it is reopened to start there. Other turns go to
+    whichever agent the run is at, as they would without the pre-router.
+
+    SSE frames are numbered ``<epoch>.<n>`` and the last
+    CHAT_REPLAY_BUFFER_FRAMES are kept. A client that reconnects with
+    Last-Event-ID gets the ones it missed. The epoch is new for every
+    LiveSession, so ids from a session rebuilt elsewhere never match.
+    """
+
+    session_id: str
+    live_events: AsyncGenerator[Any, None]
+    live_request_queue: "LiveRequestQueue"
+    created_at: float = field(default_factory=time.monotonic)
+    last_activity: float = field(default_factory=time.monotonic)
+    streaming: bool = False
+    closed: bool = False
+    # Set on shutdown: no new messages; the stream ends once accepted ones are answered
+    draining: bool = False
+    # (text, use_cache, perf_counter() when it was sent)
+    inbound: Deque[Tuple[str, bool, float]] = field(default_factory=deque)
+    # When the user sent the message of the turn in flight, until its first token goes out
+    turn_sent_at: Optional[float] = None
+    # When the client's stream dropped, while the session waits for it to reconnect
+    detached_at: Optional[float] = None
+    # Bumped for every stream attached, so a stream that was taken over leaves the session alone
+    stream_generation: int = 0
+    epoch: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    frame_id: int = 0
+    replay: Deque[Tuple[int, str]] = field(default_factory=lambda: deque(maxlen=CHAT_REPLAY_BUFFER_FRAMES))
+    _send_rate: Optional[TokenBucket] = field(default_factory=_send_bucket)
+    _pending: asyncio.Event = field(default_factory=asyncio.Event)
+    _turn_idle: asyncio.Event = field(default_factory=asyncio.Event)
+    # Set while no one is reading events(); _reader is the generation that is
+    _released: asyncio.Event = field(default_factory=asyncio.Event)
+    _reader: Optional[int] = None
+    _feeder: Optional[asyncio.Task] = None
+    _outbox: asyncio.Queue = field(default_factory=asyncio.Queue)
+    _pump: Optional[asyncio.Task] = None
+    _turn: Optional[TurnRecorder] = None
+    # The agent the connection's run is at, from the events it sends; None until known
+    _agent: Any = None
+    # Whether the conversation already holds a turn; None until looked up
+    _has_context: Optional[bool] = None
+
+    def __post_init__(self):
+        self._turn_idle.set()
+        self._released.set()
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self.last_activity
+
+    def send_text(self, text: str, use_cache: bool = True):
+        """Queue user text for the agent, applying the rate limit and overflow policy
+
+        ``use_cache=False`` sends it to the model even when a cached answer exists.
+        """
+        if self.draining:
+            raise SessionDraining("Server is restarting, reconnect to continue")
+        if self._send_rate is not None and not self._send_rate.allow():
+            INBOUND_REJECTED.inc(reason="rate_limited")
+            raise SendRateLimited("Rate limit exceeded, slow down", self._send_rate.retry_after())
+        if len(self.inbound) >= CHAT_INBOUND_QUEUE_SIZE:
+            if CHAT_INBOUND_OVERFLOW == "drop_oldest":
+                self.inbound.popleft()
+                INBOUND_DROPPED.inc()
+            else:
+                INBOUND_REJECTED.inc(reason="queue_full")
+                raise InboundQueueFull("Too many messages waiting for the agent")
+
+        self.inbound.append((text, use_cache, time.perf_counter()))
+        self._pending.set()
+        self.touch()
+        if self._feeder is None:
+            self._feeder = asyncio.create_task(self._feed())
+
+    def background_tasks(self) -> List[asyncio.Task]:
+        """Tasks working for this session outside the stream's own task"""
+        return [task for task in (self._pump, self._feeder) if task is not None]
+
+    def turn_finished(self):
+        """Called when the agent completes or is interrupted, releasing the next message"""
+        self._turn_idle.set()
+        self._end_if_drained()
+
+    def drain(self):
+        """Answer the turn in flight and the messages already queued, then end the event stream"""
+        self.draining = True
+        self._end_if_drained()
+
+    def _end_if_drained(self):
+        if self.draining and self._turn_idle.is_set() and not self.inbound:
+            self._outbox.put_nowait(_END)
+
+    def attach_stream(self) -> int:
+        """A client stream starts reading; returns its generation"""
+        self.stream_generation += 1
+        self.streaming = True
+        self.detached_at = None
+        self.touch()
+        return self.stream_generation
+
+    async def take_over(self, timeout: float) -> bool:
+        """End the stream reading events() now, for a client reconnecting before it noticed the drop
+
+        Events already queued ahead go to the old stream first; they are in
+        the replay buffer for the new one. False if the old stream didn't
+        let go within ``timeout``, e.g. stuck writing to a dead socket.
+        """
+        old = self.stream_generation
+        # The old stream's cleanup sees this and leaves the session to the new one
+        self.stream_generation += 1
+        self._outbox.put_nowait(_Detach(old))
+        try:
+            await asyncio.wait_for(self._released.wait(), timeout)
+        except asyncio.TimeoutError:
+            # The old stream stays; the _Detach is ignored when it gets there
+            self.stream_generation = old
+            return False
+        return True
+
+    def record_frame(self, data: str) -> str:
+        """An SSE frame for ``data`` with the next event id, kept for replay"""
+        self.frame_id += 1
+        frame = f"id: {self.epoch}.{self.frame_id}\ndata: {data}\n\n"
+        self.replay.append((self.frame_id, frame))
+        return frame
+
+    def frames_since(self, last_event_id: str) -> Tuple[List[str], bool]:
+        """Buffered frames after ``last_event_id``, and whether they cover everything missed"""
+        epoch, _, number = last_event_id.partition(".")
+        if epoch != self.epoch or not number.isdigit():
+            return [], False
+        last = int(number)
+        frames = [frame for frame_id, frame in self.replay if frame_id > last]
+        complete = last >= self.frame_id or (bool(self.replay) and self.replay[0][0] <= last + 1)
+        return frames, complete
+
+    def prime(self):
+        """Start the live run now, so its model connection opens before the first message
+
+        Events the run yields meanwhile wait in the outbox for a stream.
+        """
+        if self._pump is None:
+            self._pump = asyncio.create_task(self._pump_live_events(self.live_events))
+
+    def run_ended(self) -> bool:
+        """Whether a primed live run has already stopped, e.g. its connection failed"""
+        return self._pump is not None and self._pump.done()
+
+    async def events(self) -> AsyncIterator[Any]:
+        """Agent events, plus cached answers standing in for model turns"""
+        self.prime()
+        generation = self._reader = self.stream_generation
+        self._released.clear()
+        try:
+            while True:
+                event = await self._outbox.get()
+                if event is _END:
+                    return
+                if isinstance(event, _Detach):
+                    if event.generation == generation and self.stream_generation != generation:
+                        return
+                    continue
+                if isinstance(event, BaseException):
+                    raise event
+                if self._turn is not None and self._turn.observe(event):
+                    self._turn = None
+                yield event
+        finally:
+            # A reader closed late (its task cancelled after a new one started) changes nothing
+            if self._reader == generation:
+                self._reader = None
+                self._released.set()
+
+    async def _pump_live_events(self, live_events: AsyncGenerator[Any, None]):
+        try:
+            async for event in live_events:
+                if event.author and event.author != "user":
+                    self._agent = event.author
+                self._outbox.put_nowait(event)
+        except Exception as e:
+            self._outbox.put_nowait(e)
+        else:
+            self._outbox.put_nowait(_END)
+
+    async def _connect(self, agent: Optional[str]) -> "LiveRequestQueue":
+        """The request queue for a turn taken by ``agent``, or by the run's current agent when None
+
+        Reaching another agent closes the connection and opens a new one,
+        seeded with the full history, with the run starting at ``agent``.
+        """
+        if self._agent is not _STALE and (agent is None or agent == self._agent):
+            return self.live_request_queue
+
+        from app.agent.runtime import start_agent_session
+
+        if self._pump is not None:
+            self._pump.cancel()
+        self.live_request_queue.close()
+        self._agent = _STALE
+        self.live_events, self.live_request_queue = await start_agent_session(
+            self.session_id, resume=True, agent_name=agent
+        )
+        if self._pump is not None:
+            self._pump = asyncio.create_task(self._pump_live_events(self.live_events))
+        self._agent = agent
+        return self.live_request_queue
+
+    async def _feed(self):
+        try:
+            await self._feed_turns()
+        except Exception as e:
+            log_event("feed_error", f"Failed to send a message to the agent: {e}", session_id=self.session_id, level=logging.ERROR)
+            # The stream raises it to the client and ends, which closes the session
+            self.inbound.clear()
+            self._outbox.put_nowait(e)
+        finally:
+            self._feeder = None
+
+    async def _feed_turns(self):
+        from google.genai.types import Content, Part
+
+        while True:
+            await self._pending.wait()
+            while self.inbound:
+                # One turn in flight at a time; the rest wait here, bounded
+                try:
+                    await asyncio.wait_for(self._turn_idle.wait(), CHAT_TURN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    pass
+                if not self.inbound:
+                    break
+                self._turn_idle.clear()
+                text, use_cache, self.turn_sent_at = self.inbound.popleft()
+                # Only an opening message has the same answer in every conversation
+                opening = use_cache and response_cache.enabled and not await self._in_context()
+                self._has_context = True
+                if opening:
+                    cached = response_cache.get(text, CHAT_RESPONSE_CACHE_AGENT)
+                    if cached is not None:
+                        await self._replay_cached(text, cached.text)
+                        continue
+                    self._turn = TurnRecorder(text)
+                content = Content(role="user", parts=[Part.from_text(text=text)])
+                agent = pre_router.route(text) if CHAT_PREROUTER_ENABLED else None
+                try:
+                    live_request_queue = await self._connect(agent)
+                except Exception as e:
+                    if agent is None:
+                        raise
+                    log_event("preroute_error", f"Falling back to the manager: {e}", session_id=self.session_id)
+                    live_request_queue = await self._connect(None)
+                live_request_queue.send_content(content=content)
+            self._pending.clear()
+
+    async def _in_context(self) -> bool:
+        if self._has_context is None:
+            from app.agent.runtime import session_has_history
+
+            self._has_context = await session_has_history(self.session_id)
+        return self._has_context
+
+    async def _replay_cached(self, text: str, answer: str):
+        """Answer a message from the cache as if the model had taken the turn
+
+        The turn goes into the session history (and the store) like a model
+        turn. The open connection never saw it, so it is reopened with it on
+        the next message.
+        """
+        from google.adk.agents.invocation_context import new_invocation_context_id
+
+        from app.agent.runtime import record_turn
+
+        log_event("response_cache_hit", "Answered from the response cache", session_id=self.session_id)
+        events = replay_events(answer, invocation_id=new_invocation_context_id())
+        await record_turn(self.session_id, text, events)
+        self._agent = _STALE
+        for event in events:
+            self._outbox.put_nowait(event)
+
+    async def close(self):
+        from app.agent.runtime import end_agent_session
+
+        if self.closed:
+            return
+        self.closed = True
+        if self._feeder is not None:
+            self._feeder.cancel()
+        if self._pump is not None:
+            self._pump.cancel()
+            self._outbox.put_nowait(_END)
+        self.inbound.clear()
+        self.live_request_queue.close()
+        await end_agent_session(self.session_id)
+
+
+async def new_live_session(session_id: Optional[str] = None) -> LiveSession:
+    """Create a live session, generating an id when none is given
+
+    A given id may belong to a stored conversation, which is resumed.
+    Waits for the agent runtime if the worker is still warming up.
+    """
+    from app.agent.loader import runtime_ready
+
+    await runtime_ready()
+    from app.agent.runtime import start_agent_session
+
+    resume = session_id is not None
+    session_id = session_id or str(uuid.uuid4())
+    live_events, live_request_queue = await start_agent_session(session_id, resume=resume)
+    return LiveSession(
+        session_id=session_id,
+        live_events=live_events,
+        live_request_queue=live_request_queue,
+    )
@@ -0,0 +1,316 @@
+import asyncio
+import os
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.db import AsyncSessionLocal
+from app.models import Conversation, ConversationEvent
+from app.utils.logger import logger
+from app.utils.metrics import Counter, Gauge
+
+if TYPE_CHECKING:
+    from google.adk.events import Event
+    from google.adk.sessions import Session
+
+# "postgres" keeps conversations across restarts; "memory" keeps them in process only
+CHAT_SESSION_STORE = os.getenv("CHAT_SESSION_STORE", "postgres")
+# Events written per batch, and the longest an event waits before its batch is written
+CHAT_STORE_BATCH_SIZE = int(os.getenv("CHAT_STORE_BATCH_SIZE", "200"))
+CHAT_STORE_FLUSH_INTERVAL = float(os.getenv("CHAT_STORE_FLUSH_INTERVAL", "0.5"))
+# Events held while the database is slow or down; past this new events are dropped
+CHAT_STORE_MAX_BUFFER = int(os.getenv("CHAT_STORE_MAX_BUFFER", "50000"))
+# Failed writes of the same batch before it is split up, so only the rows the
+# database keeps refusing are dropped. Only data errors count towards it; a
+# batch that fails because the database is unreachable stays buffered.
+CHAT_STORE_MAX_RETRIES = int(os.getenv("CHAT_STORE_MAX_RETRIES", "5"))
+# Rows read per query when loading a conversation back
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "500"))
+
+EVENTS_WRITTEN = Counter("chat_store_events_written_total", "Conversation events written to the database")
+EVENTS_DROPPED = Counter(
+    "chat_store_events_dropped_total", "Conversation events dropped before reaching the database", ("reason",)
+)
+FLUSH_FAILURES = Counter("chat_store_flush_failures_total", "Failed conversation store batch writes")
+
+# Errors a row causes itself, so retrying it can't help; anything else is retried
+ROW_ERRORS = (IntegrityError, DataError)
+
+
+class ConversationStore:
+    """Write-behind store for conversations and their events
+
+    Appends only go into an in-memory buffer; a background task writes them
+    in batches, so the streaming path never waits on the database. Reads
+    don't wait on it either: what is still buffered, or being written, is
+    merged into what the database returns.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = CHAT_STORE_BATCH_SIZE,
+        flush_interval: float = CHAT_STORE_FLUSH_INTERVAL,
+        max_buffer: int = CHAT_STORE_MAX_BUFFER,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._conversations: Dict[str, Dict[str, Any]] = {}
+        self._events: Deque[Dict[str, Any]] = deque()
+        # The batch being written, still visible to reads until it lands or is requeued
+        self._writing: Tuple[List[Dict[str, Any]], List[Dict[str, Any]]] = ([], [])
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the writer and make a last attempt at whatever is buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Conversation store lost {len(self._events)} events on shutdown: {e}")
+
+    def record_conversation(
+        self,
+        session_id: str,
+        app_name: str,
+        agent_user_id: str,
+        user_id: Optional[uuid.UUID] = None,
+        project_id: Optional[uuid.UUID] = None,
+    ):
+        """Queue an upsert of a conversation row; None fields keep their stored value"""
+        row = self._conversations.setdefault(
+            session_id, {"id": session_id, "app_name": app_name, "agent_user_id": agent_user_id}
+        )
+        if user_id is not None:
+            row["user_id"] = user_id
+        if project_id is not None:
+            row["project_id"] = project_id
+        self._wakeup.set()
+
+    def append_event(self, session_id: str, event: "Event"):
+        if len(self._events) >= self.max_buffer:
+            EVENTS_DROPPED.inc(reason="buffer_full")
+            return
+        self._events.append({
+            "conversation_id": session_id,
+            "event_id": event.id,
+            "author": event.author,
+            "invocation_id": event.invocation_id,
+            "timestamp": event.timestamp,
+            "payload": event.model_dump(mode="json", exclude_none=True, by_alias=True),
+        })
+        if len(self._events) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        """Write everything buffered so far, one batch at a time"""
+        async with self._lock:
+            while self._conversations or self._events:
+                conversations = list(self._conversations.values())
+                self._conversations = {}
+                events = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+                self._writing = (conversations, events)
+                try:
+                    await self._write(conversations, events)
+                    EVENTS_WRITTEN.inc(len(events))
+                except Exception as e:
+                    self._failures += 1
+                    FLUSH_FAILURES.inc()
+                    if not isinstance(e, ROW_ERRORS) or self._failures <= CHAT_STORE_MAX_RETRIES:
+                        self._requeue(conversations, events)
+                        raise
+                    # A row the database will never accept; don't let it sink the rest
+                    await self._write_isolated(conversations, events)
+                finally:
+                    self._writing = ([], [])
+                self._failures = 0
+
+    def _requeue(self, conversations: List[Dict[str, Any]], events: List[Dict[str, Any]]):
+        for row in conversations:
+            # Fields queued since the failed attempt win
+            self._conversations[row["id"]] = {**row, **self._conversations.get(row["id"], {})}
+        self._events.extendleft(reversed(events))
+
+    async def _write_isolated(self, conversations: List[Dict[str, Any]], events: List[Dict[str, Any]]):
+        """Write a batch that keeps failing one conversation at a time, then row by row
+
+        Drops only the rows the database refuses. If it stops answering
+        instead, the conversations not yet written go back in the buffer;
+        rewriting the ones that did land is a no-op.
+        """
+        rows = {row["id"]: row for row in conversations}
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            grouped.setdefault(event["conversation_id"], []).append(event)
+
+        conversation_ids = list({**rows, **grouped})
+        for index, conversation_id in enumerate(conversation_ids):
+            row = rows.get(conversation_id)
+            group = grouped.get(conversation_id, [])
+            try:
+                try:
+                    await self._write([row] if row else [], group)
+                    EVENTS_WRITTEN.inc(len(group))
+                    continue
+                except ROW_ERRORS as e:
+                    logger.warning(f"Writing conversation {conversation_id} row by row: {e}")
+
+                if row is not None:
+                    try:
+                        await self._write([row], [])
+                    except ROW_ERRORS as e:
+                        logger.error(f"Dropping update of conversation {conversation_id}: {e}")
+                for event in group:
+                    try:
+                        await self._write([], [event])
+                        EVENTS_WRITTEN.inc()
+                    except ROW_ERRORS as e:
+                        logger.error(f"Dropping event {event['event_id']} of conversation {conversation_id}: {e}")
+                        EVENTS_DROPPED.inc(reason="write_failed")
+            except Exception:
+                rest = conversation_ids[index:]
+                self._requeue(
+                    [rows[i] for i in rest if i in rows], [event for i in rest for event in grouped.get(i, [])]
+                )
+                raise
+
+    async def _write(self, conversations: List[Dict[str, Any]], events: List[Dict[str, Any]]):
+        async with AsyncSessionLocal() as db:
+            for row in conversations:
+                stmt = insert(Conversation).values(**row)
+                updates = {key: stmt.excluded[key] for key in ("user_id", "project_id") if key in row}
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[Conversation.id], set_={**updates, "updated_at": func.now()}
+                    )
+                )
+            if events:
+                # Retried batches may repeat events that did land; event_id makes that a no-op
+                await db.execute(
+                    insert(ConversationEvent).on_conflict_do_nothing(index_elements=[ConversationEvent.event_id]),
+                    events,
+                )
+            await db.commit()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Conversation store flush failed: {e}")
+                await asyncio.sleep(min(30, 2 ** self._failures))
+
+    def _buffered_conversation(self, session_id: str) -> Dict[str, Any]:
+        row: Dict[str, Any] = {}
+        for queued in (*self._writing[0], self._conversations.get(session_id)):
+            if queued is not None and queued["id"] == session_id:
+                row.update(queued)
+        return row
+
+    def buffered_events(self, session_id: str) -> List["Event"]:
+        """Events of a conversation this worker has yet to write, oldest first"""
+        from google.adk.events import Event
+
+        return [
+            Event.model_validate(row["payload"])
+            for row in (*self._writing[1], *self._events)
+            if row["conversation_id"] == session_id
+        ]
+
+    async def get_conversation(self, session_id: str) -> Optional[Conversation]:
+        """The stored conversation row, with the updates this worker has yet to write"""
+        async with AsyncSessionLocal() as db:
+            conversation = await db.get(Conversation, session_id)
+        buffered = self._buffered_conversation(session_id)
+        if not buffered:
+            return conversation
+        if conversation is None:
+            now = datetime.now(timezone.utc)
+            return Conversation(**buffered, created_at=now, updated_at=now)
+        for key in ("user_id", "project_id"):
+            if key in buffered:
+                setattr(conversation, key, buffered[key])
+        return conversation
+
+    async def load_events(
+        self, session_id: str, after: int = 0, limit: int = CHAT_HISTORY_PAGE_SIZE
+    ) -> List[Tuple[int, "Event"]]:
+        """One page of a conversation's events, oldest first, as (cursor, event)
+
+        Keyset pagination: pass the last cursor back as ``after`` for the next page.
+        """
+        from google.adk.events import Event
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ConversationEvent.id, ConversationEvent.payload)
+                .where(ConversationEvent.conversation_id == session_id, ConversationEvent.id > after)
+                .order_by(ConversationEvent.id)
+                .limit(limit)
+            )
+            return [(row.id, Event.model_validate(row.payload)) for row in result]
+
+    async def load_session(self, app_name: str, agent_user_id: str, session_id: str) -> Optional["Session"]:
+        """Rebuild a stored session with its full history, paging through the events"""
+        from google.adk.sessions import Session
+
+        conversation = await self.get_conversation(session_id)
+        if (
+            conversation is None
+            or conversation.app_name != app_name
+            or conversation.agent_user_id != agent_user_id
+        ):
+            return None
+
+        session = Session(
+            app_name=app_name,
+            user_id=agent_user_id,
+            id=session_id,
+            last_update_time=conversation.updated_at.timestamp(),
+        )
+        after = 0
+        while True:
+            page = await self.load_events(session_id, after=after)
+            for _, event in page:
+                session.events.append(event)
+            if len(page) < CHAT_HISTORY_PAGE_SIZE:
+                break
+            after = page[-1][0]
+        # A batch that partly landed before failing is both stored and buffered
+        stored = {event.id for event in session.events}
+        session.events.extend(event for event in self.buffered_events(session_id) if event.id not in stored)
+        if session.events:
+            session.last_update_time = session.events[-1].timestamp
+        return session
+
+
+conversation_store = ConversationStore()
+
+Gauge("chat_store_buffered_events", "Conversation events waiting to be written", fn=lambda: len(conversation_store))
+
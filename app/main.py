@@ -1,21 +1,84 @@
+import asyncio
+import os
+import time
 from typing import Union
-from pathlib import Path
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware 
 
-from .api.v1 import auth, chat  # Added chat import
-from .utils.response import error_response
+from .agent.loader import runtime_ready
+from .api.v1 import admin, auth, chat, workspaces  # Added chat import
+from .chat.pool import session_pool
+from .chat.routing import CHAT_DRAIN_TIMEOUT, session_router
+from .chat.store import conversation_store
+from .db import async_engine, warm_up_pool
+from .utils import metrics
+from .utils.logger import logger
+from .utils.password_pool import password_pool
+from .utils.response import error_response, success_response
+from .utils.static_assets import static_assets
 
-app = FastAPI(title="Analyst Agent API", version="1.0.0")
+# Longest each warmup step may take before the worker reports ready without it
+APP_WARMUP_TIMEOUT = float(os.getenv("APP_WARMUP_TIMEOUT", "30"))
 
-# Static files
-STATIC_DIR = Path("static")
-if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+async def warm_up(app: FastAPI):
+    """Load the agent stack, open DB connections and start the bcrypt workers
+
+    Runs in the background, so the worker serves requests (and /health)
+    while it happens. The agent stack is imported and built in a thread to
+    keep the event loop free; a chat request arriving first awaits the same
+    build.
+    """
+    started = time.perf_counter()
+    steps = {
+        "agent runtime": runtime_ready(),
+        "DB pool": warm_up_pool(),
+        "password pool": password_pool.warm_up(),
+    }
+    results = await asyncio.gather(
+        *(asyncio.wait_for(step, APP_WARMUP_TIMEOUT) for step in steps.values()), return_exceptions=True
+    )
+    for name, result in zip(steps, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Warmup of the {name} failed: {result!r}")
+    # Pre-warmed chat sessions need the runner
+    await session_pool.start()
+    app.state.ready = True
+    logger.info(f"Worker warmed up in {time.perf_counter() - started:.2f}s")
+
+
+async def drain(timeout: float = CHAT_DRAIN_TIMEOUT):
+    """First step of a graceful shutdown, before open connections are waited on
+
+    /ready starts failing and new sessions get 503. Streams finish the
+    turns already accepted and end, and their LiveRequestQueues are closed.
+    """
+    app.state.ready = False
+    await session_router.drain(timeout)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    password_pool.start()
+    await static_assets.start()
+    await conversation_store.start()
+    await session_router.start()
+    warmup = asyncio.create_task(warm_up(app))
+    yield
+    warmup.cancel()
+    await session_router.stop()
+    # After the sessions close, so their last events are written
+    await conversation_store.stop()
+    await async_engine.dispose()
+    await static_assets.stop()
+    password_pool.shutdown()
+
+
+app = FastAPI(title="Analyst Agent API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,15 +90,46 @@ app.add_middleware(
 
 app.include_router(auth.router, prefix="/api/v1/auth")
 app.include_router(chat.router, prefix="/api/v1/chat")
+app.include_router(admin.router, prefix="/api/v1/admin")
+app.include_router(workspaces.router, prefix="/api/v1")
+
+@app.api_route("/", methods=["GET", "HEAD"])
+async def read_root(request: Request):
+    return static_assets.response(request, "index.html")
+
+
+@app.api_route("/chat", methods=["GET", "HEAD"])
+async def chat_page(request: Request):
+    return static_assets.response(request, "index.html")
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_file(request: Request, path: str):
+    return static_assets.response(request, path)
+
+
+@app.get("/health")
+def health():
+    """Liveness: the worker is up and serving"""
+    return success_response(message="OK")
+
+
+@app.get("/ready")
+def ready():
+    """Readiness: warmup has finished, so requests won't pay for cold starts
 
-@app.get("/")
-def read_root():
-    return FileResponse("static/index.html")
+    Also fails while the chat message bus is down, as sends routed here would be lost.
+    """
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content=error_response(message="Warming up"))
+    if not session_router.bus.healthy:
+        return JSONResponse(status_code=503, content=error_response(message="Chat message bus disconnected"))
+    return success_response(message="Ready")
 
 
-@app.get("/chat")
-def chat_page():
-    return FileResponse("static/index.html")
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 
@@ -48,5 +142,6 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 
     return JSONResponse(
         status_code=exc.status_code,
-        content=error_content
+        content=error_content,
+        headers=exc.headers
     )
\ No newline at end of file
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Column, String, ForeignKey, DateTime, Float, Index, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 import uuid
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -27,6 +27,9 @@ class Workspace(Base):
 
     projects = relationship("Project", back_populates="workspace", cascade="all, delete-orphan")
 
+    # Serves the owner_id foreign key and the keyset order of a user's workspaces
+    __table_args__ = (Index("ix_workspaces_owner_id_name_id", "owner_id", "name", "id"),)
+
 
 class Project(Base):
     __tablename__ = "projects"
@@ -35,3 +38,46 @@ class Project(Base):
     name = Column(String, nullable=False)
     workspace_id = Column(UUID(as_uuid=True), ForeignKey("workspaces.id"), nullable=False)
     workspace = relationship("Workspace", back_populates="projects")
+
+    # Serves the workspace_id foreign key and the keyset order of a workspace's projects
+    __table_args__ = (Index("ix_projects_workspace_id_name_id", "workspace_id", "name", "id"),)
+
+
+class ChatSessionRoute(Base):
+    __tablename__ = "chat_session_routes"
+
+    # Which worker owns the live stream of a chat session
+    session_id = Column(String, primary_key=True, nullable=False)
+    worker_id = Column(String, index=True, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+
+    # One row per agent session; the id is the chat session id
+    id = Column(String, primary_key=True, nullable=False)
+    app_name = Column(String, nullable=False)
+    agent_user_id = Column(String, nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), index=True, nullable=True)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="SET NULL"), index=True, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    user = relationship("User")
+    project = relationship("Project")
+
+
+class ConversationEvent(Base):
+    __tablename__ = "conversation_events"
+
+    # Monotonic per table, so (conversation_id, id) is the keyset for paging history
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(String, unique=True, nullable=False)
+    author = Column(String, nullable=True)
+    invocation_id = Column(String, nullable=True)
+    timestamp = Column(Float, nullable=False)
+    payload = Column(JSONB, nullable=False)
+
+    __table_args__ = (Index("ix_conversation_events_conversation_id_id", "conversation_id", "id"),)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 class UserBase(BaseModel):
     username: str
@@ -15,4 +15,12 @@ class UserRead(UserBase):
     id: int
 
     class Config:
-        from_attributes = True  # Changed from orm_mode to from_attributes for Pydantic v2
\ No newline at end of file
+        from_attributes = True  # Changed from orm_mode to from_attributes for Pydantic v2
+
+
+class WorkspaceCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=200)
+
+
+class ProjectCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=200)
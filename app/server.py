@@ -0,0 +1,118 @@
+"""Production entry point: python -m app.server
+
+run.py stays the single-process, auto-reloading dev server. This one runs
+N uvicorn workers with uvloop and httptools, tuned keep-alive and listen
+backlog, and a graceful drain on SIGTERM/SIGINT. Each worker stops
+listening, lets its chat streams finish the turns in flight
+(CHAT_DRAIN_TIMEOUT), closes their LiveRequestQueues, and only then waits
+for the remaining connections and runs the lifespan shutdown.
+
+With more than one worker, chat sessions are routed through Postgres
+(CHAT_SESSION_BACKEND defaults to postgres); the in-memory backend only
+works in one process, so it runs a single worker.
+"""
+import argparse
+import logging
+import os
+import socket
+from typing import List, Optional
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger("uvicorn.error")
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+# WEB_CONCURRENCY is the name most platforms set
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+# Pending connections the kernel queues per listening socket
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+# Keep idle connections longer than the load balancer does, so it never reuses one we closed
+SERVER_KEEP_ALIVE = int(os.getenv("SERVER_KEEP_ALIVE", "75"))
+# After the drain, how long the remaining requests get before they are cancelled
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "10"))
+# Addresses trusted to set X-Forwarded-For/-Proto; "*" behind a private load balancer
+SERVER_FORWARDED_ALLOW_IPS = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn.Server that drains chat streams before the usual shutdown"""
+
+    async def shutdown(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        # Stop accepting first, so new connections go to the other instances
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+
+        if not self.force_exit:
+            from app.main import drain
+
+            logger.info("Draining chat sessions")
+            try:
+                await drain()
+            except Exception:
+                logger.exception("Chat session drain failed")
+        await super().shutdown(sockets)
+
+
+def event_loop() -> str:
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        logger.warning("uvloop is not installed; using the default asyncio event loop")
+        return "asyncio"
+    return "uvloop"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API in production")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--backlog", type=int, default=SERVER_BACKLOG)
+    parser.add_argument("--keep-alive", type=int, default=SERVER_KEEP_ALIVE)
+    parser.add_argument("--graceful-timeout", type=int, default=SERVER_GRACEFUL_TIMEOUT)
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # A chat session lives in one worker; the others reach it through the Postgres registry and bus
+        os.environ.setdefault("CHAT_SESSION_BACKEND", "postgres")
+        if os.environ["CHAT_SESSION_BACKEND"] == "memory":
+            logger.warning(
+                f"CHAT_SESSION_BACKEND=memory can't route chat between workers; "
+                f"starting 1 worker instead of {args.workers}. Set CHAT_SESSION_BACKEND=postgres to run more."
+            )
+            args.workers = 1
+
+    # Split the CPUs between the workers' bcrypt pools instead of giving each worker half of them
+    os.environ.setdefault("PASSWORD_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // (2 * args.workers))))
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=event_loop(),
+        http="httptools",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        # Counted after the drain, which has its own CHAT_DRAIN_TIMEOUT
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=SERVER_FORWARDED_ALLOW_IPS,
+        lifespan="on",
+        access_log=False,
+    )
+    server = DrainingServer(config)
+    logger.info(f"Starting {args.workers} worker(s) on {args.host}:{args.port}")
+    if args.workers > 1:
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+import secrets
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import os
@@ -11,6 +12,8 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = str(os.getenv("ACCESS_TOKEN_SECRET") )
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Shared secret for the /admin endpoints, sent as X-Admin-Token; unset disables them
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -18,6 +21,15 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def warm_up_bcrypt() -> None:
+    """Load passlib's bcrypt backend now instead of on the first hash"""
+    pwd_context.handler("bcrypt").get_backend()
+
+def is_admin_token(token: Optional[str]) -> bool:
+    if not ADMIN_API_TOKEN or not token:
+        return False
+    return secrets.compare_digest(token.encode(), ADMIN_API_TOKEN.encode())
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
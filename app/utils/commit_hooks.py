@@ -0,0 +1,33 @@
+"""Callbacks that run once the ORM session that queued them commits.
+
+Caches invalidated from flush-time mapper events would drop an entry
+before the change is visible to other connections: a concurrent load
+could re-cache the old row, and a rollback would evict for nothing.
+Queueing the invalidation here runs it after the commit instead.
+"""
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_CALLBACKS = "after_commit_callbacks"
+
+
+def after_commit(session: Optional[Session], callback: Callable[[], None]):
+    """Call ``callback`` when ``session`` commits, or never if it rolls back; at once without a session"""
+    if session is None:
+        callback()
+        return
+    session.info.setdefault(_CALLBACKS, []).append(callback)
+
+
+# AsyncSession runs on a plain Session underneath, so this covers both
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session: Session):
+    for callback in session.info.pop(_CALLBACKS, ()):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_callbacks(session: Session):
+    session.info.pop(_CALLBACKS, None)
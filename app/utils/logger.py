@@ -1,41 +1,153 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import sys
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.utils.metrics import Counter
 
 # Create logs directory
-log_dir = Path("logs")
+log_dir = Path(os.getenv("LOG_DIR", "logs"))
 log_dir.mkdir(exist_ok=True)
 
+# "json" for structured records, "text" for the plain format
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Records waiting for the writer thread; past this they are dropped, never blocking
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Per-category sampling, e.g. "partial_text=0.01,control=1"; unlisted categories keep everything
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "partial_text=0.01")
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            category, rate = item.split("=", 1)
+            rates[category.strip()] = float(rate)
+    return rates
+
+
+sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+
+
+def should_log(category: str) -> bool:
+    rate = sample_rates.get(category, 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+
+class DailyFileHandler(logging.FileHandler):
+    """Writes to logs/<YYYY-MM-DD>.log, switching files when the date changes"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.current_date = datetime.now().strftime("%Y-%m-%d")
+        super().__init__(directory / f"{self.current_date}.log", delay=True)
+
+    def emit(self, record: logging.LogRecord):
+        today = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d")
+        if today != self.current_date:
+            self.close()
+            self.current_date = today
+            self.baseFilename = str((self.directory / f"{today}.log").resolve())
+        super().emit(record)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
 # Set up logger
 def setup_logger():
+    global _listener
+
     # Create logger
     logger = logging.getLogger("app")
     logger.setLevel(logging.INFO)
-    
+    logger.propagate = False
+
     # Prevent adding handlers multiple times
     if not logger.handlers:
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # File handler - daily log file
-        today = datetime.now().strftime("%Y-%m-%d")
-        file_handler = logging.FileHandler(f"logs/{today}.log")
-        file_handler.setLevel(logging.INFO)
-        
+        # Console and daily file handlers run on the listener's thread
+        console_handler = logging.StreamHandler(sys.stdout)
+        file_handler = DailyFileHandler(log_dir)
+
         # Format
-        formatter = logging.Formatter(
-            "%(asctime)s - %(levelname)s - %(message)s"
-        )
+        if LOG_FORMAT == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
         console_handler.setFormatter(formatter)
         file_handler.setFormatter(formatter)
-        
-        # Add handlers
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
-    
+
+        # The event loop only ever does a put_nowait
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        logger.addHandler(DroppingQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(
+            log_queue, console_handler, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(stop_logger)
+
     return logger
 
+
+def stop_logger():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 # Create a default logger instance
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
+
+
+def log_event(
+    event_type: str,
+    message: str,
+    session_id: Optional[str] = None,
+    level: int = logging.INFO,
+    **fields: Any,
+):
+    """Log a structured record, subject to the sampling rate of its event type"""
+    if not logger.isEnabledFor(level) or not should_log(event_type):
+        return
+    logger.log(level, message, extra={"event_type": event_type, "session_id": session_id, **fields})
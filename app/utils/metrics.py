@@ -0,0 +1,220 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Values are per worker process; scrape every worker (or aggregate by the
+``instance`` label) when running several.
+"""
+import bisect
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+LabelValues = Tuple[str, ...]
+# Read at scrape time: one value, or a value per label tuple for labelled metrics
+MetricFn = Callable[[], Union[float, Dict[LabelValues, float]]]
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key: LabelValues, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = [*zip(self.labelnames, key), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, LabelValues, float]]:
+        ...
+
+    def _fn_samples(self, fn: MetricFn) -> List[Tuple[str, LabelValues, float]]:
+        value = fn()
+        if isinstance(value, dict):
+            return [("", key, v) for key, v in value.items()]
+        return [("", (), value)]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, value in self.samples():
+            lines.append(f"{self.name}{suffix}{self._label_text(key)} {value:g}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up, or one kept elsewhere and read from ``fn``"""
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        fn: Optional[MetricFn] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        # Unlabelled series report 0 before their first update
+        self._values: Dict[LabelValues, float] = {} if labelnames else {(): 0}
+        self._fn = fn
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self._fn is not None:
+            return self._fn_samples(self._fn)
+        return [("", key, value) for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """A settable value, or one read from ``fn`` at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        fn: Optional[MetricFn] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        # Unlabelled series report 0 before their first update
+        self._values: Dict[LabelValues, float] = {} if labelnames else {(): 0}
+        self._fn = fn
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> float:
+        if self._fn is not None:
+            value = self._fn()
+            return value.get(self._key(labels), 0) if isinstance(value, dict) else value
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self._fn is not None:
+            return self._fn_samples(self._fn)
+        return [("", key, value) for key, value in self._values.items()]
+
+
+# Seconds, for request and model latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(Metric):
+    """Observations counted into buckets, with their sum and count
+
+    observe() is a bisect and two additions, cheap enough for hot paths.
+    Buckets are stored per bucket and made cumulative at scrape time.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label tuple: a count per bucket, one for +Inf, then the sum
+        self._series: Dict[LabelValues, List[float]] = {} if labelnames else {(): self._new_series()}
+
+    def _new_series(self) -> List[float]:
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = self._new_series()
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def timer(self, **labels: str) -> Iterator[None]:
+        """Observe the seconds spent in the ``with`` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0
+
+    def samples(self):
+        samples = []
+        for key, series in self._series.items():
+            samples.append(("_count", key, sum(series[:-1])))
+            samples.append(("_sum", key, series[-1]))
+        return samples
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, (('le', f'{bound:g}'),))} {cumulative:g}")
+            cumulative += series[-2]
+            lines.append(f"{self.name}_bucket{self._label_text(key, (('le', '+Inf'),))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {series[-1]:g}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative:g}")
+        return "\n".join(lines)
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def process_rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # No procfs: fall back to the peak, which is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+Gauge("process_resident_memory_bytes", "Resident memory size in bytes", fn=process_rss_bytes)
@@ -0,0 +1,121 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from app.utils.auth import hash_password, verify_password, warm_up_bcrypt
+from app.utils.metrics import Counter, Gauge, Histogram
+
+# bcrypt workers; each one is a separate process with its own GIL
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Hashes allowed to wait for a worker before new ones are turned away
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "32"))
+
+PASSWORD_JOBS = Counter("password_pool_jobs_total", "Password hash/verify jobs run", ("op",))
+PASSWORD_JOBS_REJECTED = Counter("password_pool_rejected_total", "Password jobs refused because the pool was full")
+BCRYPT_SECONDS = Histogram(
+    "password_bcrypt_seconds",
+    "bcrypt time per hash_password/verify_password call, measured in the worker",
+    ("op",),
+    buckets=(0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+PASSWORD_JOB_SECONDS = Histogram(
+    "password_pool_job_seconds",
+    "Time a caller waits for a password job, queueing included",
+    ("op",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0, 10.0),
+)
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """Runs in the worker process; the parent records the duration"""
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+
+def _hash_all(passwords: List[str]) -> List[str]:
+    return [hash_password(password) for password in passwords]
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password pool is saturated and should answer 503"""
+
+
+class PasswordPool:
+    """Runs bcrypt in a bounded process pool with queue-depth admission control"""
+
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_queue: int = PASSWORD_POOL_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        if self._executor is None:
+            # spawn, so workers don't inherit the event loop, sockets or DB pool
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, op: str, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.in_flight >= self.workers + self.max_queue:
+            PASSWORD_JOBS_REJECTED.inc()
+            raise PasswordPoolBusy("Password service is busy")
+
+        self.start()
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            result, seconds = await asyncio.get_running_loop().run_in_executor(self._executor, _timed, fn, *args)
+            BCRYPT_SECONDS.observe(seconds, op=op)
+            return result
+        finally:
+            self.in_flight -= 1
+            PASSWORD_JOBS.inc(op=op)
+            PASSWORD_JOB_SECONDS.observe(time.perf_counter() - started, op=op)
+
+    async def warm_up(self):
+        """Spawn every worker and load bcrypt in each, so the first sign-ins don't pay for it"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, warm_up_bcrypt) for _ in range(self.workers)))
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: Sequence[str], chunk_size: int = 8) -> List[str]:
+        """Hash a batch across every worker, ``chunk_size`` passwords per job
+
+        Not subject to the admission limit, which is sized for sign-ins.
+        Bulk work should get a pool of its own so it doesn't queue ahead of them.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        chunks = [list(passwords[i : i + chunk_size]) for i in range(0, len(passwords), chunk_size)]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, _timed, _hash_all, chunk) for chunk in chunks)
+        )
+        PASSWORD_JOBS.inc(len(passwords), op="hash")
+        return [hashed for hashes, _ in results for hashed in hashes]
+
+
+password_pool = PasswordPool()
+
+Gauge("password_pool_workers", "Processes in the password pool", fn=lambda: password_pool.workers)
+Gauge("password_pool_in_flight", "Password jobs running or queued", fn=lambda: password_pool.in_flight)
+Gauge(
+    "password_pool_queue_depth",
+    "Password jobs waiting for a free process",
+    fn=lambda: max(0, password_pool.in_flight - password_pool.workers),
+)
@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class TokenBucket:
+    """Allows ``rate`` events per second on average, with bursts up to ``burst``"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def allow(self, cost: float = 1) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def retry_after(self, cost: float = 1) -> float:
+        """Seconds until ``cost`` tokens are available"""
+        return max(0.0, (cost - self.tokens) / self.rate) if self.rate > 0 else float("inf")
+
+
+class RateLimiter:
+    """Token buckets per key, keeping at most ``max_keys`` of the most recent keys"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def check(self, key: str) -> Tuple[bool, float]:
+        """Take one token for ``key``; returns (allowed, retry_after_seconds)"""
+        if self.rate <= 0:
+            return True, 0.0
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        if bucket.allow():
+            return True, 0.0
+        return False, bucket.retry_after()
@@ -42,4 +42,23 @@ def paginated_response(
                 "pages": (total + page_size - 1) // page_size  # Ceiling division
             }
         }
-    ).model_dump()
\ No newline at end of file
+    ).model_dump()
+
+
+def cursor_paginated_response(
+    items: List[T],
+    next_cursor: Optional[str],
+    limit: int,
+    message: str = "Success"
+) -> Dict:
+    return ResponseModel(
+        is_success=True,
+        data=items,
+        message=message,
+        meta={
+            "pagination": {
+                "next_cursor": next_cursor,  # None on the last page
+                "limit": limit
+            }
+        }
+    ).model_dump()
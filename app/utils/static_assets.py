@@ -0,0 +1,208 @@
+"""Static files served from memory, gzip-compressed ahead of time.
+
+Every file under STATIC_DIR is read once, with a gzip variant built at
+load time for compressible types, so serving one is a dict lookup and no
+disk I/O. Each variant has a strong ETag from a hash of its bytes;
+If-None-Match answers 304 without a body. A background task stats the
+files every STATIC_RELOAD_INTERVAL seconds and reloads the set when
+anything changed. Only files that changed are read and compressed again.
+"""
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+from app.utils.logger import logger
+from app.utils.metrics import Counter
+
+STATIC_DIR = Path(os.getenv("STATIC_DIR", "static"))
+# Seconds between checks for changed files; 0 turns reloading off
+STATIC_RELOAD_INTERVAL = float(os.getenv("STATIC_RELOAD_INTERVAL", "2"))
+# Browser cache lifetime of /static files; HTML pages are always revalidated
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "300"))
+STATIC_GZIP_LEVEL = int(os.getenv("STATIC_GZIP_LEVEL", "9"))
+# Smaller files are sent as they are; gzip framing would eat the savings
+STATIC_GZIP_MIN_BYTES = int(os.getenv("STATIC_GZIP_MIN_BYTES", "256"))
+
+_COMPRESSIBLE = {"application/javascript", "application/json", "application/xml", "image/svg+xml"}
+
+STATIC_RESPONSES = Counter("static_responses_total", "Static file responses", ("status", "encoding"))
+STATIC_BYTES = Counter("static_bytes_sent_total", "Static file body bytes sent", ("encoding",))
+
+# (mtime_ns, size) of a file, to tell whether it changed
+Signature = Tuple[int, int]
+
+
+@dataclass
+class Variant:
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+@dataclass
+class Asset:
+    signature: Signature
+    media_type: str
+    identity: Variant
+    gzip: Optional[Variant] = None
+    # Headers a 304 carries for each variant, built once
+    not_modified: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+
+def cache_control(path: str) -> str:
+    if path.endswith(".html"):
+        return "no-cache"
+    return f"public, max-age={STATIC_MAX_AGE}"
+
+
+def build_asset(path: str, data: bytes, signature: Signature) -> Asset:
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    common = {
+        "Cache-Control": cache_control(path),
+        "Last-Modified": formatdate(signature[0] / 1e9, usegmt=True),
+    }
+    compressed = None
+    if (media_type.startswith("text/") or media_type in _COMPRESSIBLE) and len(data) >= STATIC_GZIP_MIN_BYTES:
+        # mtime=0 keeps the output, and so the ETag, the same across reloads and workers
+        compressed = gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL, mtime=0)
+        if len(compressed) >= len(data):
+            compressed = None
+    if compressed is not None:
+        common["Vary"] = "Accept-Encoding"
+
+    identity = Variant(data, f'"{digest}"', {**common, "ETag": f'"{digest}"'})
+    asset = Asset(signature, media_type, identity)
+    if compressed is not None:
+        etag = f'"{digest}-gz"'
+        asset.gzip = Variant(compressed, etag, {**common, "ETag": etag, "Content-Encoding": "gzip"})
+    for name, variant in (("identity", asset.identity), ("gzip", asset.gzip)):
+        if variant is not None:
+            asset.not_modified[name] = {k: v for k, v in variant.headers.items() if k != "Content-Encoding"}
+    return asset
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match uses"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class StaticAssets:
+    def __init__(self, directory: Path = STATIC_DIR, reload_interval: float = STATIC_RELOAD_INTERVAL):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._assets: Dict[str, Asset] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self._assets.get(path)
+
+    def scan(self) -> Dict[str, Signature]:
+        """Relative path -> signature of every file to serve; hidden files are skipped"""
+        found = {}
+        if not self.directory.is_dir():
+            return found
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.startswith("."):
+                    continue
+                full = os.path.join(root, name)
+                try:
+                    stat = os.stat(full)
+                except OSError:
+                    continue
+                found[Path(full).relative_to(self.directory).as_posix()] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def load(self, signatures: Optional[Dict[str, Signature]] = None):
+        """Read and compress new or changed files, drop deleted ones, then swap the set in"""
+        signatures = self.scan() if signatures is None else signatures
+        assets = {}
+        for path, signature in signatures.items():
+            current = self._assets.get(path)
+            if current is not None and current.signature == signature:
+                assets[path] = current
+                continue
+            try:
+                data = (self.directory / path).read_bytes()
+            except OSError as e:
+                logger.warning(f"Could not load static file {path}: {e}")
+                continue
+            assets[path] = build_asset(path, data, signature)
+        self._assets = assets
+
+    async def start(self):
+        await asyncio.to_thread(self.load)
+        logger.info(f"Loaded {len(self)} static files from {self.directory}")
+        if self._task is None and self.reload_interval > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                signatures = await asyncio.to_thread(self.scan)
+                if signatures != {path: asset.signature for path, asset in self._assets.items()}:
+                    await asyncio.to_thread(self.load, signatures)
+                    logger.info(f"Reloaded static files, {len(self)} in {self.directory}")
+            except Exception as e:
+                logger.error(f"Static file reload failed: {e}")
+
+    def response(self, request: Request, path: str) -> Response:
+        """The file at ``path``, gzipped if the client takes it, or 304 when its ETag matches"""
+        asset = self._assets.get(path)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        encoding = "identity"
+        variant = asset.identity
+        if asset.gzip is not None and accepts_gzip(request.headers.get("accept-encoding", "")):
+            encoding = "gzip"
+            variant = asset.gzip
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, variant.etag):
+            STATIC_RESPONSES.inc(status="304", encoding=encoding)
+            return Response(status_code=304, headers=asset.not_modified[encoding])
+        STATIC_RESPONSES.inc(status="200", encoding=encoding)
+        STATIC_BYTES.inc(len(variant.body), encoding=encoding)
+        return Response(variant.body, media_type=asset.media_type, headers=variant.headers)
+
+
+static_assets = StaticAssets()
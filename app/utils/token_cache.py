@@ -0,0 +1,123 @@
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+
+from app.models import User
+from app.utils.commit_hooks import after_commit
+from app.utils.metrics import Counter, Gauge
+
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+# Upper bound on how long an entry lives, whatever the token's exp says.
+# Invalidation is per worker, so this also bounds staleness on the others.
+TOKEN_CACHE_MAX_TTL = float(os.getenv("TOKEN_CACHE_MAX_TTL", "300"))
+
+TOKEN_CACHE_HITS = Counter("token_cache_hits_total", "Authenticated calls served from the token cache")
+TOKEN_CACHE_MISSES = Counter("token_cache_misses_total", "Authenticated calls that decoded the token and hit the DB")
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The user columns authenticated requests read, safe to share across requests
+
+    A cached ORM instance would be shared between DB sessions and could be
+    mutated or lazy-load through whichever session touched it last.
+    """
+
+    id: uuid.UUID
+    name: str
+    email: str
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(id=user.id, name=user.name, email=user.email)
+
+
+class TokenCache:
+    """LRU map of verified access tokens to their users, expiring at the token's exp"""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, max_ttl: float = TOKEN_CACHE_MAX_TTL):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, Tuple[UserSnapshot, float, str]]" = OrderedDict()
+        self._tokens_by_email: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        entry = self._entries.get(token)
+        if entry is None:
+            TOKEN_CACHE_MISSES.inc()
+            return None
+
+        user, expires_at, _ = entry
+        if expires_at <= time.time():
+            self._drop(token)
+            TOKEN_CACHE_MISSES.inc()
+            return None
+
+        self._entries.move_to_end(token)
+        TOKEN_CACHE_HITS.inc()
+        return user
+
+    def put(self, token: str, user: UserSnapshot, exp: Optional[float]):
+        """Cache a verified token until its ``exp``, or for max_ttl when that is sooner or it has none"""
+        email = user.email
+        self._drop(token)
+        expires_at = time.time() + self.max_ttl
+        if exp is not None:
+            expires_at = min(exp, expires_at)
+        self._entries[token] = (user, expires_at, email)
+        self._tokens_by_email.setdefault(email, set()).add(token)
+
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, email: str):
+        """Forget every cached token of a user"""
+        for token in self._tokens_by_email.pop(email, set()):
+            self._entries.pop(token, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_email.clear()
+
+    def _drop(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_email.get(entry[2])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_email[entry[2]]
+
+
+token_cache = TokenCache()
+
+
+def _hit_ratio() -> float:
+    hits = TOKEN_CACHE_HITS.get()
+    total = hits + TOKEN_CACHE_MISSES.get()
+    return hits / total if total else 0.0
+
+
+Gauge("token_cache_entries", "Tokens held in the token cache", fn=lambda: len(token_cache))
+Gauge("token_cache_hit_ratio", "Share of authenticated calls served from the token cache", fn=_hit_ratio)
+
+
+# ORM writes to a user drop their cached tokens once committed. Bulk
+# UPDATE/DELETE statements skip these events and must call
+# token_cache.invalidate_user themselves.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_tokens(mapper, connection, target):
+    state = inspect(target)
+    # Covers the old address too when the email itself changed
+    for email in (*state.attrs.email.history.deleted, target.email):
+        after_commit(state.session, lambda email=email: token_cache.invalidate_user(email))
@@ -0,0 +1,214 @@
+"""Bulk user creation from JSON lines or CSV.
+
+Every row is validated up front, in a thread off the event loop. The
+valid ones are handled in batches of USER_IMPORT_BATCH_SIZE. Emails
+already taken are looked up in one query, so their passwords are never
+hashed. The rest are hashed across a process pool of USER_IMPORT_WORKERS,
+separate from the sign-in pool.
+Each batch is written with one INSERT ... ON CONFLICT (email) statement
+and committed. Each row gets its own result: created, updated, exists,
+duplicate (earlier in the same upload), invalid or failed.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db import AsyncSessionLocal
+from app.models import User
+from app.schemas import UserCreate
+from app.utils.logger import logger
+from app.utils.metrics import Counter
+from app.utils.password_pool import PasswordPool
+from app.utils.token_cache import token_cache
+from app.utils.workspace_tree_cache import workspace_tree_cache
+
+USER_IMPORT_MAX_ROWS = int(os.getenv("USER_IMPORT_MAX_ROWS", "10000"))
+USER_IMPORT_MAX_BYTES = int(os.getenv("USER_IMPORT_MAX_BYTES", str(20 * 1024 * 1024)))
+USER_IMPORT_BATCH_SIZE = int(os.getenv("USER_IMPORT_BATCH_SIZE", "500"))
+# Processes hashing for an import; started for the import and stopped after it.
+# Half the cores by default, leaving the rest to the sign-in pool and the event loop.
+USER_IMPORT_WORKERS = int(os.getenv("USER_IMPORT_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+# Passwords per pool job; larger means less IPC, smaller means a more even spread
+USER_IMPORT_HASH_CHUNK = int(os.getenv("USER_IMPORT_HASH_CHUNK", "8"))
+
+IMPORTED_ROWS = Counter("user_import_rows_total", "Rows handled by bulk user imports", ("status",))
+
+class ImportFormatError(ValueError):
+    """The upload can't be read in the given format"""
+
+
+class ImportTooLarge(ValueError):
+    """More than USER_IMPORT_MAX_ROWS rows or USER_IMPORT_MAX_BYTES bytes"""
+
+
+class ImportBusy(Exception):
+    """Another import is running on this worker"""
+
+
+@dataclass
+class RowResult:
+    row: int
+    email: Optional[str]
+    status: str
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+def format_for(content_type: str) -> Optional[str]:
+    content_type = content_type.lower()
+    if "csv" in content_type:
+        return "csv"
+    if "json" in content_type:
+        return "jsonl"
+    return None
+
+
+def parse_rows(body: bytes, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """(line number, fields) per row; fields is whatever the line held"""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFormatError("The upload is not UTF-8")
+
+    if fmt == "jsonl":
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, f"Invalid JSON: {e.msg}"
+        return
+
+    reader = csv.DictReader(io.StringIO(text))
+    columns = {name.strip().lower() for name in reader.fieldnames or ()}
+    if not {"email", "password"} <= columns or not columns & {"name", "username"}:
+        raise ImportFormatError("CSV needs a header with email, password and name (or username) columns")
+    for fields in reader:
+        yield reader.line_num, {(k or "").strip().lower(): v for k, v in fields.items()}
+
+
+def validate_row(number: int, fields: Any) -> Union[UserCreate, RowResult]:
+    if not isinstance(fields, dict):
+        return RowResult(number, None, "invalid", error=fields if isinstance(fields, str) else "Expected an object")
+    email = fields.get("email")
+    name = fields.get("name") or fields.get("username")
+    if not name or not fields.get("password"):
+        return RowResult(number, email, "invalid", error="name and password are required")
+    try:
+        return UserCreate(username=name, email=email, password=fields["password"])
+    except ValidationError as e:
+        return RowResult(number, email, "invalid", error="; ".join(error["msg"] for error in e.errors()))
+
+
+async def import_batch(
+    batch: List[Tuple[int, UserCreate]], on_conflict: str, pool: PasswordPool
+) -> List[RowResult]:
+    results = []
+    async with AsyncSessionLocal() as db:
+        if on_conflict == "skip":
+            # Don't spend bcrypt time on users that will be skipped anyway
+            taken = set(
+                (await db.execute(select(User.email).where(User.email.in_([user.email for _, user in batch])))).scalars()
+            )
+            results.extend(RowResult(number, user.email, "exists") for number, user in batch if user.email in taken)
+            batch = [(number, user) for number, user in batch if user.email not in taken]
+        if not batch:
+            return results
+
+        hashes = await pool.hash_many([user.password for _, user in batch], USER_IMPORT_HASH_CHUNK)
+        statement = insert(User).values(
+            [
+                {"id": uuid.uuid4(), "name": user.username, "email": user.email, "password": hashed}
+                for (_, user), hashed in zip(batch, hashes)
+            ]
+        )
+        if on_conflict == "update":
+            statement = statement.on_conflict_do_update(
+                index_elements=[User.email],
+                set_={"name": statement.excluded.name, "password": statement.excluded.password},
+            )
+        else:
+            # Emails taken since the lookup above are skipped here
+            statement = statement.on_conflict_do_nothing(index_elements=[User.email])
+        # xmax is 0 on rows this statement inserted and set on rows it updated
+        written = await db.execute(statement.returning(User.id, User.email, literal_column("xmax = 0").label("inserted")))
+        rows = {row.email: row for row in written}
+        await db.commit()
+
+    for number, user in batch:
+        row = rows.get(user.email)
+        if row is None:
+            results.append(RowResult(number, user.email, "exists"))
+        elif row.inserted:
+            results.append(RowResult(number, user.email, "created", id=str(row.id)))
+        else:
+            # A bulk statement skips the ORM events that keep these caches fresh
+            token_cache.invalidate_user(user.email)
+            workspace_tree_cache.invalidate_user(row.id)
+            results.append(RowResult(number, user.email, "updated", id=str(row.id)))
+    return results
+
+
+def prepare_rows(body: bytes, fmt: str) -> Tuple[List[RowResult], List[Tuple[int, UserCreate]]]:
+    """Parse and validate ``body``: results for the rows refused, and the users to import"""
+    results: List[RowResult] = []
+    pending: List[Tuple[int, UserCreate]] = []
+    seen = set()
+    for number, fields in parse_rows(body, fmt):
+        if len(results) + len(pending) >= USER_IMPORT_MAX_ROWS:
+            raise ImportTooLarge(f"Imports are limited to {USER_IMPORT_MAX_ROWS} rows")
+        user = validate_row(number, fields)
+        if isinstance(user, RowResult):
+            results.append(user)
+        elif user.email in seen:
+            results.append(RowResult(number, user.email, "duplicate", error="Email appears earlier in the upload"))
+        else:
+            seen.add(user.email)
+            pending.append((number, user))
+    return results, pending
+
+
+_import_lock = asyncio.Lock()
+
+
+async def import_users(body: bytes, fmt: str, on_conflict: str = "skip") -> List[RowResult]:
+    """Create (or with on_conflict="update", also overwrite) the users in ``body``; a result per row"""
+    if len(body) > USER_IMPORT_MAX_BYTES:
+        raise ImportTooLarge(f"Uploads are limited to {USER_IMPORT_MAX_BYTES} bytes")
+    if _import_lock.locked():
+        raise ImportBusy("An import is already running on this worker")
+
+    async with _import_lock:
+        # Decoding and validating 10k rows takes long enough to stall the loop
+        results, pending = await run_in_threadpool(prepare_rows, body, fmt)
+
+        pool = PasswordPool(workers=max(1, min(USER_IMPORT_WORKERS, len(pending))), max_queue=0)
+        try:
+            for start in range(0, len(pending), USER_IMPORT_BATCH_SIZE):
+                batch = pending[start : start + USER_IMPORT_BATCH_SIZE]
+                try:
+                    results.extend(await import_batch(batch, on_conflict, pool))
+                except Exception as e:
+                    logger.error(f"User import batch of {len(batch)} rows failed: {e}")
+                    results.extend(RowResult(number, user.email, "failed", error=str(e)) for number, user in batch)
+        finally:
+            pool.shutdown()
+
+    for result in results:
+        IMPORTED_ROWS.inc(status=result.status)
+    results.sort(key=lambda result: result.row)
+    return results
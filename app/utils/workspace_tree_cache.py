@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, inspect
+
+from app.models import Project, Workspace
+from app.utils.commit_hooks import after_commit
+from app.utils.metrics import Counter, Gauge
+
+# 0 turns the cache off. Invalidation is per worker, so this also bounds
+# how stale a tree can be on the other workers.
+WORKSPACE_TREE_CACHE_TTL = float(os.getenv("WORKSPACE_TREE_CACHE_TTL", "30"))
+WORKSPACE_TREE_CACHE_MAX_SIZE = int(os.getenv("WORKSPACE_TREE_CACHE_MAX_SIZE", "10000"))
+
+TREE_CACHE_HITS = Counter("workspace_tree_cache_hits_total", "Workspace trees served from the cache")
+TREE_CACHE_MISSES = Counter("workspace_tree_cache_misses_total", "Workspace trees loaded from the database")
+
+
+class WorkspaceTreeCache:
+    """LRU map of user ids to their serialized workspace tree
+
+    Remembers which workspaces each cached tree holds, so a project write
+    finds the owner to invalidate without a query.
+    """
+
+    def __init__(self, ttl: float = WORKSPACE_TREE_CACHE_TTL, max_size: int = WORKSPACE_TREE_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        # Bumped by every invalidation; a tree loaded across one is not cached
+        self.generation = 0
+        self._entries: "OrderedDict[Any, Tuple[Any, float, Tuple[Any, ...]]]" = OrderedDict()
+        self._owners: Dict[Any, Any] = {}
+        # ORM events fire on whichever thread flushes
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                TREE_CACHE_HITS.inc()
+                return entry[0]
+            if entry is not None:
+                self._drop(user_id)
+        TREE_CACHE_MISSES.inc()
+        return None
+
+    def put(self, user_id: Any, tree: Any, workspace_ids: Iterable[Any], generation: int):
+        """Cache ``tree`` unless something was invalidated since ``generation`` was read"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._drop(user_id)
+            workspace_ids = tuple(workspace_ids)
+            self._entries[user_id] = (tree, time.monotonic() + self.ttl, workspace_ids)
+            for workspace_id in workspace_ids:
+                self._owners[workspace_id] = user_id
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: Any):
+        with self._lock:
+            self.generation += 1
+            self._drop(user_id)
+
+    def invalidate_workspace(self, workspace_id: Any):
+        """Drop the tree holding this workspace, if one is cached"""
+        with self._lock:
+            self.generation += 1
+            user_id = self._owners.get(workspace_id)
+            if user_id is not None:
+                self._drop(user_id)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._owners.clear()
+
+    def _drop(self, user_id: Any):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        for workspace_id in entry[2]:
+            if self._owners.get(workspace_id) == user_id:
+                del self._owners[workspace_id]
+
+
+workspace_tree_cache = WorkspaceTreeCache()
+
+
+Gauge("workspace_tree_cache_entries", "Workspace trees held in the cache", fn=lambda: len(workspace_tree_cache))
+
+
+# ORM writes drop the trees they change once their transaction commits. Bulk
+# INSERT/UPDATE/DELETE statements skip these events and must invalidate the
+# cache themselves.
+@event.listens_for(Workspace, "after_insert")
+@event.listens_for(Workspace, "after_update")
+@event.listens_for(Workspace, "after_delete")
+def _invalidate_workspace_owner(mapper, connection, target):
+    state = inspect(target)
+    # Covers the previous owner too when the workspace changed hands
+    for owner_id in (*state.attrs.owner_id.history.deleted, target.owner_id):
+        after_commit(state.session, lambda owner_id=owner_id: workspace_tree_cache.invalidate_user(owner_id))
+
+
+@event.listens_for(Project, "after_insert")
+@event.listens_for(Project, "after_update")
+@event.listens_for(Project, "after_delete")
+def _invalidate_project_workspace(mapper, connection, target):
+    state = inspect(target)
+    for workspace_id in (*state.attrs.workspace_id.history.deleted, target.workspace_id):
+        after_commit(
+            state.session, lambda workspace_id=workspace_id: workspace_tree_cache.invalidate_workspace(workspace_id)
+        )
@@ -0,0 +1,109 @@
+"""Event-loop latency while auth lookups run concurrently.
+
+A probe task sleeps for 5 ms in a loop and records how late it wakes up.
+Meanwhile N concurrent workers resolve tokens to users, once with the old
+blocking ``db.query(User)`` on the loop and once through the async engine
+used by ``user_for_token``. Flat probe latency means SSE streams in the
+same worker keep flowing.
+
+Needs a reachable DATABASE_URL with migrations applied.
+
+    python -m benchmarks.bench_event_loop_lag --concurrency 50 --lookups 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from app.api.dependencies import user_for_token
+from app.db import AsyncSessionLocal, SessionLocal, async_engine
+from app.models import User
+from app.utils.auth import create_access_token
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def blocking_lookup(email: str):
+    # What the handler did before: a sync session queried on the event loop
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.email == email).first()
+    finally:
+        db.close()
+
+
+async def async_lookup(token: str):
+    async with AsyncSessionLocal() as db:
+        await user_for_token(token, db)
+
+
+async def run(name: str, lookup, concurrency: int, lookups: int):
+    lags: list = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.1)
+
+    async def worker():
+        for _ in range(lookups):
+            await lookup()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1] if len(lags_ms) > 1 else lags_ms[0]
+    print(
+        f"{name:>9}: {concurrency * lookups / elapsed:8.0f} lookups/s  "
+        f"loop lag p50 {statistics.median(lags_ms):6.2f} ms  p99 {p99:6.2f} ms  max {lags_ms[-1]:6.2f} ms"
+    )
+
+
+def ensure_user() -> str:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    db = SessionLocal()
+    try:
+        db.add(User(id=uuid.uuid4(), name="bench", email=email, password="x"))
+        db.commit()
+    finally:
+        db.close()
+    return email
+
+
+def remove_user(email: str):
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.email == email).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=20)
+    args = parser.parse_args()
+
+    email = ensure_user()
+    token = create_access_token({"sub": email})
+    try:
+        await run("blocking", lambda: blocking_lookup(email), args.concurrency, args.lookups)
+        await run("async", lambda: async_lookup(token), args.concurrency, args.lookups)
+    finally:
+        remove_user(email)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""Page latency at increasing depth: keyset cursors vs OFFSET.
+
+Seeds one workspace with --rows projects (a million by default) in a
+single INSERT ... SELECT generate_series, then reads a page of --limit
+projects at each depth. It runs the list endpoint's own keyset query
+(app.utils.pagination.keyset_page) and the OFFSET query it replaced. It
+reports the median of --repeat reads per depth. Keyset stays flat because
+ix_projects_workspace_id_name_id lets Postgres seek to the cursor. OFFSET
+grows with depth because it reads and throws away every earlier row. The
+seeded user, workspace and projects are deleted afterwards unless --keep.
+
+Needs a reachable DATABASE_URL with migrations applied.
+
+    python -m benchmarks.bench_pagination --rows 1000000 --limit 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, select, text
+
+from app.api.v1.workspaces import PROJECT_ORDER
+from app.db import AsyncSessionLocal, async_engine
+from app.models import Project, User, Workspace
+from app.utils.pagination import encode_cursor, keyset_page
+
+
+async def seed(rows: int) -> uuid.UUID:
+    user_id, workspace_id = uuid.uuid4(), uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=user_id, name="bench", email=f"bench-{user_id}@example.com", password="-"))
+        db.add(Workspace(id=workspace_id, name="bench", owner_id=user_id))
+        await db.commit()
+        started = time.perf_counter()
+        await db.execute(
+            text(
+                "INSERT INTO projects (id, name, workspace_id) "
+                "SELECT gen_random_uuid(), 'project ' || lpad(n::text, 8, '0'), :workspace_id "
+                "FROM generate_series(1, :rows) AS n"
+            ),
+            {"workspace_id": workspace_id, "rows": rows},
+        )
+        await db.commit()
+        await db.execute(text("ANALYZE projects"))
+        await db.commit()
+    print(f"seeded {rows} projects in {time.perf_counter() - started:.1f}s")
+    return workspace_id
+
+
+async def cleanup(workspace_id: uuid.UUID):
+    async with AsyncSessionLocal() as db:
+        owner_id = (await db.get(Workspace, workspace_id)).owner_id
+        await db.execute(delete(Project).where(Project.workspace_id == workspace_id))
+        await db.execute(delete(Workspace).where(Workspace.id == workspace_id))
+        await db.execute(delete(User).where(User.id == owner_id))
+        await db.commit()
+
+
+async def timed(read, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await read()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+async def main(args):
+    workspace_id = await seed(args.rows)
+    query = select(Project).where(Project.workspace_id == workspace_id)
+    depths = sorted({d for d in (0, 1_000, 10_000, 100_000, 500_000, args.rows - args.limit) if 0 <= d < args.rows})
+    try:
+        async with AsyncSessionLocal() as db:
+            plan = await db.execute(
+                text(
+                    "EXPLAIN SELECT * FROM projects WHERE workspace_id = :workspace_id "
+                    "AND (name, id) > ('project 00500000', '00000000-0000-0000-0000-000000000000'::uuid) "
+                    "ORDER BY name, id LIMIT 51"
+                ),
+                {"workspace_id": workspace_id},
+            )
+            print("keyset plan:", " / ".join(row[0].strip() for row in plan)[:200])
+
+            print(f"{'depth':>10} {'keyset ms':>10} {'offset ms':>10}")
+            for depth in depths:
+                cursor = None
+                if depth:
+                    # The cursor a client would hold at this depth, found once and not timed
+                    last = (await db.execute(query.order_by(*PROJECT_ORDER).offset(depth - 1).limit(1))).scalar_one()
+                    cursor = encode_cursor([getattr(last, key.key) for key in PROJECT_ORDER])
+
+                async def by_keyset():
+                    rows, _ = await keyset_page(db, query, PROJECT_ORDER, cursor, args.limit)
+                    db.expunge_all()
+                    return rows
+
+                async def by_offset():
+                    result = await db.execute(query.order_by(*PROJECT_ORDER).offset(depth).limit(args.limit))
+                    rows = list(result.scalars())
+                    db.expunge_all()
+                    return rows
+
+                keyset_ms = await timed(by_keyset, args.repeat)
+                offset_ms = await timed(by_offset, args.repeat)
+                print(f"{depth:>10} {keyset_ms:>10.2f} {offset_ms:>10.2f}")
+    finally:
+        if not args.keep:
+            await cleanup(workspace_id)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    asyncio.run(main(parser.parse_args()))
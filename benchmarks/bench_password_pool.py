@@ -0,0 +1,73 @@
+"""Password verification throughput through the bcrypt process pool.
+
+For 1..N worker processes, runs a burst of concurrent verifications and
+reports sign-ins per second and per core, then fires a burst larger than
+the admission limit to show how many are refused with PasswordPoolBusy.
+
+    python -m benchmarks.bench_password_pool --requests 64
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.utils.auth import hash_password
+from app.utils.password_pool import PasswordPool, PasswordPoolBusy
+
+
+async def throughput(workers: int, requests: int, hashed: str):
+    pool = PasswordPool(workers=workers, max_queue=requests)
+    pool.start()
+    # Spawn the worker processes before timing
+    await asyncio.gather(*(pool.verify("secret", hashed) for _ in range(workers)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(pool.verify("secret", hashed) for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+
+    per_second = requests / elapsed
+    print(f"{workers:>7} {per_second:>12.1f} {per_second / workers:>14.1f}")
+
+
+async def admission(workers: int, max_queue: int, burst: int, hashed: str):
+    pool = PasswordPool(workers=workers, max_queue=max_queue)
+    pool.start()
+
+    async def attempt():
+        started = time.perf_counter()
+        try:
+            await pool.verify("secret", hashed)
+            return True, time.perf_counter() - started
+        except PasswordPoolBusy:
+            return False, time.perf_counter() - started
+
+    results = await asyncio.gather(*(attempt() for _ in range(burst)))
+    pool.shutdown()
+
+    refused = [elapsed for ok, elapsed in results if not ok]
+    print(
+        f"burst of {burst} against {workers} workers + {max_queue} queued: "
+        f"{burst - len(refused)} served, {len(refused)} refused"
+        + (f" in at most {max(refused) * 1000:.2f} ms" if refused else "")
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed = hash_password("secret")
+    print(f"{'workers':>7} {'sign-ins/s':>12} {'per core/s':>14}")
+    workers = 1
+    while workers <= args.max_workers:
+        await throughput(workers, args.requests, hashed)
+        workers *= 2
+
+    await admission(workers=1, max_queue=4, burst=args.requests, hashed=hashed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""Evaluation of the local pre-router against routing_eval.jsonl.
+
+Each line holds a user message and where it should go: a sub-agent name,
+or "manager" when the intent is ambiguous and the manager model should
+decide. Reports routing accuracy, how many turns skip the manager, the
+misroutes and the classifier's own cost.
+
+It then measures the time to first token of every case end to end, with
+the pre-router on and off, against the fake model backend. Each case is
+the opening turn of a primed session, as the pool hands them out. With
+the pre-router off, the fake manager answers with transfer_to_agent and
+ADK reconnects to the sub-agent, as the real manager does. With it on, a
+routed turn closes the primed manager connection and opens one at the
+sub-agent, so it pays --connect-ms instead. A misrouted sub-agent hands
+the turn on with another transfer. Ambiguous cases go to chat_agent.
+
+    python -m benchmarks.bench_prerouter --connect-ms 400 --latency-ms 700
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+os.environ.setdefault("AGENT_MODEL_BACKEND", "fake")
+os.environ.setdefault("CHAT_SESSION_STORE", "memory")
+os.environ.setdefault("CHAT_RESPONSE_CACHE_MAX_BYTES", "0")
+os.environ.setdefault("CHAT_SEND_RATE_PER_USER", "0")
+
+import app.chat.session as chat_session  # noqa: E402
+from app.agent.analyst_agent.agent import root_agent  # noqa: E402
+from app.agent.runtime import init_runtime  # noqa: E402
+from app.chat.prerouter import MANAGER, pre_router  # noqa: E402
+
+EVAL_SET = Path(__file__).with_name("routing_eval.jsonl")
+# Who the fake manager hands ambiguous turns to
+MANAGER_DEFAULT = "chat_agent"
+
+
+def evaluate(cases):
+    outcomes = Counter()
+    wrong = []
+    for case in cases:
+        routed = pre_router.classify(case["text"]) or MANAGER
+        expected = case["expected"]
+        if routed == expected:
+            case["outcome"] = "direct_correct" if routed != MANAGER else "fallback_correct"
+        elif routed == MANAGER:
+            case["outcome"] = "missed"
+            wrong.append((case["text"], expected, routed))
+        else:
+            case["outcome"] = "misrouted"
+            wrong.append((case["text"], expected, routed))
+        outcomes[case["outcome"]] += 1
+    return outcomes, wrong
+
+
+async def first_token_ms(text: str, args) -> float:
+    session = await chat_session.new_live_session()
+    session.prime()
+    # The primed manager connection is open before the message arrives
+    await asyncio.sleep(args.connect_ms / 1000 + 0.05)
+    events = session.events()
+    try:
+        started = time.perf_counter()
+        session.send_text(text)
+        async for event in events:
+            part = event.content and event.content.parts and event.content.parts[0]
+            if part and part.text:
+                return (time.perf_counter() - started) * 1000
+        raise RuntimeError(f"No answer to {text!r}")
+    finally:
+        await events.aclose()
+        await session.close()
+
+
+async def measure(cases, prerouter: bool, args) -> list:
+    chat_session.CHAT_PREROUTER_ENABLED = prerouter
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def one(case):
+        async with limit:
+            return await first_token_ms(case["text"], args)
+
+    return await asyncio.gather(*(one(case) for case in cases))
+
+
+async def measure_ttft(cases, args):
+    init_runtime()
+    # One FakeLlm serves the whole agent tree
+    expected = {case["text"]: case["expected"] for case in cases}
+    root_agent.model.answered_by = lambda prompt: (
+        MANAGER_DEFAULT if expected.get(prompt, MANAGER) == MANAGER else expected[prompt]
+    )
+    root_agent.model.connect_ms = args.connect_ms
+    root_agent.model.latency_ms = args.latency_ms
+    return await measure(cases, False, args), await measure(cases, True, args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eval-set", type=Path, default=EVAL_SET)
+    parser.add_argument("--connect-ms", type=float, default=400)
+    parser.add_argument("--latency-ms", type=float, default=700)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--skip-ttft", action="store_true", help="only report routing accuracy")
+    parser.add_argument("--verbose", action="store_true", help="print every wrong decision")
+    args = parser.parse_args()
+
+    cases = [json.loads(line) for line in args.eval_set.read_text().splitlines() if line.strip()]
+    outcomes, wrong = evaluate(cases)
+
+    rounds = 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for case in cases:
+            pre_router.classify(case["text"])
+    per_call_us = (time.perf_counter() - started) / (rounds * len(cases)) * 1e6
+
+    total = len(cases)
+    direct = outcomes["direct_correct"] + outcomes["misrouted"]
+    print(f"cases                     {total}")
+    print(f"accuracy                  {(outcomes['direct_correct'] + outcomes['fallback_correct']) / total:.1%}")
+    print(f"routed directly           {direct} ({direct / total:.1%})")
+    print(f"  correct                 {outcomes['direct_correct']}")
+    print(f"  misrouted               {outcomes['misrouted']}")
+    print(f"left to manager           {total - direct}")
+    print(f"  clear intents missed    {outcomes['missed']}")
+    print(f"classifier cost           {per_call_us:.1f} us/turn")
+
+    if args.verbose:
+        for text, expected, routed in wrong:
+            print(f"  {text!r}: expected {expected}, routed {routed}")
+    if args.skip_ttft:
+        return
+
+    off, on = asyncio.run(measure_ttft(cases, args))
+    print(f"TTFT, opening turn        connect {args.connect_ms:.0f} ms, model latency {args.latency_ms:.0f} ms")
+    print(f"  {'':24}{'off ms':>9}{'on ms':>9}{'saved ms':>10}")
+    groups = [("all", list(range(total)))] + [
+        (outcome, [i for i, case in enumerate(cases) if case["outcome"] == outcome])
+        for outcome in ("direct_correct", "misrouted", "missed", "fallback_correct")
+    ]
+    for name, indexes in groups:
+        if not indexes:
+            continue
+        mean_off = statistics.mean(off[i] for i in indexes)
+        mean_on = statistics.mean(on[i] for i in indexes)
+        print(f"  {name:<18}{len(indexes):>4}  {mean_off:>9.0f}{mean_on:>9.0f}{mean_off - mean_on:>10.0f}")
+    print(f"TTFT saved, mean per turn {statistics.mean(off) - statistics.mean(on):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
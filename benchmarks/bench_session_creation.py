@@ -0,0 +1,69 @@
+"""Session creation cost: a runner per session vs the shared runner.
+
+Creates 1, 100 and 1,000 sessions with each strategy and reports wall time
+and traced Python memory per session. No model traffic happens; the live
+event generator is created but never iterated.
+
+    python -m benchmarks.bench_session_creation
+"""
+import asyncio
+import gc
+import time
+import tracemalloc
+import uuid
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.runners import InMemoryRunner
+
+from app.agent.analyst_agent.agent import root_agent
+from app.agent.runtime import APP_NAME, RUN_CONFIG, init_runtime, start_agent_session
+
+SESSION_COUNTS = (1, 100, 1000)
+
+
+async def per_session_runner(user_id: str):
+    # The pre-change behaviour of start_agent_session
+    runner = InMemoryRunner(app_name=APP_NAME, agent=root_agent)
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user_id)
+    live_request_queue = LiveRequestQueue()
+    live_events = runner.run_live(
+        session=session,
+        live_request_queue=live_request_queue,
+        run_config=RUN_CONFIG,
+    )
+    return live_events, live_request_queue
+
+
+async def measure(factory, count: int):
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+
+    sessions = [await factory(str(uuid.uuid4())) for _ in range(count)]
+
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for live_events, live_request_queue in sessions:
+        live_request_queue.close()
+        await live_events.aclose()
+    return elapsed / count, (current - base) / count
+
+
+async def main():
+    init_runtime()
+    # Warm imports and lazy ADK state so neither side pays for them
+    await measure(per_session_runner, 1)
+    await measure(start_agent_session, 1)
+
+    print(f"{'sessions':>8} {'strategy':>10} {'ms/session':>11} {'KiB/session':>12}")
+    for count in SESSION_COUNTS:
+        for name, factory in (("before", per_session_runner), ("after", start_agent_session)):
+            seconds, size = await measure(factory, count)
+            print(f"{count:>8} {name:>10} {seconds * 1000:>11.3f} {size / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
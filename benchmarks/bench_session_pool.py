@@ -0,0 +1,73 @@
+"""Time to first token of a session's first turn: primed pool vs built inline.
+
+Runs in process against the fake model backend, whose live connections
+take --connect-ms to open. For each strategy, takes --sessions sessions
+from a SessionPool, sends a message straight away and times until the
+first agent event. With --pool-size 0 every session is built inline, so
+the first turn pays for session setup and the connection. With a pool,
+sessions were primed ahead of time and only the model latency is left.
+
+    python -m benchmarks.bench_session_pool --connect-ms 400 --latency-ms 300
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("AGENT_MODEL_BACKEND", "fake")
+os.environ.setdefault("CHAT_SESSION_STORE", "memory")
+os.environ.setdefault("CHAT_PREROUTER_ENABLED", "false")
+
+from app.agent.analyst_agent.agent import root_agent  # noqa: E402
+from app.agent.runtime import init_runtime  # noqa: E402
+from app.chat.pool import SessionPool  # noqa: E402
+
+
+async def first_token_ms(pool: SessionPool) -> float:
+    started = time.perf_counter()
+    session = await pool.acquire()
+    session.send_text("What is correlation?", use_cache=False)
+    events = session.events()
+    try:
+        await events.__anext__()
+    finally:
+        await events.aclose()
+        await session.close()
+    return (time.perf_counter() - started) * 1000
+
+
+async def measure(pool_size: int, args) -> list:
+    pool = SessionPool(size=pool_size)
+    await pool.start()
+    timings = []
+    for _ in range(args.sessions):
+        # Give the pool time to refill and its connections time to open
+        deadline = time.monotonic() + 10
+        while len(pool) < pool_size and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(args.connect_ms / 1000 + 0.05)
+        timings.append(await first_token_ms(pool))
+    await pool.stop()
+    return timings
+
+
+async def main(args):
+    init_runtime()
+    # One FakeLlm serves the whole agent tree
+    root_agent.model.connect_ms = args.connect_ms
+    root_agent.model.latency_ms = args.latency_ms
+
+    print(f"{'strategy':>10} {'p50 ms':>8} {'max ms':>8}")
+    for name, size in (("inline", 0), ("pooled", args.pool_size)):
+        timings = await measure(size, args)
+        print(f"{name:>10} {statistics.median(timings):>8.1f} {max(timings):>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--connect-ms", type=float, default=400, help="fake live connection setup time")
+    parser.add_argument("--latency-ms", type=float, default=300, help="fake model latency to the first token")
+    asyncio.run(main(parser.parse_args()))
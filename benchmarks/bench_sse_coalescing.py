@@ -0,0 +1,94 @@
+"""SSE frames and CPU per streamed token, with and without coalescing.
+
+Feeds agent_to_client_sse a synthetic live event stream (many small
+partial-text events per turn, then the final text and turn_complete) from
+many concurrent sessions, and reports frames sent, frames per second and
+process CPU time per token for each coalescing window. CPU spent producing
+the synthetic events is measured separately and subtracted.
+
+    python -m benchmarks.bench_sse_coalescing --sessions 200 --tokens 300
+"""
+import argparse
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from app.api.v1.chat import agent_to_client_sse
+
+
+def text_event(text: str, partial: bool):
+    part = SimpleNamespace(text=text)
+    return SimpleNamespace(
+        turn_complete=False,
+        interrupted=False,
+        partial=partial,
+        content=SimpleNamespace(parts=[part]),
+    )
+
+
+async def live_events(tokens: int, token_interval: float):
+    words = []
+    for i in range(tokens):
+        word = f"tok{i} "
+        words.append(word)
+        yield text_event(word, partial=True)
+        await asyncio.sleep(token_interval)
+    yield text_event("".join(words), partial=False)
+    yield SimpleNamespace(turn_complete=True, interrupted=False, partial=None, content=None)
+
+
+async def stream(tokens: int, token_interval: float, window_ms: float) -> int:
+    frames = 0
+    async for _ in agent_to_client_sse(live_events(tokens, token_interval), coalesce_window_ms=window_ms):
+        frames += 1
+    return frames
+
+
+async def drain(tokens: int, token_interval: float) -> int:
+    async for _ in live_events(tokens, token_interval):
+        pass
+    return 0
+
+
+async def producer_cpu(sessions: int, tokens: int, token_interval: float) -> float:
+    cpu = time.process_time()
+    await asyncio.gather(*(drain(tokens, token_interval) for _ in range(sessions)))
+    return time.process_time() - cpu
+
+
+async def run(sessions: int, tokens: int, token_interval: float, window_ms: float, baseline: float):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    frames = sum(await asyncio.gather(*(stream(tokens, token_interval, window_ms) for _ in range(sessions))))
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu - baseline
+
+    total_tokens = sessions * tokens
+    label = "off" if window_ms <= 0 else f"{window_ms:g} ms"
+    print(
+        f"{label:>8} {frames:>9} {frames / wall:>11.0f} {cpu / total_tokens * 1e6:>14.2f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-interval-ms", type=float, default=0.5)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 25, 50])
+    args = parser.parse_args()
+
+    # Measure framing only; frame logging is sampled and off the loop anyway
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    token_interval = args.token_interval_ms / 1000
+    baseline = await producer_cpu(args.sessions, args.tokens, token_interval)
+
+    print(f"{'window':>8} {'frames':>9} {'frames/s':>11} {'CPU us/token':>14}")
+    for window_ms in args.windows:
+        await run(args.sessions, args.tokens, token_interval, window_ms, baseline)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""Worker startup: import time of app.main, and time until /health and /ready answer.
+
+Runs ``python -X importtime -c "import app.main"`` in fresh interpreters and
+reports the median cumulative import time, the slowest top-level imports,
+and whether the agent stack (google.adk, google.genai) was imported at all;
+it should only load during warmup. Then boots uvicorn a few times and
+measures how long until /health (serving) and /ready (warmup done) answer.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --max-import-ms 1000 --skip-boot   # fail on regressions
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+HOST = "127.0.0.1"
+LAZY_PACKAGES = ("google.adk", "google.genai")
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_profile(module: str):
+    """(cumulative us per imported module, top-level imports of ``module`` with their cumulative us)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=os.environ,
+        check=True,
+    )
+    cumulative = {}
+    children = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        _, total, indent, name = match.groups()
+        cumulative[name] = int(total)
+        # importtime indents nested imports by two spaces per level
+        if len(indent) == 3:
+            children.append((name, int(total)))
+    return cumulative, children
+
+
+def boot_times(port: int):
+    """Seconds from process start until /health, then /ready, return 200"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(port), "--log-level", "warning"],
+        env=os.environ,
+    )
+    healthy = ready = None
+    try:
+        with httpx.Client(base_url=f"http://{HOST}:{port}", timeout=1) as http:
+            while ready is None and time.perf_counter() - started < 120:
+                try:
+                    if healthy is None and http.get("/health").status_code == 200:
+                        healthy = time.perf_counter() - started
+                    if healthy is not None and http.get("/ready").status_code == 200:
+                        ready = time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.02)
+    finally:
+        server.terminate()
+        server.wait()
+    return healthy, ready
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--boots", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--skip-boot", action="store_true", help="only measure imports")
+    parser.add_argument("--max-import-ms", type=float, help="exit 1 if the median import time is above this")
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [cumulative[args.module] / 1000 for cumulative, _ in profiles]
+    median_ms = statistics.median(totals)
+    cumulative, children = profiles[-1]
+    eager = [name for name in LAZY_PACKAGES if name in cumulative]
+
+    print(f"import {args.module}: median {median_ms:.0f} ms, min {min(totals):.0f} ms over {args.runs} runs")
+    print(f"agent stack imported eagerly: {', '.join(eager) if eager else 'no'}")
+    print(f"slowest imports under {args.module}:")
+    for name, total in sorted(children, key=lambda child: child[1], reverse=True)[: args.top]:
+        print(f"  {total / 1000:>8.1f} ms  {name}")
+
+    if not args.skip_boot:
+        runs = [boot_times(args.port) for _ in range(args.boots)]
+        healthy = [h for h, _ in runs if h is not None]
+        ready = [r for _, r in runs if r is not None]
+        if healthy:
+            print(f"/health answering after {statistics.median(healthy):.2f} s (median of {len(healthy)})")
+        if ready:
+            print(f"/ready answering after  {statistics.median(ready):.2f} s (median of {len(ready)})")
+        if len(ready) < len(runs):
+            print(f"{len(runs) - len(ready)} boot(s) never became ready")
+
+    if args.max_import_ms is not None and median_ms > args.max_import_ms:
+        print(f"FAIL: import time {median_ms:.0f} ms is above {args.max_import_ms:.0f} ms")
+        sys.exit(1)
+    if eager:
+        print(f"FAIL: {args.module} imports {', '.join(eager)} eagerly")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Landing page serving: FileResponse from disk vs the in-memory static assets.
+
+Requests static/index.html through the ASGI stack in process (no sockets,
+so the difference is the serving path itself) as concurrent page loads,
+and reports requests per second and body bytes per response for: the old
+FileResponse, the in-memory copy uncompressed, the precompressed gzip
+variant, and a revalidation answered with 304.
+
+    python -m benchmarks.bench_static --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+
+from app.utils.static_assets import STATIC_DIR, StaticAssets
+
+
+def build_app(assets: StaticAssets) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/disk")
+    def disk():
+        return FileResponse(STATIC_DIR / "index.html")
+
+    @app.get("/memory")
+    async def memory(request: Request):
+        return assets.response(request, "index.html")
+
+    return app
+
+
+async def measure(http: httpx.AsyncClient, path: str, headers: dict, requests: int, concurrency: int):
+    sizes = []
+
+    async def worker(count: int):
+        for _ in range(count):
+            response = await http.get(path, headers=headers)
+            sizes.append(int(response.headers.get("content-length", 0)))
+
+    started = time.perf_counter()
+    share, extra = divmod(requests, concurrency)
+    await asyncio.gather(*(worker(share + (i < extra)) for i in range(concurrency)))
+    return requests / (time.perf_counter() - started), sum(sizes) / len(sizes)
+
+
+async def main(args):
+    assets = StaticAssets(reload_interval=0)
+    assets.load()
+    asset = assets.get("index.html")
+    if asset is None:
+        raise SystemExit(f"No index.html in {STATIC_DIR}")
+    etag = (asset.gzip or asset.identity).etag
+    cases = (
+        ("FileResponse (disk)", "/disk", {"accept-encoding": "gzip"}),
+        ("memory, identity", "/memory", {"accept-encoding": "identity"}),
+        ("memory, gzip", "/memory", {"accept-encoding": "gzip"}),
+        ("memory, 304", "/memory", {"accept-encoding": "gzip", "if-none-match": etag}),
+    )
+    transport = httpx.ASGITransport(app=build_app(assets))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        print(f"{'path':<22} {'req/s':>9} {'bytes/resp':>11}")
+        for name, path, headers in cases:
+            await measure(http, path, headers, min(200, args.requests), args.concurrency)
+            rate, size = await measure(http, path, headers, args.requests, args.concurrency)
+            print(f"{name:<22} {rate:>9.0f} {size:>11.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
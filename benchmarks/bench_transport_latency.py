@@ -0,0 +1,153 @@
+"""Round-trip latency of the SSE + POST pair vs the WebSocket transport.
+
+Starts the app in a child process whose agent sessions echo each message
+back as one final text frame, so only transport overhead is measured. Each
+client opens a session, sends messages one at a time and times from send
+to the echoed frame.
+
+    python -m benchmarks.bench_transport_latency --clients 20 --messages 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+import websockets
+
+HOST = "127.0.0.1"
+
+
+def echo_agent_sessions():
+    """Swap the model-backed live session for an echo of each user message"""
+    from google.adk.agents import LiveRequestQueue
+
+    import app.chat.session
+
+    async def start_echo_session(user_id: str, resume: bool = False):
+        live_request_queue = LiveRequestQueue()
+
+        async def live_events():
+            while True:
+                request = await live_request_queue.get()
+                if request.close:
+                    return
+                text = request.content.parts[0].text
+                part = SimpleNamespace(text=text)
+                yield SimpleNamespace(
+                    author="chat_agent", turn_complete=False, interrupted=False, partial=False,
+                    content=SimpleNamespace(parts=[part]),
+                )
+                yield SimpleNamespace(
+                    author="chat_agent", turn_complete=True, interrupted=False, partial=None, content=None
+                )
+
+        return live_events(), live_request_queue
+
+    app.chat.session.start_agent_session = start_echo_session
+
+
+def serve(port: int):
+    import uvicorn
+
+    echo_agent_sessions()
+    uvicorn.run("app.main:app", host=HOST, port=port, log_level="warning")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def start_session(http: httpx.AsyncClient) -> str:
+    response = await http.post("/api/v1/chat/start-session", json={})
+    return response.json()["data"]["session_id"]
+
+
+async def sse_client(base: str, messages: int) -> list:
+    latencies = []
+    async with httpx.AsyncClient(base_url=base, timeout=30) as http:
+        session_id = await start_session(http)
+        async with http.stream("GET", f"/api/v1/chat/stream/{session_id}") as stream:
+            lines = stream.aiter_lines()
+            for i in range(messages):
+                started = time.perf_counter()
+                await http.post(f"/api/v1/chat/send/{session_id}", json={"mime_type": "text/plain", "data": f"m{i}"})
+                async for line in lines:
+                    if line.startswith("data: ") and json.loads(line[6:]).get("type") == "text":
+                        break
+                latencies.append(time.perf_counter() - started)
+        await http.delete(f"/api/v1/chat/end-session/{session_id}")
+    return latencies
+
+
+async def ws_client(base: str, messages: int) -> list:
+    latencies = []
+    async with httpx.AsyncClient(base_url=base, timeout=30) as http:
+        session_id = await start_session(http)
+    ws_url = base.replace("http://", "ws://") + f"/api/v1/chat/ws/{session_id}"
+    async with websockets.connect(ws_url) as socket:
+        for i in range(messages):
+            started = time.perf_counter()
+            await socket.send(json.dumps({"mime_type": "text/plain", "data": f"m{i}"}))
+            while json.loads(await socket.recv()).get("type") != "text":
+                pass
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def run(name: str, client, base: str, clients: int, messages: int):
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client(base, messages) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies = [latency * 1000 for result in results for latency in result]
+    print(
+        f"{name:>9} {len(latencies) / elapsed:>10.0f} {statistics.median(latencies):>9.2f} "
+        f"{percentile(latencies, 0.99):>9.2f}"
+    )
+
+
+async def main(args):
+    base = f"http://{HOST}:{args.port}"
+    # Measure transport overhead, not the send rate limits or the response cache
+    env = dict(
+        os.environ, CHAT_SEND_RATE_PER_USER="0", CHAT_SEND_RATE_PER_IP="0", CHAT_RESPONSE_CACHE_MAX_BYTES="0"
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_transport_latency", "--serve", "--port", str(args.port)],
+        env=env,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=base) as http:
+            for _ in range(100):
+                try:
+                    await http.get("/api/v1/chat/active-sessions")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+        print(f"{'transport':>9} {'msgs/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+        await run("sse+post", sse_client, base, args.clients, args.messages)
+        await run("websocket", ws_client, base, args.clients, args.messages)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+    else:
+        asyncio.run(main(args))
@@ -0,0 +1,76 @@
+"""Users created per second: a loop over /create-user vs one bulk import.
+
+Calls the real endpoints in process through the ASGI app. First it
+creates --loop-users users one /create-user call at a time, as
+provisioning scripts do today. Then it sends --users users to
+/admin/users/import as JSON lines. Reports users per second for both
+and the speedup. The bulk path scales with USER_IMPORT_WORKERS, since
+bcrypt dominates both. The created users are deleted afterwards.
+
+Needs a reachable DATABASE_URL with migrations applied.
+
+    python -m benchmarks.bench_user_import --users 2000 --loop-users 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import httpx
+from sqlalchemy import delete
+
+ADMIN_TOKEN = os.environ.setdefault("ADMIN_API_TOKEN", f"bench-{uuid.uuid4()}")
+
+from app.db import AsyncSessionLocal, async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import User  # noqa: E402
+from app.utils.password_pool import password_pool  # noqa: E402
+from app.utils.user_import import USER_IMPORT_WORKERS  # noqa: E402
+
+
+async def main(args):
+    run = uuid.uuid4().hex[:8]
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            started = time.perf_counter()
+            for i in range(args.loop_users):
+                response = await http.post(
+                    "/api/v1/auth/create-user",
+                    json={"username": f"loop {i}", "email": f"loop-{run}-{i}@example.com", "password": f"pw-{i}"},
+                )
+                response.raise_for_status()
+            loop_rate = args.loop_users / (time.perf_counter() - started)
+
+            body = "\n".join(
+                json.dumps({"name": f"bulk {i}", "email": f"bulk-{run}-{i}@example.com", "password": f"pw-{i}"})
+                for i in range(args.users)
+            )
+            started = time.perf_counter()
+            response = await http.post(
+                "/api/v1/admin/users/import",
+                content=body.encode(),
+                headers={"content-type": "application/x-ndjson", "x-admin-token": ADMIN_TOKEN},
+            )
+            response.raise_for_status()
+            bulk_rate = args.users / (time.perf_counter() - started)
+            summary = response.json()["data"]["summary"]
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.email.like(f"%-{run}-%@example.com")))
+            await db.commit()
+        password_pool.shutdown()
+        await async_engine.dispose()
+
+    print(f"create-user loop: {loop_rate:8.1f} users/s ({args.loop_users} users)")
+    print(f"bulk import:      {bulk_rate:8.1f} users/s ({args.users} users, {USER_IMPORT_WORKERS} hash workers) {summary}")
+    print(f"speedup:          {bulk_rate / loop_rate:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000, help="users in the bulk import")
+    parser.add_argument("--loop-users", type=int, default=50, help="users created one call at a time")
+    asyncio.run(main(parser.parse_args()))
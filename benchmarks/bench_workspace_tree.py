@@ -0,0 +1,111 @@
+"""Queries and latency of the workspace tree, against one query per workspace.
+
+For each workspace count, seeds a user with that many workspaces of
+--projects projects each. It then loads the tree twice: once with
+load_workspace_tree, which the /workspaces/tree endpoint uses, and once
+with the per-workspace loop that lazy loading amounts to. It counts
+statements with a cursor-execute hook on the engine. Exits 1 if the
+tree's query count grows with the number of workspaces beyond selectin's
+one IN query per 500 parents, so it can run as a regression check.
+
+Needs a reachable DATABASE_URL with migrations applied.
+
+    python -m benchmarks.bench_workspace_tree --workspaces 1,10,100,1000 --projects 5
+"""
+import argparse
+import asyncio
+import math
+import sys
+import time
+import uuid
+
+from sqlalchemy import delete, event, insert, select
+
+from app.api.v1.workspaces import load_workspace_tree
+from app.db import AsyncSessionLocal, async_engine
+from app.models import Project, User, Workspace
+
+# selectinload's IN batch size
+SELECTIN_BATCH = 500
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+async def seed(workspaces: int, projects: int) -> User:
+    user = User(id=uuid.uuid4(), name="bench", email=f"bench-{uuid.uuid4()}@example.com", password="-")
+    workspace_rows = [{"id": uuid.uuid4(), "name": f"workspace {i:05d}", "owner_id": user.id} for i in range(workspaces)]
+    project_rows = [
+        {"id": uuid.uuid4(), "name": f"project {j:03d}", "workspace_id": row["id"]}
+        for row in workspace_rows
+        for j in range(projects)
+    ]
+    async with AsyncSessionLocal() as db:
+        db.add(user)
+        await db.flush()
+        if workspace_rows:
+            await db.execute(insert(Workspace), workspace_rows)
+        if project_rows:
+            await db.execute(insert(Project), project_rows)
+        await db.commit()
+    return user
+
+
+async def cleanup(user: User):
+    async with AsyncSessionLocal() as db:
+        owned = select(Workspace.id).where(Workspace.owner_id == user.id)
+        await db.execute(delete(Project).where(Project.workspace_id.in_(owned)))
+        await db.execute(delete(Workspace).where(Workspace.owner_id == user.id))
+        await db.execute(delete(User).where(User.id == user.id))
+        await db.commit()
+
+
+async def per_workspace(db, user: User):
+    """What walking user.workspaces, then each workspace.projects, lazily costs"""
+    workspaces = (await db.execute(select(Workspace).where(Workspace.owner_id == user.id))).scalars().all()
+    for workspace in workspaces:
+        await db.execute(select(Project).where(Project.workspace_id == workspace.id))
+
+
+async def measure(load, user: User, counter: QueryCounter):
+    async with AsyncSessionLocal() as db:
+        counter.count = 0
+        started = time.perf_counter()
+        await load(db, user)
+        return counter.count, (time.perf_counter() - started) * 1000
+
+
+async def main(args):
+    counter = QueryCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+    failed = False
+    print(f"{'workspaces':>10} {'tree queries':>13} {'tree ms':>8} {'loop queries':>13} {'loop ms':>8}")
+    try:
+        for workspaces in (int(n) for n in args.workspaces.split(",")):
+            user = await seed(workspaces, args.projects)
+            try:
+                tree_queries, tree_ms = await measure(load_workspace_tree, user, counter)
+                loop_queries, loop_ms = await measure(per_workspace, user, counter)
+            finally:
+                await cleanup(user)
+            print(f"{workspaces:>10} {tree_queries:>13} {tree_ms:>8.1f} {loop_queries:>13} {loop_ms:>8.1f}")
+            if tree_queries > 1 + max(1, math.ceil(workspaces / SELECTIN_BATCH)):
+                print(f"FAIL: the tree took {tree_queries} queries for {workspaces} workspaces")
+                failed = True
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+        await async_engine.dispose()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workspaces", default="1,10,100,1000", help="comma-separated workspace counts")
+    parser.add_argument("--projects", type=int, default=5, help="projects per workspace")
+    asyncio.run(main(parser.parse_args()))
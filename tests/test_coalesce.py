@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from app.chat.coalesce import coalesce_partials
+
+
+def partial(text):
+    return {"type": "text", "mime_type": "text/plain", "data": text, "partial": True}
+
+
+def final(text):
+    return {"type": "text", "mime_type": "text/plain", "data": text, "partial": False}
+
+
+async def feed(messages, hold: asyncio.Event):
+    """Yield ``messages``, then stay open until ``hold`` is set, as a live run does between tokens"""
+    for message in messages:
+        yield message
+    await hold.wait()
+
+
+async def first_outputs(messages, count, **options):
+    """The first ``count`` coalesced messages and when each arrived, while the source stays open"""
+    hold = asyncio.Event()
+    coalesced = coalesce_partials(feed(messages, hold), **options)
+    started = time.perf_counter()
+    received = []
+    try:
+        for _ in range(count):
+            message = await asyncio.wait_for(coalesced.__anext__(), 2)
+            received.append((message, time.perf_counter() - started))
+    finally:
+        hold.set()
+        await coalesced.aclose()
+    return received
+
+
+def test_flushes_once_pending_text_reaches_max_bytes():
+    messages = [partial("aaaa"), partial("bbbb"), partial("cccc")]
+    received = asyncio.run(first_outputs(messages, 1, window_ms=10_000, max_bytes=10))
+    [(message, after)] = received
+    assert message == partial("aaaabbbbcccc")
+    assert after < 1
+
+
+def test_flushes_after_the_window():
+    received = asyncio.run(first_outputs([partial("a"), partial("b")], 1, window_ms=50, max_bytes=2048))
+    [(message, after)] = received
+    assert message == partial("ab")
+    assert 0.04 <= after < 1
+
+
+def test_final_frame_flushes_pending_text_first():
+    control = {"type": "control", "turn_complete": True, "interrupted": False}
+    received = asyncio.run(
+        first_outputs([partial("a"), partial("b"), final("ab"), control], 3, window_ms=10_000, max_bytes=2048)
+    )
+    assert [message for message, _ in received] == [partial("ab"), final("ab"), control]
+    assert all(after < 1 for _, after in received)
+
+
+def test_end_of_stream_flushes_pending_text():
+    async def messages():
+        yield partial("a")
+        yield partial("b")
+
+    async def run():
+        return [message async for message in coalesce_partials(messages(), window_ms=10_000, max_bytes=2048)]
+
+    assert asyncio.run(run()) == [partial("ab")]
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from google.adk.events import Event
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.chat import store
+from app.chat.store import ConversationStore
+
+
+class FakeDatabase:
+    """Stands in for ConversationStore._write: keeps what was written, fails on demand"""
+
+    def __init__(self):
+        self.down = False
+        self.refused = set()
+        self.events = []
+
+    async def write(self, conversations, events):
+        if self.down:
+            raise OperationalError("INSERT", {}, ConnectionError("connection refused"))
+        if any(event["event_id"] in self.refused for event in events):
+            raise IntegrityError("INSERT", {}, ValueError("violates a constraint"))
+        self.events.extend(event["event_id"] for event in events)
+
+
+def make_store(batch_size=3):
+    conversations = ConversationStore(batch_size=batch_size)
+    database = FakeDatabase()
+    conversations._write = database.write
+    return conversations, database
+
+
+def append(conversations, count, session_id="s1"):
+    ids = []
+    for _ in range(count):
+        event = Event(author="user", invocation_id="i")
+        conversations.append_event(session_id, event)
+        ids.append(event.id)
+    return ids
+
+
+async def flush_until_done(conversations, attempts):
+    for _ in range(attempts):
+        try:
+            await conversations.flush()
+            return
+        except Exception:
+            pass
+
+
+def test_outage_keeps_every_batch():
+    async def run():
+        conversations, database = make_store()
+        ids = append(conversations, 7)
+        database.down = True
+        await flush_until_done(conversations, attempts=store.CHAT_STORE_MAX_RETRIES * 3)
+        assert len(conversations) == 7
+        assert conversations._failures > store.CHAT_STORE_MAX_RETRIES
+
+        database.down = False
+        await conversations.flush()
+        return ids, database.events, len(conversations)
+
+    ids, written, buffered = asyncio.run(run())
+    assert written == ids
+    assert buffered == 0
+
+
+def test_refused_row_is_dropped_after_retries():
+    async def run():
+        conversations, database = make_store()
+        ids = append(conversations, 5)
+        database.refused.add(ids[1])
+        for _ in range(store.CHAT_STORE_MAX_RETRIES):
+            with pytest.raises(IntegrityError):
+                await conversations.flush()
+            assert len(conversations) == 5
+        await conversations.flush()
+        return ids, database.events, len(conversations)
+
+    ids, written, buffered = asyncio.run(run())
+    assert written == [ids[0], ids[2], ids[3], ids[4]]
+    assert buffered == 0
+
+
+def test_outage_while_isolating_requeues_the_rest():
+    async def run():
+        conversations, database = make_store(batch_size=4)
+        first = append(conversations, 2, session_id="a")
+        second = append(conversations, 2, session_id="b")
+        database.refused.add(first[0])
+        conversations._failures = store.CHAT_STORE_MAX_RETRIES
+
+        writes = 0
+        write = database.write
+
+        async def failing_midway(conversations_, events):
+            nonlocal writes
+            writes += 1
+            # The batch, conversation a, then its rows one at a time: cut off before b
+            if writes > 4:
+                database.down = True
+            await write(conversations_, events)
+
+        conversations._write = failing_midway
+        with pytest.raises(OperationalError):
+            await conversations.flush()
+        buffered = [event["event_id"] for event in conversations._events]
+        database.down = False
+        conversations._write = write
+        await conversations.flush()
+        return first, second, buffered, database.events
+
+    first, second, buffered, written = asyncio.run(run())
+    assert buffered == second
+    assert written == [first[1], *second]
+
+
+class FakeSession:
+    """AsyncSessionLocal stand-in holding the stored conversation rows"""
+
+    rows = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, model, key):
+        return self.rows.get(key)
+
+
+def test_reads_merge_the_buffer_without_flushing(monkeypatch):
+    monkeypatch.setattr(store, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(FakeSession, "rows", {})
+
+    async def run():
+        conversations, database = make_store(batch_size=100)
+        conversations.record_conversation("s1", "app", "s1")
+        ids = append(conversations, 3)
+        stored = [Event.model_validate(row["payload"]) for row in list(conversations._events)[:2]]
+
+        async def load_events(session_id, after=0, limit=store.CHAT_HISTORY_PAGE_SIZE):
+            # The first two landed with a batch that then failed, so they are buffered again too
+            return [(cursor, event) for cursor, event in enumerate(stored, start=1) if cursor > after]
+
+        conversations.load_events = load_events
+        conversation = await conversations.get_conversation("s1")
+        session = await conversations.load_session("app", "s1", "s1")
+        return ids, database.events, conversation, session
+
+    ids, written, conversation, session = asyncio.run(run())
+    assert written == []
+    assert conversation.app_name == "app"
+    assert [event.id for event in session.events] == ids
@@ -0,0 +1,128 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.agent.analyst_agent.tools import TOOL_STATS, ToolStatsPlugin, memoize_tool
+from app.agent.analyst_agent.tools import memo
+
+
+class FakeState(dict):
+    """Session state that records writes in the delta, as ADK's State does"""
+
+    def __init__(self, delta, **values):
+        super().__init__(**values)
+        self.delta = delta
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.delta[key] = value
+
+
+def make_context(**state):
+    delta = {}
+    return SimpleNamespace(state=FakeState(delta, **state), actions=SimpleNamespace(state_delta=delta))
+
+
+def counted(**options):
+    calls = []
+
+    @memoize_tool(**options)
+    def lookup(query: str, limit: int = 10, tool_context=None) -> dict:
+        calls.append((query, limit))
+        if tool_context is not None:
+            tool_context.state["last_query"] = query
+        return {"query": query, "rows": list(range(limit))}
+
+    return lookup, calls
+
+
+def test_key_matches_arguments_exactly():
+    lookup, calls = counted()
+    lookup(query="Sales", limit=2)
+    lookup("Sales", 2)
+    lookup(query="Sales", limit=2, tool_context=make_context())
+    lookup(query="sales", limit=2)
+    lookup(query="Sales", limit=1)
+    lookup(query="Sales", limit=True)
+    assert calls == [("Sales", 2), ("sales", 2), ("Sales", 1), ("Sales", True)]
+
+
+def test_key_folds_only_normalized_arguments():
+    lookup, calls = counted(normalize=["query"])
+    lookup(query="Monthly  Sales")
+    lookup(query=" monthly sales ")
+    assert calls == [("Monthly  Sales", 10)]
+
+
+def test_key_includes_state_the_tool_depends_on():
+    lookup, calls = counted(depends_on=["project"])
+    lookup(query="x", tool_context=make_context(project="a"))
+    lookup(query="x", tool_context=make_context(project="a"))
+    lookup(query="x", tool_context=make_context(project="b"))
+    assert calls == [("x", 10), ("x", 10)]
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memo.time, "monotonic", lambda: now[0])
+    lookup, calls = counted(ttl=60)
+    lookup(query="x")
+    now[0] += 59
+    lookup(query="x")
+    now[0] += 2
+    lookup(query="x")
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    lookup, calls = counted(max_size=2)
+    lookup(query="a")
+    lookup(query="b")
+    lookup(query="a")
+    lookup(query="c")
+    lookup(query="a")
+    lookup(query="b")
+    assert [query for query, _ in calls] == ["a", "b", "c", "b"]
+
+
+def test_hit_replays_state_writes_and_copies_the_result():
+    lookup, calls = counted()
+    first = lookup(query="x", tool_context=make_context())
+    first["rows"].append("changed")
+    context = make_context()
+    second = lookup(query="x", tool_context=context)
+    assert len(calls) == 1
+    assert context.state["last_query"] == "x"
+    assert context.actions.state_delta == {"last_query": "x"}
+    assert second["rows"] == list(range(10))
+
+
+def test_hits_are_counted():
+    @memoize_tool()
+    async def cached_tool(query: str) -> str:
+        return query.upper()
+
+    async def run():
+        return [await cached_tool(query="x") for _ in range(3)]
+
+    assert asyncio.run(run()) == ["X", "X", "X"]
+    assert TOOL_STATS["cached_tool"].hits == 2
+
+
+def test_plugin_counts_every_call():
+    plugin = ToolStatsPlugin()
+    tool = SimpleNamespace(name="plain_tool")
+
+    async def run():
+        for _ in range(2):
+            context = make_context()
+            await plugin.before_tool_callback(tool=tool, tool_args={}, tool_context=context)
+            await plugin.after_tool_callback(tool=tool, tool_args={}, tool_context=context, result={})
+        # A failure answered by an error callback goes on to the after-tool callbacks
+        context = make_context()
+        await plugin.before_tool_callback(tool=tool, tool_args={}, tool_context=context)
+        await plugin.on_tool_error_callback(tool=tool, tool_args={}, tool_context=context, error=ValueError())
+        await plugin.after_tool_callback(tool=tool, tool_args={}, tool_context=context, result={})
+
+    asyncio.run(run())
+    assert TOOL_STATS["plain_tool"].calls == 3
+    assert TOOL_STATS["plain_tool"].seconds > 0
@@ -0,0 +1,88 @@
+import asyncio
+
+import asyncpg
+
+from app.chat import registry
+from app.chat.registry import PostgresMessageBus, channel_for
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.listening = set()
+        self.on_terminated = []
+
+    def add_termination_listener(self, callback):
+        self.on_terminated.append(callback)
+
+    def remove_termination_listener(self, callback):
+        self.on_terminated.remove(callback)
+
+    async def add_listener(self, channel, callback):
+        self.listening.add(channel)
+
+    def is_closed(self):
+        return self.closed
+
+    async def execute(self, query):
+        return "SELECT 1"
+
+    async def close(self):
+        self.closed = True
+
+    def terminate(self):
+        self.closed = True
+
+    def drop(self):
+        """The server went away"""
+        self.closed = True
+        for callback in list(self.on_terminated):
+            callback(self)
+
+
+class FakePool:
+    async def close(self):
+        pass
+
+
+def test_bus_listens_again_after_the_connection_drops(monkeypatch):
+    connections = []
+    refusals = 2
+
+    async def connect(dsn):
+        nonlocal refusals
+        if connections and refusals:
+            refusals -= 1
+            raise OSError("connection refused")
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    async def create_pool(dsn, **kwargs):
+        return FakePool()
+
+    sleep = asyncio.sleep
+
+    async def no_wait(delay):
+        await sleep(0)
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+    monkeypatch.setattr(asyncpg, "create_pool", create_pool)
+
+    async def run():
+        bus = PostgresMessageBus("postgresql://test")
+        await bus.start(lambda message: None)
+        healthy = [bus.healthy]
+        # Skip the reconnect backoff
+        monkeypatch.setattr(asyncio, "sleep", no_wait)
+        connections[0].drop()
+        healthy.append(bus.healthy)
+        for _ in range(20):
+            await no_wait(0)
+        healthy.append(bus.healthy)
+        await bus.stop()
+        return healthy
+
+    healthy = asyncio.run(run())
+    assert healthy == [True, False, True]
+    assert len(connections) == 2
+    assert connections[1].listening == {channel_for(registry.WORKER_ID)}
@@ -0,0 +1,107 @@
+import asyncio
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.workspaces import WORKSPACE_ORDER
+from app.models import Base, Conversation, Project, User, Workspace
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_page
+
+TABLES = [User.__table__, Workspace.__table__, Project.__table__, Conversation.__table__]
+
+
+async def make_sessionmaker():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=TABLES))
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def all_pages(sessionmaker, query, keys, limit):
+    """Every row, read page by page, and how many pages it took"""
+    rows, cursor, pages = [], None, 0
+    while True:
+        async with sessionmaker() as db:
+            page, cursor = await keyset_page(db, query, keys, cursor, limit)
+        rows += page
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+def test_pages_through_equal_names_by_id():
+    async def run():
+        engine, sessionmaker = await make_sessionmaker()
+        owner = uuid.uuid4()
+        workspaces = [Workspace(id=uuid.uuid4(), name=f"name {i % 2}", owner_id=owner) for i in range(7)]
+        async with sessionmaker() as db:
+            db.add_all(workspaces)
+            await db.commit()
+        query = select(Workspace).where(Workspace.owner_id == owner)
+        rows, pages = await all_pages(sessionmaker, query, WORKSPACE_ORDER, limit=2)
+        await engine.dispose()
+        return workspaces, rows, pages
+
+    workspaces, rows, pages = asyncio.run(run())
+    assert [row.id for row in rows] == [w.id for w in sorted(workspaces, key=lambda w: (w.name, str(w.id)))]
+    assert pages == 4
+
+
+def test_pages_through_equal_timestamps_by_id():
+    created = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+    async def run():
+        engine, sessionmaker = await make_sessionmaker()
+        conversations = [
+            Conversation(id=f"c{i:02d}", app_name="app", agent_user_id="u", created_at=created, updated_at=created)
+            for i in range(5)
+        ]
+        async with sessionmaker() as db:
+            db.add_all(conversations)
+            await db.commit()
+        keys = (Conversation.created_at, Conversation.id)
+        rows, pages = await all_pages(sessionmaker, select(Conversation), keys, limit=2)
+        await engine.dispose()
+        return rows, pages
+
+    rows, pages = asyncio.run(run())
+    assert [row.id for row in rows] == [f"c{i:02d}" for i in range(5)]
+    assert pages == 3
+
+
+def test_cursor_round_trips_its_types():
+    workspace_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(["b", workspace_id]), WORKSPACE_ORDER) == ("b", workspace_id)
+    created = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    keys = (Conversation.created_at, Conversation.id)
+    assert decode_cursor(encode_cursor([created, "c1"]), keys) == (created, "c1")
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        "%%%",
+        "é",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        raw_cursor({"name": "b"}),
+        raw_cursor(["b"]),
+        raw_cursor(["b", "not a uuid"]),
+        raw_cursor([["b"], ["c"]]),
+        raw_cursor(["b", 5]),
+    ],
+)
+def test_invalid_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor, WORKSPACE_ORDER)
+    assert raised.value.status_code == 400
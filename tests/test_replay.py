@@ -0,0 +1,79 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from starlette.requests import Request
+
+from app.api.v1 import chat
+from app.chat.routing import session_router
+from app.chat.session import LiveSession
+
+
+async def no_events():
+    return
+    yield
+
+
+def make_session(session_id="replayed", frames=0, buffer=4):
+    session = LiveSession(
+        session_id=session_id,
+        live_events=no_events(),
+        live_request_queue=SimpleNamespace(close=lambda: None),
+    )
+    session.replay = type(session.replay)(maxlen=buffer)
+    for n in range(1, frames + 1):
+        session.record_frame(json.dumps({"n": n}))
+    return session
+
+
+def numbers(frames):
+    return [json.loads(frame.split("data: ", 1)[1])["n"] for frame in frames]
+
+
+def test_frames_since_replays_what_was_missed():
+    session = make_session(frames=3)
+    frames, complete = session.frames_since(f"{session.epoch}.1")
+    assert numbers(frames) == [2, 3]
+    assert complete
+    assert session.frames_since(f"{session.epoch}.3") == ([], True)
+
+
+def test_frames_since_reports_a_gap_once_the_id_left_the_buffer():
+    session = make_session(frames=6, buffer=4)
+    # Frames 3 to 6 are kept: after 2 nothing is missing, after 1 frame 2 is
+    frames, complete = session.frames_since(f"{session.epoch}.2")
+    assert numbers(frames) == [3, 4, 5, 6] and complete
+    frames, complete = session.frames_since(f"{session.epoch}.1")
+    assert numbers(frames) == [3, 4, 5, 6] and not complete
+
+
+def test_frames_since_rejects_ids_from_another_session():
+    session = make_session(frames=2)
+    assert session.frames_since("otherepoch.1") == ([], False)
+    assert session.frames_since(f"{session.epoch}.garbage") == ([], False)
+
+
+def stream_request(last_event_id):
+    headers = [(b"last-event-id", last_event_id.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+async def reconnect(session, last_event_id):
+    session_router.local[session.session_id] = session
+    response = await chat.chat_stream_endpoint(session.session_id, stream_request(last_event_id))
+    return [chunk async for chunk in response.body_iterator]
+
+
+def test_reconnect_replays_missed_frames():
+    session = make_session(frames=3)
+    chunks = asyncio.run(reconnect(session, f"{session.epoch}.1"))
+    assert chunks[0].startswith("retry: ")
+    assert numbers(chunks[1:3]) == [2, 3]
+    assert json.loads(chunks[3].split("data: ", 1)[1])["type"] == "end"
+
+
+def test_reconnect_past_the_buffer_gets_a_resync_frame():
+    session = make_session(frames=6, buffer=4)
+    chunks = asyncio.run(reconnect(session, f"{session.epoch}.1"))
+    assert json.loads(chunks[1].split("data: ", 1)[1])["type"] == "resync"
+    assert numbers(chunks[2:6]) == [3, 4, 5, 6]
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from app.chat import pool
+from app.chat.pool import SessionPool
+
+
+class FakeSession:
+    """A primed session as far as the pool can tell"""
+
+    built = 0
+
+    def __init__(self):
+        FakeSession.built += 1
+        self.number = FakeSession.built
+        self.created_at = time.monotonic()
+        self.ended = False
+        self.closed = False
+
+    def prime(self):
+        pass
+
+    def run_ended(self):
+        return self.ended
+
+    async def close(self):
+        self.closed = True
+
+
+async def fake_new_live_session():
+    return FakeSession()
+
+
+async def filled(size, max_age=300):
+    session_pool = SessionPool(size=size, max_age=max_age)
+    await session_pool.start()
+    while len(session_pool) < size:
+        await asyncio.sleep(0)
+    return session_pool
+
+
+def test_prune_replaces_dropped_and_old_sessions(monkeypatch):
+    monkeypatch.setattr(pool, "new_live_session", fake_new_live_session)
+
+    async def run():
+        session_pool = await filled(3)
+        dropped, old, fresh = list(session_pool._ready)
+        dropped.ended = True
+        old.created_at -= 301
+        pruned = await session_pool.prune()
+        closed = [dropped.closed, old.closed, fresh.closed]
+        kept = list(session_pool._ready)
+        while len(session_pool) < session_pool.size:
+            await asyncio.sleep(0)
+        replaced = list(session_pool._ready)
+        await session_pool.stop()
+        return pruned, closed, fresh, kept, replaced
+
+    pruned, closed, fresh, kept, replaced = asyncio.run(run())
+    assert pruned == 2
+    assert closed == [True, True, False]
+    assert kept == [fresh]
+    assert len(replaced) == 3 and replaced[0] is fresh
+
+
+def test_acquire_skips_stale_sessions(monkeypatch):
+    monkeypatch.setattr(pool, "new_live_session", fake_new_live_session)
+
+    async def run():
+        session_pool = await filled(2, max_age=60)
+        old, usable = list(session_pool._ready)
+        old.created_at -= 61
+        session = await session_pool.acquire()
+        await session_pool.stop()
+        return old, usable, session
+
+    old, usable, session = asyncio.run(run())
+    assert session is usable
+    assert old.closed
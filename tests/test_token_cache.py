@@ -0,0 +1,132 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.dependencies import user_for_token
+from app.models import Base, User
+from app.utils import token_cache as token_cache_module
+from app.utils.auth import ALGORITHM, SECRET_KEY, create_access_token
+from app.utils.token_cache import token_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+async def make_user():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=[User.__table__]))
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    user = User(id=uuid.uuid4(), name="test", email="test@example.com", password="-")
+    async with sessionmaker() as db:
+        db.add(user)
+        await db.commit()
+    return engine, sessionmaker, user
+
+
+async def authenticate(engine, sessionmaker, token):
+    """The user of ``token`` and the number of queries it took"""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with sessionmaker() as db:
+            user = await user_for_token(token, db)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+    return user, len(statements)
+
+
+def test_second_call_is_served_from_cache():
+    async def run():
+        engine, sessionmaker, user = await make_user()
+        token = create_access_token({"sub": user.email})
+        results = [await authenticate(engine, sessionmaker, token) for _ in range(2)]
+        await engine.dispose()
+        return user, results
+
+    user, [(first, first_queries), (second, second_queries)] = asyncio.run(run())
+    assert first.id == second.id == user.id
+    assert (first_queries, second_queries) == (1, 0)
+
+
+def test_token_without_exp_is_cached_for_the_max_ttl(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(token_cache_module.time, "time", lambda: now[0])
+
+    async def run():
+        engine, sessionmaker, user = await make_user()
+        token = jwt.encode({"sub": user.email}, SECRET_KEY, algorithm=ALGORITHM)
+        queries = [(await authenticate(engine, sessionmaker, token))[1]]
+        now[0] += token_cache.max_ttl - 1
+        queries.append((await authenticate(engine, sessionmaker, token))[1])
+        now[0] += 2
+        queries.append((await authenticate(engine, sessionmaker, token))[1])
+        await engine.dispose()
+        return queries
+
+    assert asyncio.run(run()) == [1, 0, 1]
+
+
+def test_entry_expires_with_the_token(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(token_cache_module.time, "time", lambda: now[0])
+    user = token_cache_module.UserSnapshot(id=uuid.uuid4(), name="test", email="test@example.com")
+    token_cache.put("token", user, exp=now[0] + 10)
+    assert token_cache.get("token") == user
+    now[0] += 10
+    assert token_cache.get("token") is None
+
+
+def test_user_commit_drops_cached_tokens():
+    async def run():
+        engine, sessionmaker, user = await make_user()
+        token = create_access_token({"sub": user.email})
+        await authenticate(engine, sessionmaker, token)
+
+        async with sessionmaker() as db:
+            row = await db.get(User, user.id)
+            row.name = "renamed"
+            await db.flush()
+            cached_until_commit = token_cache.get(token) is not None
+            await db.rollback()
+        cached_after_rollback = token_cache.get(token) is not None
+
+        async with sessionmaker() as db:
+            row = await db.get(User, user.id)
+            row.name = "renamed"
+            await db.commit()
+        cached_after_commit = token_cache.get(token) is not None
+        renamed, queries = await authenticate(engine, sessionmaker, token)
+        await engine.dispose()
+        return cached_until_commit, cached_after_rollback, cached_after_commit, renamed, queries
+
+    cached_until_commit, cached_after_rollback, cached_after_commit, renamed, queries = asyncio.run(run())
+    assert cached_until_commit and cached_after_rollback
+    assert not cached_after_commit
+    assert renamed.name == "renamed" and queries == 1
+
+
+def test_invalid_token_is_unauthorized():
+    async def run():
+        engine, sessionmaker, _ = await make_user()
+        try:
+            await authenticate(engine, sessionmaker, "not a token")
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(run())
+    assert raised.value.status_code == 401
@@ -0,0 +1,87 @@
+import asyncio
+import math
+import uuid
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.workspaces import load_workspace_tree
+from app.models import Base, Project, User, Workspace
+from app.utils.token_cache import UserSnapshot
+from app.utils.workspace_tree_cache import workspace_tree_cache
+
+# selectinload's IN batch size
+SELECTIN_BATCH = 500
+TABLES = [User.__table__, Workspace.__table__, Project.__table__]
+
+
+async def make_sessionmaker():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=TABLES))
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def seed(sessionmaker, workspaces: int, projects: int) -> User:
+    user = User(id=uuid.uuid4(), name="test", email=f"{uuid.uuid4()}@example.com", password="-")
+    async with sessionmaker() as db:
+        db.add(user)
+        for i in range(workspaces):
+            workspace = Workspace(id=uuid.uuid4(), name=f"workspace {i:05d}", owner_id=user.id)
+            workspace.projects = [Project(id=uuid.uuid4(), name=f"project {j}") for j in range(projects)]
+            db.add(workspace)
+        await db.commit()
+    return user
+
+
+@pytest.mark.parametrize("workspaces", [0, 1, 10, SELECTIN_BATCH + 1])
+def test_tree_query_count(workspaces):
+    async def run():
+        engine, sessionmaker = await make_sessionmaker()
+        user = await seed(sessionmaker, workspaces, projects=2)
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+        try:
+            async with sessionmaker() as db:
+                tree, workspace_ids = await load_workspace_tree(db, UserSnapshot.from_user(user))
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", count)
+            await engine.dispose()
+        return tree, workspace_ids, statements
+
+    tree, workspace_ids, statements = asyncio.run(run())
+    assert len(tree["workspaces"]) == len(workspace_ids) == workspaces
+    assert all(len(workspace["projects"]) == 2 for workspace in tree["workspaces"])
+    assert len(statements) == 1 + math.ceil(workspaces / SELECTIN_BATCH)
+
+
+def test_cache_invalidated_on_commit_only():
+    async def run():
+        engine, sessionmaker = await make_sessionmaker()
+        user = await seed(sessionmaker, workspaces=1, projects=1)
+        results = {}
+        try:
+            async with sessionmaker() as db:
+                tree, workspace_ids = await load_workspace_tree(db, UserSnapshot.from_user(user))
+                workspace_tree_cache.put(user.id, tree, workspace_ids, workspace_tree_cache.generation)
+
+                db.add(Project(id=uuid.uuid4(), name="new", workspace_id=workspace_ids[0]))
+                await db.flush()
+                results["after flush"] = workspace_tree_cache.get(user.id) is not None
+                await db.rollback()
+                results["after rollback"] = workspace_tree_cache.get(user.id) is not None
+
+                db.add(Project(id=uuid.uuid4(), name="new", workspace_id=workspace_ids[0]))
+                await db.commit()
+                results["after commit"] = workspace_tree_cache.get(user.id) is not None
+        finally:
+            workspace_tree_cache.clear()
+            await engine.dispose()
+        return results
+
+    assert asyncio.run(run()) == {"after flush": True, "after rollback": True, "after commit": False}